@@ -1,3 +1,4 @@
+import os
 from logging.config import fileConfig
 
 from alembic import context
@@ -9,6 +10,9 @@ from app.models import *  # noqa: F401,F403 — ensure all models are registered
 config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
+# Same database as the app and the data scripts when set (CI, docker compose)
+if os.environ.get("DATABASE_URL_SYNC"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL_SYNC"])
 
 target_metadata = Base.metadata
 
@@ -0,0 +1,36 @@
+"""Add sun_intervals table (precomputed daily sunny windows per terrasse)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sun_intervals",
+        sa.Column(
+            "terrasse_id",
+            sa.Integer,
+            sa.ForeignKey("terrasses.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("date", sa.Date, primary_key=True),
+        # Flat [start, end, start, end, ...] minutes of the local day, end exclusive
+        sa.Column("intervals", sa.ARRAY(sa.SmallInteger, dimensions=1), nullable=False),
+    )
+    op.create_index("idx_sun_intervals_date", "sun_intervals", ["date"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_sun_intervals_date", table_name="sun_intervals")
+    op.drop_table("sun_intervals")
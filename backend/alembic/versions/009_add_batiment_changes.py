@@ -0,0 +1,43 @@
+"""Add batiment_changes table and horizon_profiles.stale flag
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Buildings added / removed / with a new height between two BD TOPO imports
+    op.create_table(
+        "batiment_changes",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("change_type", sa.String(16), nullable=False),
+        sa.Column("hauteur_old", sa.Float, nullable=True),
+        sa.Column("hauteur_new", sa.Float, nullable=True),
+        sa.Column("geometry", Geometry("POLYGON", srid=4326), nullable=False),
+        sa.Column("detected_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+    # GeoAlchemy2 auto-creates GIST index on geometry columns
+    op.create_index("idx_batiment_changes_detected_at", "batiment_changes", ["detected_at"])
+
+    # Profiles whose surroundings changed: served as-is until recomputed
+    op.add_column(
+        "horizon_profiles",
+        sa.Column("stale", sa.Boolean, server_default=sa.false(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("horizon_profiles", "stale")
+    op.drop_index("idx_batiment_changes_detected_at", table_name="batiment_changes")
+    op.drop_table("batiment_changes")
@@ -0,0 +1,93 @@
+"""Add etablissements materialized view (terrasses grouped by SIRET)
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per establishment: terrasses sharing a SIRET, or a terrasse
+    # without SIRET on its own. The representative is the member with a
+    # commercial name first, then the lowest id. The union profile is the
+    # element-wise min of the member profiles (sunny if ANY member is sunny).
+    # Refreshed by data/update_pipeline.py.
+    op.execute("""
+        CREATE MATERIALIZED VIEW etablissements AS
+        WITH members AS (
+            SELECT
+                t.id, t.nom, t.nom_commercial, t.adresse, t.arrondissement,
+                t.siret, t.longueur, t.largeur, t.geometry,
+                t.price_level, t.place_type, t.rating, t.user_rating_count,
+                t.phone, t.website, t.google_maps_uri,
+                hp.profile,
+                COALESCE(NULLIF(t.siret, ''), t.id::text) AS group_key
+            FROM terrasses t
+            LEFT JOIN horizon_profiles hp ON hp.terrasse_id = t.id
+        ),
+        representatives AS (
+            SELECT DISTINCT ON (group_key) *
+            FROM members
+            ORDER BY group_key, nom_commercial IS NOT NULL DESC, id
+        ),
+        aggregates AS (
+            SELECT
+                group_key,
+                COUNT(*) AS terrasse_count,
+                ROUND(SUM(COALESCE(longueur, 0) * COALESCE(largeur, 0))::numeric, 1) AS surface_m2,
+                array_agg(id ORDER BY id) AS member_ids,
+                COALESCE(
+                    array_agg(id ORDER BY id) FILTER (WHERE profile IS NOT NULL),
+                    '{}'
+                ) AS profiled_ids,
+                ST_Centroid(ST_Collect(geometry)) AS centroid
+            FROM members
+            GROUP BY group_key
+        ),
+        union_profiles AS (
+            SELECT group_key, array_agg(elevation ORDER BY azimuth) AS union_profile
+            FROM (
+                SELECT m.group_key, p.azimuth, MIN(p.elevation) AS elevation
+                FROM members m
+                CROSS JOIN LATERAL unnest(m.profile) WITH ORDINALITY AS p(elevation, azimuth)
+                GROUP BY m.group_key, p.azimuth
+            ) per_azimuth
+            GROUP BY group_key
+        )
+        SELECT
+            r.group_key,
+            r.id,
+            r.nom, r.nom_commercial, r.adresse, r.arrondissement, r.siret,
+            r.price_level, r.place_type, r.rating, r.user_rating_count,
+            r.phone, r.website, r.google_maps_uri,
+            r.geometry,
+            a.centroid,
+            a.terrasse_count,
+            a.surface_m2,
+            a.member_ids,
+            a.profiled_ids,
+            u.union_profile
+        FROM representatives r
+        JOIN aggregates a USING (group_key)
+        LEFT JOIN union_profiles u USING (group_key)
+    """)
+    # Unique index: required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX uq_etablissements_group_key ON etablissements (group_key)")
+    op.execute("CREATE UNIQUE INDEX uq_etablissements_id ON etablissements (id)")
+    op.execute("CREATE INDEX idx_etablissements_geometry ON etablissements USING GIST (geometry)")
+    op.execute(
+        "CREATE INDEX idx_etablissements_geography ON etablissements "
+        "USING GIST ((geometry::geography))"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS etablissements")
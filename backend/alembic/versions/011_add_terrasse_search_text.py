@@ -0,0 +1,44 @@
+"""Add terrasses.search_text (unaccented names + address) with a trigram index
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() is STABLE (its dictionary could change): generated columns
+    # and index expressions need an IMMUTABLE wrapper with a fixed dictionary
+    op.execute("""
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+    # One normalized column for search_terrasses: a single GIN index serves
+    # both the word-similarity (<%) and the substring (LIKE) predicates.
+    # concat_ws() is only STABLE: the fields are joined with || instead.
+    op.execute("""
+        ALTER TABLE terrasses ADD COLUMN search_text text
+        GENERATED ALWAYS AS (
+            lower(immutable_unaccent(COALESCE(nom_commercial, '') || ' | ' || COALESCE(nom, '') || ' | ' || COALESCE(adresse, '')))
+        ) STORED
+    """)
+    op.execute(
+        "CREATE INDEX idx_terrasses_search_text_trgm ON terrasses "
+        "USING GIN (search_text gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_terrasses_search_text_trgm")
+    op.execute("ALTER TABLE terrasses DROP COLUMN IF EXISTS search_text")
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
@@ -0,0 +1,44 @@
+"""Add Lambert-93 (EPSG:2154) geometries with GiST indexes for radius queries
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ST_DWithin(geometry::geography, ...) can't use the 4326 GiST index and
+    # scans the table. Projected in meters, ST_DWithin(geom_l93, point, r) is
+    # an index search; Lambert-93 distortion in Paris is ~10 cm per km.
+    # Generated columns follow inserts and updates of geometry.
+    op.execute("""
+        ALTER TABLE terrasses ADD COLUMN geom_l93 geometry(Point, 2154)
+        GENERATED ALWAYS AS (ST_Transform(geometry, 2154)) STORED
+    """)
+    op.execute("CREATE INDEX idx_terrasses_geom_l93 ON terrasses USING GIST (geom_l93)")
+    op.execute("""
+        ALTER TABLE batiments ADD COLUMN geom_l93 geometry(Polygon, 2154)
+        GENERATED ALWAYS AS (ST_Transform(geometry, 2154)) STORED
+    """)
+    op.execute("CREATE INDEX idx_batiments_geom_l93 ON batiments USING GIST (geom_l93)")
+    # find_nearby now filters on terrasses.geom_l93
+    op.execute("DROP INDEX IF EXISTS idx_etablissements_geography")
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE INDEX idx_etablissements_geography ON etablissements "
+        "USING GIST ((geometry::geography))"
+    )
+    op.execute("DROP INDEX IF EXISTS idx_batiments_geom_l93")
+    op.execute("ALTER TABLE batiments DROP COLUMN IF EXISTS geom_l93")
+    op.execute("DROP INDEX IF EXISTS idx_terrasses_geom_l93")
+    op.execute("ALTER TABLE terrasses DROP COLUMN IF EXISTS geom_l93")
@@ -17,6 +17,18 @@ class Settings(BaseSettings):
 
     FRONTEND_URL: str = "http://localhost:3000"
 
+    # Memory-mapped city-wide sun-position tables (empty = in-process only)
+    SUN_TABLE_DIR: str = "/tmp/ausoleil/sun_table"
+
+    # Generated sun-status map tiles (empty = Redis only)
+    SUN_TILE_DIR: str = "/tmp/ausoleil/sun_tiles"
+
+    # In-process terrasse index for nearby queries (0 = disabled, SQL only)
+    TERRASSE_INDEX_REFRESH_SECONDS: int = 60
+
+    # Background refresh of the whole Paris forecast (0 = on demand only)
+    WEATHER_PREFETCH_MINUTES: int = 30
+
     model_config = {"env_file": ".env", "extra": "ignore"}
 
 
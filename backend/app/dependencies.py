@@ -1,14 +1,22 @@
 """Shared FastAPI dependencies."""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
 from redis.asyncio import Redis
 
 from app.config import settings
 
 _redis: Redis | None = None
+_http: httpx.AsyncClient | None = None
+
+HTTP_TIMEOUT = 10.0
 
 
 async def init_redis() -> None:
     global _redis
-    _redis = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    # Raw bytes: some caches store packed binary values (JSON decodes from bytes)
+    _redis = Redis.from_url(settings.REDIS_URL)
 
 
 async def close_redis() -> None:
@@ -20,3 +28,29 @@ async def close_redis() -> None:
 
 async def get_redis() -> Redis | None:
     return _redis
+
+
+async def init_http_client() -> None:
+    """App-wide pooled client for the upstream APIs (kept-alive connections)."""
+    global _http
+    _http = httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+
+
+async def close_http_client() -> None:
+    global _http
+    if _http:
+        await _http.aclose()
+        _http = None
+
+
+@asynccontextmanager
+async def http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """The app-wide client, or a short-lived one outside the app (scripts, tests)."""
+    if _http is not None:
+        yield _http
+    else:
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            yield client
@@ -4,8 +4,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.dependencies import close_redis, init_redis
-from app.routers import contact, geocode, og, poster, seo, streetview, terrasses
+from app.dependencies import close_http_client, close_redis, get_redis, init_http_client, init_redis
+from app.routers import contact, geocode, metrics, og, poster, seo, streetview, sun_tiles, terrasses
+from app.services.meteo import start_weather_prefetch, stop_weather_prefetch
+from app.services.sun_table import open_sun_tables
+from app.services.terrasse_index import start_terrasse_index, stop_terrasse_index
 from mcp_server import mcp as mcp_server
 
 # Pre-build MCP ASGI app so we can reference its lifespan
@@ -15,9 +18,16 @@ _mcp_app = mcp_server.streamable_http_app()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_redis()
+    await init_http_client()
+    open_sun_tables()
+    await start_terrasse_index()
+    await start_weather_prefetch(await get_redis())
     # Start MCP session manager (required for Streamable HTTP transport)
     async with mcp_server.session_manager.run():
         yield
+    await stop_weather_prefetch()
+    await stop_terrasse_index()
+    await close_http_client()
     await close_redis()
 
 
@@ -37,6 +47,8 @@ app.include_router(og.router)
 app.include_router(streetview.router)
 app.include_router(seo.router)
 app.include_router(poster.router)
+app.include_router(sun_tiles.router)
+app.include_router(metrics.router)
 
 # Mount MCP server at /mcp (Streamable HTTP transport)
 app.mount("/mcp", _mcp_app)
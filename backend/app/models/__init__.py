@@ -1,6 +1,8 @@
 from app.models.batiment import Batiment
+from app.models.batiment_change import BatimentChange
 from app.models.terrasse import Terrasse
 from app.models.horizon_profile import HorizonProfile
 from app.models.meteo_cache import MeteoCache
+from app.models.sun_interval import SunInterval
 
-__all__ = ["Batiment", "Terrasse", "HorizonProfile", "MeteoCache"]
+__all__ = ["Batiment", "BatimentChange", "Terrasse", "HorizonProfile", "MeteoCache", "SunInterval"]
@@ -1,5 +1,5 @@
 from geoalchemy2 import Geometry
-from sqlalchemy import Float, Integer
+from sqlalchemy import Computed, Float, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -10,5 +10,10 @@ class Batiment(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     geometry = mapped_column(Geometry("POLYGON", srid=4326), nullable=False, index=True)
+    # Lambert-93 copy for metric radius queries (GiST index, migration 012)
+    geom_l93 = mapped_column(
+        Geometry("POLYGON", srid=2154, spatial_index=False),
+        Computed("ST_Transform(geometry, 2154)", persisted=True),
+    )
     hauteur: Mapped[float] = mapped_column(Float, nullable=False)
     altitude_sol: Mapped[float | None] = mapped_column(Float, nullable=True)
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from geoalchemy2 import Geometry
+from sqlalchemy import DateTime, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class BatimentChange(Base):
+    """A building added, removed or re-measured between two BD TOPO imports."""
+
+    __tablename__ = "batiment_changes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    change_type: Mapped[str] = mapped_column(String(16), nullable=False)  # added | removed | height_changed
+    hauteur_old: Mapped[float | None] = mapped_column(Float, nullable=True)
+    hauteur_new: Mapped[float | None] = mapped_column(Float, nullable=True)
+    geometry = mapped_column(Geometry("POLYGON", srid=4326), nullable=False)
+    detected_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import ARRAY, DateTime, Float, ForeignKey, Integer
+from sqlalchemy import ARRAY, Boolean, DateTime, Float, ForeignKey, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -15,5 +15,7 @@ class HorizonProfile(Base):
     )
     profile: Mapped[list[float]] = mapped_column(ARRAY(Float, dimensions=1), nullable=False)
     computed_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    # Nearby buildings changed since computation (recomputed by the batch job)
+    stale: Mapped[bool] = mapped_column(Boolean, server_default="false", nullable=False)
 
     terrasse: Mapped["Terrasse"] = relationship(back_populates="horizon_profile")
@@ -0,0 +1,22 @@
+from datetime import date
+
+from sqlalchemy import ARRAY, Date, ForeignKey, Integer, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SunInterval(Base):
+    """Sunny windows of one terrasse for one day.
+
+    `intervals` is a flat [start, end, start, end, ...] list of minutes of
+    the local (Paris) day, end exclusive.
+    """
+
+    __tablename__ = "sun_intervals"
+
+    terrasse_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("terrasses.id", ondelete="CASCADE"), primary_key=True
+    )
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    intervals: Mapped[list[int]] = mapped_column(ARRAY(SmallInteger, dimensions=1), nullable=False)
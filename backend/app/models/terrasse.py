@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from geoalchemy2 import Geometry
-from sqlalchemy import BigInteger, Boolean, Float, Integer, String, DateTime, Text
+from sqlalchemy import BigInteger, Boolean, Computed, Float, Integer, String, DateTime, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -16,6 +16,11 @@ class Terrasse(Base):
     adresse: Mapped[str | None] = mapped_column(String, nullable=True)
     arrondissement: Mapped[str | None] = mapped_column(String(5), nullable=True)
     geometry = mapped_column(Geometry("POINT", srid=4326), nullable=False, index=True)
+    # Lambert-93 copy for metric radius queries (GiST index, migration 012)
+    geom_l93 = mapped_column(
+        Geometry("POINT", srid=2154, spatial_index=False),
+        Computed("ST_Transform(geometry, 2154)", persisted=True),
+    )
     typologie: Mapped[str | None] = mapped_column(String(200), nullable=True)
     categorie: Mapped[str | None] = mapped_column(String(30), nullable=True)
     siret: Mapped[str | None] = mapped_column(String(20), nullable=True)
@@ -35,6 +40,17 @@ class Terrasse(Base):
     google_maps_uri: Mapped[str | None] = mapped_column(String(500), nullable=True)
     nom_commercial: Mapped[str | None] = mapped_column(String(300), nullable=True)
 
+    # Normalized names + address for search (GIN trigram index, migration 011)
+    search_text: Mapped[str | None] = mapped_column(
+        Text,
+        Computed(
+            "lower(immutable_unaccent("
+            "COALESCE(nom_commercial, '') || ' | ' || COALESCE(nom, '') || ' | ' || COALESCE(adresse, '')"
+            "))",
+            persisted=True,
+        ),
+    )
+
     # OSM enrichment
     osm_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True, index=True)
     opening_hours: Mapped[str | None] = mapped_column(Text, nullable=True)
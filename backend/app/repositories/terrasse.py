@@ -1,85 +1,102 @@
 """Repository for terrasse data access."""
+from datetime import date
+
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.services.search_index import SIMILARITY_THRESHOLD
+
 
 async def search_terrasses(db: AsyncSession, query: str, limit: int = 10) -> list:
     """Search terrasses by name or address, deduplicated by SIRET.
 
-    Returns one row per establishment (grouped by SIRET).
-    Terrasses without SIRET are treated as individual entries.
+    Same results as SearchIndex.search, from the normalized `search_text`
+    column (unaccented, lowercase nom_commercial | nom | adresse) and its GIN
+    trigram index:
+
+    1. Fuzzy: an establishment scores the best pg_trgm similarity of the
+       query against the names and addresses of its terrasses, kept at
+       >= SIMILARITY_THRESHOLD, best first.
+    2. Substring, only when nothing is similar enough: establishments with
+       a name or address containing the query, by name.
+
+    Word similarity on `search_text` is never below the similarity to one of
+    its fields, so `<%` at the same threshold finds every fuzzy candidate,
+    and LIKE every substring one, with one index scan.
+
+    Returns one row per establishment (the `etablissements` representative,
+    or the same pick among the live members for groups the view does not
+    have yet). Terrasses without SIRET are treated as individual entries.
     """
+    # Transaction-local: the pooled connection keeps the server default
+    await db.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {"threshold": str(SIMILARITY_THRESHOLD)},
+    )
     result = await db.execute(
         text("""
-            WITH scored AS (
+            WITH q AS (
+                SELECT nq, replace(replace(replace(nq, '\\', '\\\\'), '%', '\\%'), '_', '\\_') AS pattern
+                FROM (SELECT lower(immutable_unaccent(:q)) AS nq) folded
+            ),
+            fields AS (
                 SELECT
-                    id, nom, nom_commercial, adresse, arrondissement,
-                    ST_X(geometry) AS lon, ST_Y(geometry) AS lat,
-                    price_level, place_type, rating, user_rating_count,
-                    phone, website, google_maps_uri,
-                    siret,
-                    GREATEST(
-                        COALESCE(similarity(nom_commercial, :q), 0),
-                        similarity(nom, :q),
-                        similarity(adresse, :q)
-                    ) AS sim,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY COALESCE(NULLIF(siret, ''), id::text)
-                        ORDER BY
-                            GREATEST(
-                                COALESCE(similarity(nom_commercial, :q), 0),
-                                similarity(nom, :q),
-                                similarity(adresse, :q)
-                            ) DESC,
-                            nom_commercial IS NOT NULL DESC,
-                            id
-                    ) AS rn
-                FROM terrasses
-                WHERE nom % :q OR adresse % :q OR nom_commercial % :q
+                    COALESCE(NULLIF(t.siret, ''), t.id::text) AS group_key,
+                    t.id,
+                    q.nq,
+                    lower(immutable_unaccent(field)) AS field
+                FROM q
+                JOIN terrasses t
+                    ON q.nq <% t.search_text
+                    OR t.search_text LIKE '%' || q.pattern || '%'
+                CROSS JOIN LATERAL (VALUES (t.nom_commercial), (t.nom), (t.adresse)) f(field)
+                WHERE q.nq <> '' AND field IS NOT NULL
+            ),
+            hits AS (
+                SELECT
+                    group_key,
+                    MIN(id) AS member_id,
+                    MAX(similarity(field, nq)) AS sim,
+                    bool_or(strpos(field, nq) > 0) AS contains
+                FROM fields
+                GROUP BY group_key
+            ),
+            matches AS (
+                SELECT
+                    group_key, member_id, sim, contains,
+                    bool_or(sim >= :threshold) OVER () AS fuzzy
+                FROM hits
             )
-            SELECT id, nom, nom_commercial, adresse, arrondissement,
-                   lon, lat, price_level, place_type, rating,
-                   user_rating_count, phone, website, google_maps_uri, sim
-            FROM scored
-            WHERE rn = 1
-            ORDER BY sim DESC
+            SELECT t.id, t.nom, t.nom_commercial, t.adresse, t.arrondissement,
+                   ST_X(t.geometry) AS lon, ST_Y(t.geometry) AS lat,
+                   t.price_level, t.place_type, t.rating,
+                   t.user_rating_count, t.phone, t.website, t.google_maps_uri,
+                   m.sim
+            FROM matches m
+            LEFT JOIN etablissements e ON e.group_key = m.group_key
+            -- Groups imported since the last refresh: same representative
+            -- rule as the view (commercial name first, then lowest id)
+            LEFT JOIN LATERAL (
+                SELECT g.id
+                FROM terrasses g
+                WHERE e.id IS NULL
+                  AND (g.id = m.member_id OR g.siret = m.group_key)
+                  AND COALESCE(NULLIF(g.siret, ''), g.id::text) = m.group_key
+                ORDER BY g.nom_commercial IS NOT NULL DESC, g.id
+                LIMIT 1
+            ) n ON true
+            JOIN terrasses t ON t.id = COALESCE(e.id, n.id)
+            WHERE CASE WHEN m.fuzzy THEN m.sim >= :threshold ELSE m.contains END
+            ORDER BY
+                CASE WHEN m.fuzzy THEN m.sim END DESC,
+                CASE WHEN NOT m.fuzzy
+                    THEN lower(immutable_unaccent(COALESCE(t.nom_commercial, t.nom))) END COLLATE "C",
+                t.id
             LIMIT :limit
         """),
-        {"q": query, "limit": limit},
+        {"q": query, "threshold": SIMILARITY_THRESHOLD, "limit": limit},
     )
-    rows = result.fetchall()
-
-    if not rows:
-        # Fallback: ILIKE search
-        result = await db.execute(
-            text("""
-                WITH matched AS (
-                    SELECT
-                        id, nom, nom_commercial, adresse, arrondissement,
-                        ST_X(geometry) AS lon, ST_Y(geometry) AS lat,
-                        price_level, place_type, rating, user_rating_count,
-                        phone, website, google_maps_uri,
-                        siret,
-                        ROW_NUMBER() OVER (
-                            PARTITION BY COALESCE(NULLIF(siret, ''), id::text)
-                            ORDER BY nom_commercial IS NOT NULL DESC, id
-                        ) AS rn
-                    FROM terrasses
-                    WHERE nom ILIKE :pattern OR adresse ILIKE :pattern OR nom_commercial ILIKE :pattern
-                )
-                SELECT id, nom, nom_commercial, adresse, arrondissement,
-                       lon, lat, price_level, place_type, rating,
-                       user_rating_count, phone, website, google_maps_uri
-                FROM matched
-                WHERE rn = 1
-                ORDER BY COALESCE(nom_commercial, nom)
-                LIMIT :limit
-            """),
-            {"pattern": f"%{query}%", "limit": limit},
-        )
-        rows = result.fetchall()
-
-    return rows
+    return result.fetchall()
 
 
 async def get_with_profile(db: AsyncSession, terrasse_id: int):
@@ -102,21 +119,46 @@ async def get_with_profile(db: AsyncSession, terrasse_id: int):
     return result.fetchone()
 
 
-async def find_siblings(db: AsyncSession, siret: str) -> list:
-    """Find all terrasses sharing a SIRET, with their profiles and dimensions."""
+async def get_group_with_profiles(
+    db: AsyncSession, terrasse_id: int, target_date: date | None = None
+) -> list:
+    """Fetch a terrasse and all terrasses sharing its SIRET, in one query.
+
+    Rows have the columns of `get_with_profile` plus `intervals` (the
+    precomputed sunny intervals for `target_date`, or None), ordered by id.
+    Every row also carries the group's stored union profile from
+    `etablissements` (`union_profile`, None if not refreshed yet) and the
+    members it was computed from (`union_ids`).
+    Without a SIRET, only the terrasse itself is returned; empty if not found.
+    """
     result = await db.execute(
         text("""
+            WITH p AS (
+                SELECT t.id, t.siret, e.union_profile, e.profiled_ids AS union_ids
+                FROM terrasses t
+                LEFT JOIN etablissements e
+                    ON e.group_key = COALESCE(NULLIF(t.siret, ''), t.id::text)
+                WHERE t.id = :id
+            )
             SELECT
-                t.id, t.nom, t.nom_commercial, t.adresse, t.typologie,
-                t.longueur, t.largeur,
+                t.id, t.nom, t.nom_commercial, t.adresse, t.arrondissement,
                 ST_X(t.geometry) AS lon, ST_Y(t.geometry) AS lat,
-                hp.profile
-            FROM terrasses t
+                t.price_level, t.place_type, t.rating, t.user_rating_count,
+                t.phone, t.website, t.google_maps_uri,
+                t.siret, t.longueur, t.largeur, t.typologie,
+                hp.profile,
+                si.intervals,
+                p.union_profile,
+                p.union_ids
+            FROM p
+            JOIN terrasses t
+                ON t.id = p.id
+                OR (NULLIF(BTRIM(p.siret), '') IS NOT NULL AND t.siret = p.siret)
             LEFT JOIN horizon_profiles hp ON hp.terrasse_id = t.id
-            WHERE t.siret = :siret AND t.siret != ''
+            LEFT JOIN sun_intervals si ON si.terrasse_id = t.id AND si.date = :date
             ORDER BY t.id
         """),
-        {"siret": siret},
+        {"id": terrasse_id, "date": target_date},
     )
     return result.fetchall()
 
@@ -124,82 +166,108 @@ async def find_siblings(db: AsyncSession, siret: str) -> list:
 async def find_nearby(
     db: AsyncSession, lat: float, lon: float, radius_m: int = 500, limit: int = 50
 ) -> list:
-    """Find terrasses within a radius, deduplicated by SIRET.
-
-    Returns one representative row per establishment with:
-    - terrasse_ids: array of all terrasse IDs in the group
-    - profiles: array of horizon profiles for sun union
-    - coords: array of (lat, lon) for each terrasse
-    - surface_m2: aggregated surface
-    - terrasse_count: number of terrasses
+    """Find establishments (SIRET groups) with at least one terrasse within a radius.
+
+    Same semantics as TerrasseIndex.find_nearby: one row per group, for its
+    representative among the in-radius members (commercial name first, then
+    closest, then lowest id), closest group first, with:
+    - terrasse_count / surface_m2 / all_ids: over the in-radius members
+    - profile: union horizon profile of the whole group, from `etablissements`
+      (None if no member has one)
+    - profiled_ids: every member with a profile, in radius or not
+    The stored union is used only if it was computed from the group's current
+    profiled members; otherwise (view not refreshed since profiles were saved
+    or members added) the group gets the union of its current
+    horizon_profiles, as horizon_cache.get_group_profile does.
     """
     result = await db.execute(
         text("""
-            WITH nearby AS (
+            WITH p AS (
+                SELECT ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154) AS geom
+            ),
+            nearby AS (
+                -- Lambert-93 radius on the terrasses GiST index
                 SELECT
-                    t.id,
-                    t.nom,
-                    t.nom_commercial,
-                    t.adresse,
-                    t.siret,
-                    t.longueur,
-                    t.largeur,
-                    ST_X(t.geometry) AS lon,
-                    ST_Y(t.geometry) AS lat,
-                    ST_Distance(
-                        t.geometry::geography,
-                        ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography
-                    )::int AS distance_m,
-                    t.price_level,
-                    t.place_type,
-                    t.rating,
-                    t.user_rating_count,
-                    hp.profile,
+                    t.id, t.nom, t.nom_commercial, t.adresse,
+                    ST_X(t.geometry) AS lon, ST_Y(t.geometry) AS lat,
+                    ST_Distance(t.geom_l93, p.geom)::int AS distance_m,
+                    t.price_level, t.place_type, t.rating, t.user_rating_count,
+                    t.longueur, t.largeur,
                     COALESCE(NULLIF(t.siret, ''), t.id::text) AS group_key
-                FROM terrasses t
-                LEFT JOIN horizon_profiles hp ON hp.terrasse_id = t.id
-                WHERE ST_DWithin(
-                    t.geometry::geography,
-                    ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
-                    :radius
-                )
+                FROM p
+                JOIN terrasses t ON ST_DWithin(t.geom_l93, p.geom, :radius)
             ),
             ranked AS (
-                SELECT *,
+                SELECT
+                    nearby.*,
                     ROW_NUMBER() OVER (
                         PARTITION BY group_key
                         ORDER BY nom_commercial IS NOT NULL DESC, distance_m, id
                     ) AS rn
                 FROM nearby
-            )
-            SELECT
-                r.id, r.nom, r.nom_commercial, r.adresse, r.lon, r.lat,
-                r.distance_m, r.price_level, r.place_type, r.rating,
-                r.user_rating_count, r.profile,
-                r.group_key,
-                agg.terrasse_count,
-                agg.surface_m2,
-                agg.all_ids,
-                agg.all_profiles,
-                agg.all_lats,
-                agg.all_lons
-            FROM ranked r
-            JOIN (
+            ),
+            groups AS (
                 SELECT
                     group_key,
                     COUNT(*) AS terrasse_count,
                     ROUND(SUM(COALESCE(longueur, 0) * COALESCE(largeur, 0))::numeric, 1) AS surface_m2,
-                    array_agg(id ORDER BY id) AS all_ids,
-                    array_agg(profile ORDER BY id) AS all_profiles,
-                    array_agg(lat ORDER BY id) AS all_lats,
-                    array_agg(lon ORDER BY id) AS all_lons
+                    array_agg(id ORDER BY id) AS all_ids
                 FROM nearby
                 GROUP BY group_key
-            ) agg ON agg.group_key = r.group_key
+            )
+            SELECT
+                r.id, r.nom, r.nom_commercial, r.adresse, r.lon, r.lat, r.distance_m,
+                r.price_level, r.place_type, r.rating, r.user_rating_count,
+                CASE WHEN e.profiled_ids = live.profiled_ids
+                    THEN e.union_profile ELSE lu.union_profile END AS profile,
+                r.group_key,
+                g.terrasse_count,
+                g.surface_m2,
+                g.all_ids,
+                live.profiled_ids
+            FROM ranked r
+            JOIN groups g USING (group_key)
+            LEFT JOIN etablissements e ON e.group_key = r.group_key
+            LEFT JOIN LATERAL (
+                SELECT COALESCE(array_agg(m.id ORDER BY m.id), '{}') AS profiled_ids
+                FROM terrasses m
+                JOIN horizon_profiles hp ON hp.terrasse_id = m.id
+                WHERE (m.id = r.id OR m.siret = r.group_key)
+                  AND COALESCE(NULLIF(m.siret, ''), m.id::text) = r.group_key
+            ) live ON true
+            LEFT JOIN LATERAL (
+                SELECT array_agg(elevation ORDER BY azimuth) AS union_profile
+                FROM (
+                    SELECT u.azimuth, MIN(u.elevation) AS elevation
+                    FROM horizon_profiles hp
+                    CROSS JOIN LATERAL unnest(hp.profile) WITH ORDINALITY AS u(elevation, azimuth)
+                    WHERE e.profiled_ids IS DISTINCT FROM live.profiled_ids
+                      AND hp.terrasse_id = ANY(live.profiled_ids)
+                    GROUP BY u.azimuth
+                ) per_azimuth
+            ) lu ON true
             WHERE r.rn = 1
-            ORDER BY r.distance_m
+            ORDER BY r.distance_m, r.id
             LIMIT :limit
         """),
         {"lat": lat, "lon": lon, "radius": radius_m, "limit": limit},
     )
     return result.fetchall()
+
+
+async def get_sun_intervals(db: AsyncSession, terrasse_ids: list[int], target_date) -> dict[int, list[int]]:
+    """Fetch precomputed sunny intervals for terrasses on a date.
+
+    Returns {terrasse_id: [start, end, ...]} for the ids that have a row.
+    """
+    if not terrasse_ids:
+        return {}
+    result = await db.execute(
+        text("""
+            SELECT terrasse_id, intervals
+            FROM sun_intervals
+            WHERE terrasse_id = ANY(:ids) AND date = :d
+        """),
+        {"ids": list(terrasse_ids), "d": target_date},
+    )
+    return {r.terrasse_id: list(r.intervals) for r in result.fetchall()}
@@ -0,0 +1,14 @@
+"""Runtime metrics of the in-process caches (per worker)."""
+import os
+
+from fastapi import APIRouter
+
+from app.services.nearby import nearby_cache_metrics
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+@router.get("/nearby-cache")
+async def nearby_cache():
+    """Hit rate and compute time saved by the quantized nearby cache."""
+    return {"pid": os.getpid(), **nearby_cache_metrics()}
@@ -23,6 +23,8 @@ async def get_poster(
     If the terrace belongs to an establishment with multiple terrasses (same SIRET),
     the poster uses the union of all horizon profiles and aggregated surface.
     """
+    # Establishment aggregates come from the etablissements view; a terrasse
+    # added since its last refresh falls back to its own row
     result = await db.execute(
         text("""
             SELECT
@@ -32,11 +34,16 @@ async def get_poster(
                 t.arrondissement,
                 ST_X(t.geometry) AS lon,
                 ST_Y(t.geometry) AS lat,
-                t.longueur,
-                t.largeur,
-                t.siret,
-                hp.profile
+                COALESCE(e.terrasse_count, 1) AS terrasse_count,
+                COALESCE(
+                    e.surface_m2,
+                    COALESCE(t.longueur, 0) * COALESCE(t.largeur, 0)
+                ) AS surface_m2,
+                -- Union profile of the establishment (element-wise min of its members')
+                COALESCE(e.union_profile, hp.profile) AS profile
             FROM terrasses t
+            LEFT JOIN etablissements e
+                ON e.group_key = COALESCE(NULLIF(t.siret, ''), t.id::text)
             LEFT JOIN horizon_profiles hp ON hp.terrasse_id = t.id
             WHERE t.id = :id
         """),
@@ -47,34 +54,8 @@ async def get_poster(
     if row is None:
         raise HTTPException(status_code=404, detail="Terrasse not found")
 
-    # Collect all profiles and surface for siblings (same SIRET)
-    profiles = []
-    total_surface = 0.0
-    terrasse_count = 1
-
-    if row.siret and row.siret.strip():
-        siblings = await db.execute(
-            text("""
-                SELECT
-                    t.longueur, t.largeur, hp.profile
-                FROM terrasses t
-                LEFT JOIN horizon_profiles hp ON hp.terrasse_id = t.id
-                WHERE t.siret = :siret AND t.siret != ''
-            """),
-            {"siret": row.siret},
-        )
-        sibling_rows = siblings.fetchall()
-        terrasse_count = len(sibling_rows)
-        for sib in sibling_rows:
-            p = sib.profile if sib.profile is not None else [0.0] * 360
-            profiles.append(p)
-            if sib.longueur and sib.largeur:
-                total_surface += sib.longueur * sib.largeur
-    else:
-        profile = row.profile if row.profile is not None else [0.0] * 360
-        profiles.append(profile)
-        if row.longueur and row.largeur:
-            total_surface = row.longueur * row.largeur
+    total_surface = float(row.surface_m2 or 0)
+    terrasse_count = row.terrasse_count
 
     poster_year = year or date.today().year
     surface = round(total_surface, 1) if total_surface > 0 else None
@@ -92,7 +73,7 @@ async def get_poster(
         address=address,
         lat=row.lat,
         lon=row.lon,
-        profiles=profiles,
+        profile=row.profile,
         year=poster_year,
         qr_url=qr_url,
         surface_m2=surface,
@@ -1,9 +1,9 @@
 """Proxy for Google Street View Static API (keeps the key server-side)."""
-import httpx
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import Response
 
 from app.config import settings
+from app.dependencies import http_client
 
 router = APIRouter(tags=["streetview"])
 
@@ -18,7 +18,7 @@ async def streetview(
     if not settings.GOOGLE_STREETVIEW_KEY:
         raise HTTPException(status_code=503, detail="Street View non configuré.")
 
-    async with httpx.AsyncClient(timeout=10) as client:
+    async with http_client() as client:
         resp = await client.get(STREETVIEW_URL, params={
             "size": "600x400",
             "location": f"{lat},{lon}",
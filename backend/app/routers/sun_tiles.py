@@ -0,0 +1,56 @@
+"""Binary sun-status tiles for the map time slider."""
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+
+from app.dependencies import get_redis
+from app.services.sun_tiles import TILE_ZOOM, get_sun_tile, tile_etag
+from app.services.terrasse_index import get_terrasse_index
+from app.services.timeline_cache import etag_matches
+
+router = APIRouter(prefix="/api/sun-tiles", tags=["sun-tiles"])
+
+MAX_DAYS_AWAY = 366
+
+
+@router.get("/{date_str}/{z}/{x}/{y}.bin")
+async def sun_tile(
+    request: Request,
+    date_str: str,
+    z: int,
+    x: int,
+    y: int,
+    redis=Depends(get_redis),
+) -> Response:
+    """Terrasses of a web-mercator tile with their sun status per 15-min slot.
+
+    See app.services.sun_tiles for the binary layout. Only zoom TILE_ZOOM
+    exists; the client requests the tiles covering its viewport at that zoom.
+
+    The URL does not change when the terrasse index is rebuilt: caches
+    revalidate every use against the ETag (index version), which is a 304
+    without reading the tile while the index is the same.
+    """
+    try:
+        target_date = date.fromisoformat(date_str)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid date")
+    if abs((target_date - date.today()).days) > MAX_DAYS_AWAY:
+        raise HTTPException(status_code=422, detail="Date out of range")
+    if z != TILE_ZOOM:
+        raise HTTPException(status_code=404, detail=f"Tiles only exist at zoom {TILE_ZOOM}")
+
+    index = get_terrasse_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Index not ready")
+
+    headers = {
+        "ETag": tile_etag(index.version, target_date, x, y),
+        "Cache-Control": "public, no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    data = await get_sun_tile(index, target_date, x, y, redis)
+    return Response(content=data, media_type="application/octet-stream", headers=headers)
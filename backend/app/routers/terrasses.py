@@ -3,6 +3,7 @@ from datetime import date, datetime
 from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
@@ -10,16 +11,26 @@ from app.dependencies import get_redis
 from app.i18n import get_lang
 from app.repositories.terrasse import (
     search_terrasses as repo_search,
-    get_with_profile,
+    get_group_with_profiles,
     find_nearby,
-    find_siblings,
 )
 from app.schemas.nearby import NearbyResponse
 from app.schemas.terrasse import TerrasseSearchResult
 from app.schemas.timeline import SiblingTerrasse, TimelineResponse
-from app.services.horizon_cache import get_cached_profile
+from app.services.horizon_cache import get_group_profile
+from app.services.meteo import get_hourly_weather_entry, weather_is_final
 from app.services.nearby import find_nearby_terrasses
+from app.services.sun_intervals import group_intervals
+from app.services.terrasse_index import get_terrasse_index
 from app.services.timeline import build_timeline
+from app.services.timeline_cache import (
+    cache_control,
+    etag_for,
+    etag_matches,
+    get_cached_timeline,
+    set_cached_timeline,
+    timeline_cache_key,
+)
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 
@@ -32,8 +43,16 @@ async def search(
     limit: int = Query(10, le=20),
     db: AsyncSession = Depends(get_db),
 ):
-    """Search terrasses by name or address (trigram similarity)."""
-    rows = await repo_search(db, q, limit)
+    """Search terrasses by name or address (trigram similarity).
+
+    Served from the in-process search index once built (no database round
+    trip per keystroke), else by the SQL query.
+    """
+    index = get_terrasse_index()
+    if index is not None:
+        rows = index.search.search(q, limit)
+    else:
+        rows = await repo_search(db, q, limit)
     return [
         TerrasseSearchResult(
             id=r.id, nom=r.nom, nom_commercial=r.nom_commercial,
@@ -61,37 +80,94 @@ async def get_timeline(
 
     If the terrace belongs to an establishment with multiple terrasses (same SIRET),
     the timeline uses union semantics: a slot is sunny if ANY terrace is sunny.
+
+    Responses are cached whole and carry an ETag (see services.timeline_cache).
     """
-    row = await get_with_profile(db, terrasse_id)
+    target_date = date.fromisoformat(date_str) if date_str else date.today()
+    lang = get_lang(request)
+
+    # Group and position from the in-process index when built, else from the DB
+    index = get_terrasse_index()
+    position = index.position(terrasse_id) if index is not None else None
+    group_rows = None
+    if position is not None:
+        group_key = index.group_keys[position]
+        lat, lon = float(index.lats[position]), float(index.lons[position])
+    else:
+        group_rows = await get_group_with_profiles(db, terrasse_id, target_date)
+        row = next((r for r in group_rows if r.id == terrasse_id), None)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Terrasse not found")
+        group_key = row.siret if row.siret and row.siret.strip() else str(row.id)
+        lat, lon = row.lat, row.lon
+
+    # Weather first: its version is part of the cache key
+    try:
+        weather, fetched_at = await get_hourly_weather_entry(lat, lon, target_date, redis)
+    except Exception:
+        weather, fetched_at = {}, None
+
+    cache_key = timeline_cache_key(
+        group_key, terrasse_id, target_date, lang, fetched_at,
+        index.version if index is not None else "",
+    )
+    headers = {
+        "ETag": etag_for(cache_key),
+        "Cache-Control": cache_control(
+            fetched_at is not None and weather_is_final(target_date, fetched_at)
+        ),
+        "Vary": "Accept-Language",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    body = await get_cached_timeline(redis, cache_key)
+    if body is None:
+        if group_rows is None:
+            group_rows = await get_group_with_profiles(db, terrasse_id, target_date)
+        response = await _build_timeline_response(
+            terrasse_id, group_rows, target_date, lang, redis, weather,
+        )
+        body = response.model_dump_json().encode()
+        await set_cached_timeline(redis, cache_key, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _build_timeline_response(
+    terrasse_id: int,
+    group_rows: list,
+    target_date: date,
+    lang: str,
+    redis,
+    weather: dict,
+) -> TimelineResponse:
+    row = next((r for r in group_rows if r.id == terrasse_id), None)
     if row is None:
         raise HTTPException(status_code=404, detail="Terrasse not found")
 
-    profile = await get_cached_profile(redis, terrasse_id, row.profile)
-    target_date = date.fromisoformat(date_str) if date_str else date.today()
+    # Union profile of the establishment: one profile check per slot
+    profile = await get_group_profile(redis, group_rows)
 
-    # Find sibling terrasses (same SIRET)
     siblings_rows = []
-    extra_profiles = []
     surface_totale = 0.0
 
     if row.siret and row.siret.strip():
-        siblings_rows = await find_siblings(db, row.siret)
-        for sib in siblings_rows:
-            s_surface = (sib.longueur or 0) * (sib.largeur or 0)
-            surface_totale += s_surface
-            if sib.id != terrasse_id:
-                sib_profile = await get_cached_profile(redis, sib.id, sib.profile)
-                extra_profiles.append((sib_profile, sib.lat, sib.lon))
+        siblings_rows = group_rows
+        surface_totale = sum((sib.longueur or 0) * (sib.largeur or 0) for sib in siblings_rows)
     else:
         # Single terrasse, no siblings
-        s_surface = (row.longueur or 0) * (row.largeur or 0)
-        surface_totale = s_surface
+        surface_totale = (row.longueur or 0) * (row.largeur or 0)
+
+    # Precomputed sunny intervals (None unless available for every profiled
+    # terrasse: compute_sun_intervals writes none for the others)
+    intervals = group_intervals([r.intervals for r in group_rows if r.profile is not None])
 
-    lang = get_lang(request)
     timeline = await build_timeline(
         profile=profile, lat=row.lat, lon=row.lon,
         target_date=target_date, redis=redis, lang=lang,
-        extra_profiles=extra_profiles if extra_profiles else None,
+        intervals=intervals,
+        weather=weather,
     )
 
     # Build siblings list for the response
@@ -127,6 +203,7 @@ async def get_timeline(
         meteo_resume=timeline["meteo_resume"],
         siblings=siblings_out,
         surface_totale_m2=round(surface_totale, 1) if surface_totale > 0 else None,
+        ephemeride=timeline.get("ephemeride"),
     )
 
 
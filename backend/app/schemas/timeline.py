@@ -17,6 +17,16 @@ class BestWindow(BaseModel):
     duree_minutes: int
 
 
+class Ephemeride(BaseModel):
+    lever: str | None = None
+    coucher: str | None = None
+    midi_solaire: str
+    aube_civile: str | None = None
+    crepuscule_civil: str | None = None
+    fin_heure_doree_matin: str | None = None
+    debut_heure_doree_soir: str | None = None
+
+
 class SiblingTerrasse(BaseModel):
     id: int
     adresse: str | None = None
@@ -34,6 +44,7 @@ class TimelineResponse(BaseModel):
     meteo_resume: str
     siblings: list[SiblingTerrasse] | None = None
     surface_totale_m2: float | None = None
+    ephemeride: Ephemeride | None = None
 
 
 from app.schemas.terrasse import TerrasseSearchResult  # noqa: E402
@@ -0,0 +1,152 @@
+"""In-memory building index for batch horizon computation.
+
+Holds every building exterior as packed per-edge coordinate arrays (the
+input of `update_profile_from_edges`) plus an STRtree over the footprints
+in a local metric frame, so the buildings around a terrace are found with
+an in-process query instead of a PostGIS round trip and WKT parsing.
+
+The metric frame is the same equirectangular approximation around Paris
+that the horizon computation uses (M_PER_DEG_LAT / M_PER_DEG_LON_PARIS).
+Over a 200 m radius it agrees with PostGIS geography distances to well
+under a meter.
+
+Built once in the parent process, the arrays are shared with forked Pool
+workers copy-on-write (they are never written after construction). Batch
+jobs work tile by tile: `subset()` of the buildings around one tile keeps
+each worker's queries on a small, cache-friendly set.
+"""
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from app.services.shadow import (
+    BUILDING_SEARCH_RADIUS_M,
+    M_PER_DEG_LAT,
+    M_PER_DEG_LON_PARIS,
+    OBSERVER_HEIGHT_M,
+    building_edges,
+    update_profile_from_edges,
+)
+from app.services.sun import PARIS_LAT, PARIS_LON
+
+_ORIGIN = np.array([PARIS_LON, PARIS_LAT])
+_SCALE = np.array([M_PER_DEG_LON_PARIS, M_PER_DEG_LAT])
+
+
+def to_metric(coords: np.ndarray) -> np.ndarray:
+    """(N, 2) lon/lat → meters east/north of the Paris reference point."""
+    return (coords - _ORIGIN) * _SCALE
+
+
+def from_metric(xy: np.ndarray) -> np.ndarray:
+    """Inverse of `to_metric`."""
+    return xy / _SCALE + _ORIGIN
+
+
+class BuildingIndex:
+    """Packed building edges with a spatial index."""
+
+    def __init__(self, polygons, heights):
+        """
+        Args:
+            polygons: sequence of shapely Polygons in lon/lat (EPSG:4326).
+            heights: building heights in meters, same order.
+        """
+        polygons = np.asarray(polygons, dtype=object)
+        heights = np.asarray(heights, dtype=np.float64)
+
+        # Buildings lower than a seated observer never contribute
+        tall = heights > OBSERVER_HEIGHT_M
+        polygons = polygons[tall]
+        self.heights = heights[tall]
+
+        self.x1, self.y1, self.x2, self.y2, _ = building_edges(polygons, self.heights)
+        # Edges of building i are [edge_offsets[i], edge_offsets[i + 1])
+        edge_counts = np.maximum(shapely.get_num_coordinates(shapely.get_exterior_ring(polygons)) - 1, 0)
+        self.edge_offsets = np.concatenate(([0], np.cumsum(edge_counts)))
+
+        self._metric = shapely.transform(polygons, to_metric)
+        self._tree = STRtree(self._metric)
+
+    def __len__(self) -> int:
+        return len(self.heights)
+
+    def query(self, lat: float, lon: float, radius_m: float = BUILDING_SEARCH_RADIUS_M) -> np.ndarray:
+        """Indices of buildings within `radius_m` of a point (like ST_DWithin)."""
+        point = shapely.points(to_metric(np.array([lon, lat])))
+        return np.sort(self._tree.query(point, predicate="dwithin", distance=radius_m))
+
+    def query_box(self, minx: float, miny: float, maxx: float, maxy: float) -> np.ndarray:
+        """Indices of buildings intersecting a box in the metric frame."""
+        return np.sort(self._tree.query(shapely.box(minx, miny, maxx, maxy)))
+
+    def subset(self, indices: np.ndarray) -> "BuildingIndex":
+        """A smaller index over some of the buildings (no geometry re-parsing)."""
+        sub = BuildingIndex.__new__(BuildingIndex)
+        sub.heights = self.heights[indices]
+        sub.x1, sub.y1, sub.x2, sub.y2, _ = self.edges(indices)
+        counts = self.edge_offsets[indices + 1] - self.edge_offsets[indices]
+        sub.edge_offsets = np.concatenate(([0], np.cumsum(counts)))
+        sub._metric = self._metric[indices]
+        sub._tree = STRtree(sub._metric)
+        return sub
+
+    def edges(self, indices: np.ndarray) -> tuple[np.ndarray, ...]:
+        """(x1, y1, x2, y2, height) per edge of the given buildings."""
+        starts = self.edge_offsets[indices]
+        counts = self.edge_offsets[indices + 1] - starts
+        edge_idx = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return (
+            self.x1[edge_idx], self.y1[edge_idx], self.x2[edge_idx], self.y2[edge_idx],
+            np.repeat(self.heights[indices], counts),
+        )
+
+    def horizon_profile(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float = BUILDING_SEARCH_RADIUS_M,
+    ) -> list[float]:
+        """Horizon profile of a point from the indexed buildings.
+
+        Same result as `compute_horizon_profile_sync` on the buildings a
+        PostGIS radius query returns.
+        """
+        profile = np.zeros(360, dtype=np.float64)
+        update_profile_from_edges(profile, lat, lon, *self.edges(self.query(lat, lon, radius_m)))
+        return profile.tolist()
+
+
+def tile_of(lat: float, lon: float, tile_size_m: float) -> tuple[int, int]:
+    """(column, row) of the square metric tile containing a point."""
+    x, y = to_metric(np.array([lon, lat]))
+    return int(np.floor(x / tile_size_m)), int(np.floor(y / tile_size_m))
+
+
+def tile_bounds(
+    tile: tuple[int, int],
+    tile_size_m: float,
+    halo_m: float = 0.0,
+) -> tuple[float, float, float, float]:
+    """Metric (minx, miny, maxx, maxy) of a tile, grown by `halo_m` on each side.
+
+    With halo_m = BUILDING_SEARCH_RADIUS_M, the buildings intersecting the
+    bounds include every building within range of any point of the tile.
+    """
+    ix, iy = tile
+    return (
+        ix * tile_size_m - halo_m,
+        iy * tile_size_m - halo_m,
+        (ix + 1) * tile_size_m + halo_m,
+        (iy + 1) * tile_size_m + halo_m,
+    )
+
+
+def morton_code(tile: tuple[int, int]) -> int:
+    """Z-order key of a tile: sorting by it keeps neighbouring tiles together."""
+    # Offset to non-negative 16-bit coordinates (±32 km of tiles is plenty)
+    x, y = tile[0] + (1 << 15), tile[1] + (1 << 15)
+    code = 0
+    for bit in range(16):
+        code |= ((x >> bit) & 1) << (2 * bit) | ((y >> bit) & 1) << (2 * bit + 1)
+    return code
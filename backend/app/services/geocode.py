@@ -6,6 +6,8 @@ import logging
 
 import httpx
 
+from app.dependencies import http_client
+
 log = logging.getLogger(__name__)
 
 GEOCODE_URL = "https://data.geopf.fr/geocodage/search"
@@ -22,8 +24,8 @@ async def geocode_address(query: str, limit: int = 5) -> list[dict]:
     }
 
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(GEOCODE_URL, params=params)
+        async with http_client() as client:
+            resp = await client.get(GEOCODE_URL, params=params, timeout=5.0)
             resp.raise_for_status()
             data = resp.json()
     except (httpx.HTTPError, ValueError) as exc:
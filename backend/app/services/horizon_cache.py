@@ -2,12 +2,86 @@
 
 Profiles are FLOAT[360] arrays read on every request but rarely changing.
 Caching reduces DB load significantly for popular terrasses.
+
+Profiles are stored quantized to tenths of a degree as 360 little-endian
+uint16 (720 bytes, raw bytes rather than ~3-4 KB of JSON), behind a bounded
+in-process LRU of the same encoded bytes. Redis is only written when the
+profile is not already known to be cached (write-on-miss).
+
+Recomputing profiles (data/compute_horizon_profiles.py) deletes their Redis
+keys and increments GENERATION_KEY; every process compares it with the
+generation its LRU was filled at, at most every GENERATION_CHECK_SECONDS,
+and clears the LRU when it changed.
 """
-import json
+import time
+from collections import OrderedDict
 
+import numpy as np
 from redis.asyncio import Redis
 
+from app.services.shadow import union_profile
+
 CACHE_TTL = 86400  # 24 hours
+LRU_SIZE = 10_000  # ~7 MB of encoded profiles per process
+GENERATION_KEY = "horizon:generation"
+GENERATION_CHECK_SECONDS = 60  # Staleness bound of the LRU after a recompute
+
+_DTYPE = np.dtype("<u2")
+_ENCODED_SIZE = 360 * _DTYPE.itemsize
+
+
+def encode_profile(profile: list[float]) -> bytes:
+    """Quantize a profile to tenths of a degree (uint16)."""
+    tenths = np.rint(np.asarray(profile, dtype=np.float64) * 10)
+    return np.clip(tenths, 0, np.iinfo(_DTYPE).max).astype(_DTYPE).tobytes()
+
+
+def decode_profile(data: bytes) -> list[float]:
+    return (np.frombuffer(data, dtype=_DTYPE) / 10.0).tolist()
+
+
+class _LRU:
+    """Bounded mapping terrasse_id → encoded profile, least recently used out."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[int, bytes] = OrderedDict()
+        # GENERATION_KEY value the entries were read at, and when it was checked
+        self.generation: bytes | None = None
+        self.checked_at = time.monotonic()
+
+    def get(self, key: int) -> bytes | None:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: int, value: bytes) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key: int) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_lru = _LRU(LRU_SIZE)
+
+
+async def _check_generation(redis: Redis | None) -> None:
+    """Clear the in-process tier if profiles were recomputed since it was filled."""
+    now = time.monotonic()
+    if not redis or now - _lru.checked_at < GENERATION_CHECK_SECONDS:
+        return
+    _lru.checked_at = now
+    generation = await redis.get(GENERATION_KEY)
+    if generation != _lru.generation:
+        _lru.clear()
+        _lru.generation = generation
 
 
 async def get_cached_profile(
@@ -25,25 +99,110 @@ async def get_cached_profile(
     Returns:
         The profile as list[float], or [0.0]*360 if none exists
     """
+    key = f"horizon:{terrasse_id}"
+    await _check_generation(redis)
+
     if db_profile is not None:
-        # Cache this profile for next time
-        if redis:
-            key = f"horizon:{terrasse_id}"
-            await redis.set(key, json.dumps(db_profile), ex=CACHE_TTL)
+        # Cache this profile for next time, unless it already is
+        encoded = encode_profile(db_profile)
+        if _lru.get(terrasse_id) != encoded:
+            _lru.put(terrasse_id, encoded)
+            if redis:
+                await redis.set(key, encoded, ex=CACHE_TTL)
         return db_profile
 
-    # No profile from DB — check cache
-    if redis:
-        key = f"horizon:{terrasse_id}"
+    # No profile from DB — check in-process tier, then Redis
+    encoded = _lru.get(terrasse_id)
+    if encoded is None and redis:
         cached = await redis.get(key)
-        if cached:
-            return json.loads(cached)
+        if cached and len(cached) == _ENCODED_SIZE:
+            encoded = cached
+            _lru.put(terrasse_id, encoded)
+    if encoded is not None:
+        return decode_profile(encoded)
 
     # No profile anywhere — default flat horizon
     return [0.0] * 360
 
 
+async def get_cached_profiles(
+    redis: Redis | None,
+    items: list[tuple[int, list[float] | None]],
+) -> dict[int, list[float]]:
+    """Batched `get_cached_profile` for a group of terrasses.
+
+    Args:
+        redis: Redis client (or None to skip caching)
+        items: (terrasse_id, profile from database or None) pairs
+
+    Returns:
+        {terrasse_id: profile}, with the same fallbacks as get_cached_profile.
+        All Redis writes and reads go out in a single pipelined round trip.
+    """
+    profiles: dict[int, list[float]] = {}
+    writes: list[tuple[int, bytes]] = []
+    misses: list[int] = []
+    await _check_generation(redis)
+
+    for terrasse_id, db_profile in items:
+        if db_profile is not None:
+            profiles[terrasse_id] = db_profile
+            encoded = encode_profile(db_profile)
+            if _lru.get(terrasse_id) != encoded:
+                _lru.put(terrasse_id, encoded)
+                writes.append((terrasse_id, encoded))
+            continue
+
+        encoded = _lru.get(terrasse_id)
+        if encoded is not None:
+            profiles[terrasse_id] = decode_profile(encoded)
+        else:
+            misses.append(terrasse_id)
+
+    if redis and (writes or misses):
+        pipe = redis.pipeline(transaction=False)
+        for terrasse_id, encoded in writes:
+            pipe.set(f"horizon:{terrasse_id}", encoded, ex=CACHE_TTL)
+        if misses:
+            pipe.mget([f"horizon:{terrasse_id}" for terrasse_id in misses])
+        results = await pipe.execute()
+
+        if misses:
+            for terrasse_id, cached in zip(misses, results[-1]):
+                if cached and len(cached) == _ENCODED_SIZE:
+                    _lru.put(terrasse_id, cached)
+                    profiles[terrasse_id] = decode_profile(cached)
+
+    # No profile anywhere — default flat horizon
+    for terrasse_id in misses:
+        profiles.setdefault(terrasse_id, [0.0] * 360)
+    return profiles
+
+
+async def get_group_profile(redis: Redis | None, group_rows: list) -> list[float]:
+    """Union horizon profile of a terrasse and its siblings.
+
+    Args:
+        redis: Redis client (or None to skip caching)
+        group_rows: rows of `repositories.terrasse.get_group_with_profiles`
+
+    The union stored in `etablissements` is used as-is when it was computed
+    from exactly the members profiled now. Otherwise (the view has not been
+    refreshed since a profile or a sibling changed) it is taken here.
+    """
+    profiled = [r for r in group_rows if r.profile is not None]
+    stored = group_rows[0].union_profile if group_rows else None
+    if stored is not None and list(group_rows[0].union_ids or []) == [r.id for r in profiled]:
+        return list(stored)
+    if profiled:
+        return union_profile([r.profile for r in profiled])
+    # No profile in the database: cached ones, else a flat horizon
+    profiles = await get_cached_profiles(redis, [(r.id, None) for r in group_rows])
+    return union_profile(list(profiles.values()))
+
+
 async def invalidate_profile(redis: Redis | None, terrasse_id: int) -> None:
     """Invalidate cached profile (call after recompute)."""
+    _lru.discard(terrasse_id)
     if redis:
         await redis.delete(f"horizon:{terrasse_id}")
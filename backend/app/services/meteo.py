@@ -1,62 +1,163 @@
-"""Open-Meteo weather data with Redis caching.
+"""Open-Meteo weather data with a two-tier cache.
 
 Fetches hourly cloud cover, direct radiation, and precipitation probability.
 Cache is grid-rounded to ~5km (0.05°) — Paris fits in ~4 cells.
+
+L1 is Redis, L2 the `meteo_cache` table, so a Redis flush or restart does
+not refetch every cell. Freshness follows `fetched_at`: forecasts are
+refetched after FORECAST_MAX_AGE, while a past date fetched once the day was
+over never changes and is kept permanently (historic timelines never call
+the network). Database failures only disable the L2.
+
+Refreshes are single-flight per cell and date: one task per process (shared
+by the concurrent callers) and one process at a time (Redis SET NX lock,
+the others wait for its result). Up to STALE_MAX_AGE, an expired forecast is
+served while a background task refreshes it; if Open-Meteo is down, a stale
+forecast is served rather than an error.
 """
+import asyncio
 import json
-from datetime import date
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 import httpx
 from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import settings
+from app.database import async_session
+from app.dependencies import http_client
+
+logger = logging.getLogger(__name__)
 
 OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
 
 # Round coordinates to 0.05° grid for cache deduplication
 GRID_RESOLUTION = 0.05
 
+FORECAST_MAX_AGE = timedelta(hours=1)
+STALE_MAX_AGE = timedelta(hours=6)  # Served while a refresh runs in the background
+MIN_REDIS_TTL = 60
+PAST_REDIS_TTL = 30 * 86400  # Final data: Redis keeps it a month, the DB forever
+
+LOCK_TTL = 30  # Seconds; longer than an Open-Meteo request with its timeout
+LOCK_WAIT = 5.0  # Seconds to wait for another process's fetch before our own
+LOCK_POLL = 0.1
+
+PARIS_TZ = ZoneInfo("Europe/Paris")
+
+FRESH, STALE, EXPIRED = "fresh", "stale", "expired"
+
 
 def _round_to_grid(val: float) -> float:
     return round(round(val / GRID_RESOLUTION) * GRID_RESOLUTION, 3)
 
 
-async def get_hourly_weather(
-    lat: float,
-    lon: float,
-    target_date: date,
-    redis: Redis | None = None,
-) -> dict[str, dict]:
-    """Fetch hourly weather for a location and date.
+def _cache_key(lat_grid: float, lon_grid: float, target_date: date) -> str:
+    return f"meteo:{lat_grid}:{lon_grid}:{target_date.isoformat()}"
 
-    Returns dict keyed by "HH:MM" with values:
-        {"cloud_cover": int, "direct_radiation": float, "precipitation_probability": int}
-    """
-    lat_grid = _round_to_grid(lat)
-    lon_grid = _round_to_grid(lon)
-    cache_key = f"meteo:{lat_grid}:{lon_grid}:{target_date.isoformat()}"
 
-    # Try Redis cache
-    if redis:
-        cached = await redis.get(cache_key)
-        if cached:
-            return json.loads(cached)
+def _utcnow() -> datetime:
+    """Naive UTC, like the `fetched_at` column."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
-    # Fetch from Open-Meteo
-    params = {
-        "latitude": lat_grid,
-        "longitude": lon_grid,
-        "hourly": "cloud_cover,direct_radiation,precipitation_probability,uv_index",
-        "timezone": "Europe/Paris",
-        "start_date": target_date.isoformat(),
-        "end_date": target_date.isoformat(),
-    }
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(OPEN_METEO_URL, params=params)
-        resp.raise_for_status()
-        data = resp.json()
+def _day_end_utc(target_date: date) -> datetime:
+    """End of a Paris day as naive UTC."""
+    end = datetime.combine(target_date + timedelta(days=1), time(0), PARIS_TZ)
+    return end.astimezone(timezone.utc).replace(tzinfo=None)
+
 
-    # Reshape into {hour: {cloud_cover, direct_radiation, precipitation_probability}}
-    hourly: dict[str, dict] = {}
+def weather_is_final(target_date: date, fetched_at: datetime) -> bool:
+    """True if the data was fetched after the day was over (it never changes)."""
+    return fetched_at >= _day_end_utc(target_date)
+
+
+def _freshness(target_date: date, fetched_at: datetime, now: datetime) -> str:
+    if weather_is_final(target_date, fetched_at):
+        return FRESH
+    age = now - fetched_at
+    if age < FORECAST_MAX_AGE:
+        return FRESH
+    return STALE if age < STALE_MAX_AGE else EXPIRED
+
+
+def _redis_ttl(target_date: date, fetched_at: datetime, now: datetime) -> int | None:
+    """Seconds an entry stays servable (fresh or stale), or None if expired."""
+    if weather_is_final(target_date, fetched_at):
+        return PAST_REDIS_TTL
+    remaining = (fetched_at + STALE_MAX_AGE - now).total_seconds()
+    if remaining <= 0:
+        return None
+    return max(int(remaining), MIN_REDIS_TTL)
+
+
+def _envelope(hourly_json: str, fetched_at: datetime) -> str:
+    """Redis value: the hourly data with its fetch time."""
+    return f'{{"fetched_at": "{fetched_at.isoformat()}", "hourly": {hourly_json}}}'
+
+
+async def _read_l1(redis: Redis | None, key: str) -> tuple[dict, datetime] | None:
+    if not redis:
+        return None
+    cached = await redis.get(key)
+    if not cached:
+        return None
+    entry = json.loads(cached)
+    if "fetched_at" not in entry:
+        return None  # Pre-envelope value
+    return entry["hourly"], datetime.fromisoformat(entry["fetched_at"])
+
+
+async def _write_l1(
+    redis: Redis | None, key: str, target_date: date, hourly_json: str, fetched_at: datetime,
+) -> None:
+    ttl = _redis_ttl(target_date, fetched_at, _utcnow())
+    if redis and ttl:
+        await redis.set(key, _envelope(hourly_json, fetched_at), ex=ttl)
+
+
+async def _read_stored(lat_grid: float, lon_grid: float, target_date: date) -> tuple[str, datetime] | None:
+    """(hourly JSON, fetched_at) from meteo_cache, or None (also on DB failure)."""
+    try:
+        async with async_session() as session:
+            result = await session.execute(text("""
+                SELECT hourly_data::text AS hourly, fetched_at
+                FROM meteo_cache
+                WHERE lat_grid = :lat AND lon_grid = :lon AND date = :date
+            """), {"lat": lat_grid, "lon": lon_grid, "date": target_date})
+            row = result.first()
+    except (SQLAlchemyError, OSError) as exc:
+        logger.warning("meteo_cache unavailable, reading through: %s", exc)
+        return None
+    return (row.hourly, row.fetched_at) if row else None
+
+
+async def _store(
+    lat_grid: float, lon_grid: float, days: dict[date, str], fetched_at: datetime,
+) -> None:
+    """Upsert the hourly JSON of one cell for some dates."""
+    try:
+        async with async_session() as session:
+            await session.execute(text("""
+                INSERT INTO meteo_cache (lat_grid, lon_grid, date, hourly_data, fetched_at)
+                VALUES (:lat, :lon, :date, CAST(:data AS jsonb), :fetched_at)
+                ON CONFLICT ON CONSTRAINT uq_meteo_cache_location_date
+                DO UPDATE SET hourly_data = EXCLUDED.hourly_data, fetched_at = EXCLUDED.fetched_at
+            """), [
+                {"lat": lat_grid, "lon": lon_grid, "date": d, "data": data, "fetched_at": fetched_at}
+                for d, data in days.items()
+            ])
+            await session.commit()
+    except (SQLAlchemyError, OSError) as exc:
+        logger.warning("meteo_cache unavailable, not persisted: %s", exc)
+
+
+def _split_days(data: dict) -> dict[date, dict[str, dict]]:
+    """Open-Meteo hourly arrays → {date: {"HH:MM": {cloud_cover, ...}}}."""
+    days: dict[date, dict[str, dict]] = {}
     times = data["hourly"]["time"]
     cloud = data["hourly"]["cloud_cover"]
     radiation = data["hourly"]["direct_radiation"]
@@ -64,21 +165,245 @@ async def get_hourly_weather(
     uv = data["hourly"]["uv_index"]
 
     for i, time_str in enumerate(times):
-        hour_key = time_str.split("T")[1][:5]  # "HH:MM"
-        hourly[hour_key] = {
+        day_str, hour_str = time_str.split("T")
+        hourly = days.setdefault(date.fromisoformat(day_str), {})
+        hourly[hour_str[:5]] = {  # "HH:MM"
             "cloud_cover": cloud[i],
             "direct_radiation": radiation[i],
             "precipitation_probability": precip[i],
             "uv_index": uv[i],
         }
+    return days
 
-    # Cache for 1 hour
-    if redis:
-        await redis.set(cache_key, json.dumps(hourly), ex=3600)
 
+async def _fetch_days(lat_grid: float, lon_grid: float, **range_params) -> dict[date, dict[str, dict]]:
+    """Hourly weather of a cell from Open-Meteo, split per day.
+
+    range_params: start_date/end_date, or forecast_days.
+    """
+    params = {
+        "latitude": lat_grid,
+        "longitude": lon_grid,
+        "hourly": "cloud_cover,direct_radiation,precipitation_probability,uv_index",
+        "timezone": "Europe/Paris",
+        **range_params,
+    }
+
+    async with http_client() as client:
+        resp = await client.get(OPEN_METEO_URL, params=params)
+        resp.raise_for_status()
+        return _split_days(resp.json())
+
+
+async def _fetch(lat_grid: float, lon_grid: float, target_date: date) -> dict[str, dict]:
+    """Hourly weather for one day from Open-Meteo."""
+    days = await _fetch_days(
+        lat_grid, lon_grid,
+        start_date=target_date.isoformat(), end_date=target_date.isoformat(),
+    )
+    return days.get(target_date, {})
+
+
+async def _fetch_and_store(
+    lat_grid: float, lon_grid: float, target_date: date, redis: Redis | None,
+) -> tuple[dict[str, dict], datetime]:
+    """Fetch a cell from Open-Meteo into both tiers, one process at a time."""
+    key = _cache_key(lat_grid, lon_grid, target_date)
+    lock_key = f"lock:{key}"
+    locked = bool(redis) and bool(await redis.set(lock_key, b"1", nx=True, ex=LOCK_TTL))
+    if redis and not locked:
+        # Another process is fetching this cell: wait for its result
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LOCK_WAIT
+        while loop.time() < deadline:
+            await asyncio.sleep(LOCK_POLL)
+            entry = await _read_l1(redis, key)
+            if entry and _freshness(target_date, entry[1], _utcnow()) == FRESH:
+                return entry
+        # It did not finish in time: fetch anyway
+
+    try:
+        fetched_at = _utcnow()
+        hourly = await _fetch(lat_grid, lon_grid, target_date)
+        hourly_json = json.dumps(hourly)
+        await _store(lat_grid, lon_grid, {target_date: hourly_json}, fetched_at)
+        await _write_l1(redis, key, target_date, hourly_json, fetched_at)
+        return hourly, fetched_at
+    finally:
+        if locked:
+            await redis.delete(lock_key)
+
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _refresh(
+    lat_grid: float, lon_grid: float, target_date: date, redis: Redis | None,
+) -> asyncio.Task:
+    """The in-flight refresh of a cell, started if there is none."""
+    key = _cache_key(lat_grid, lon_grid, target_date)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_and_store(lat_grid, lon_grid, target_date, redis))
+        _inflight[key] = task
+
+        def _done(t: asyncio.Task) -> None:
+            _inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is not None:
+                logger.warning("Open-Meteo refresh failed for %s: %s", key, t.exception())
+
+        task.add_done_callback(_done)
+    return task
+
+
+async def get_hourly_weather_entry(
+    lat: float,
+    lon: float,
+    target_date: date,
+    redis: Redis | None = None,
+) -> tuple[dict[str, dict], datetime]:
+    """`get_hourly_weather` with the time the data was fetched (naive UTC).
+
+    The fetch time identifies the weather version, for caches of what is
+    derived from it.
+    """
+    lat_grid = _round_to_grid(lat)
+    lon_grid = _round_to_grid(lon)
+    key = _cache_key(lat_grid, lon_grid, target_date)
+
+    # L1: Redis, then L2: meteo_cache
+    entry = await _read_l1(redis, key)
+    if entry is None:
+        stored = await _read_stored(lat_grid, lon_grid, target_date)
+        if stored is not None:
+            hourly_json, fetched_at = stored
+            entry = json.loads(hourly_json), fetched_at
+            await _write_l1(redis, key, target_date, hourly_json, fetched_at)
+
+    if entry is not None:
+        state = _freshness(target_date, entry[1], _utcnow())
+        if state == FRESH:
+            return entry
+        if state == STALE:
+            _refresh(lat_grid, lon_grid, target_date, redis)  # Stale-while-revalidate
+            return entry
+
+    # Network (shared with concurrent callers), falling back to an expired forecast
+    try:
+        return await asyncio.shield(_refresh(lat_grid, lon_grid, target_date, redis))
+    except httpx.HTTPError:
+        if entry is None:
+            raise
+        logger.warning("Open-Meteo unavailable, serving forecast from %s", entry[1])
+        return entry
+
+
+async def get_hourly_weather(
+    lat: float,
+    lon: float,
+    target_date: date,
+    redis: Redis | None = None,
+) -> dict[str, dict]:
+    """Fetch hourly weather for a location and date.
+
+    Returns dict keyed by "HH:MM" with values:
+        {"cloud_cover": int, "direct_radiation": float, "precipitation_probability": int}
+    """
+    hourly, _fetched_at = await get_hourly_weather_entry(lat, lon, target_date, redis)
     return hourly
 
 
+# Paris intra-muros bounding box, covered by the prefetcher
+PARIS_BBOX = (48.815, 2.224, 48.902, 2.470)  # (lat_min, lon_min, lat_max, lon_max)
+FORECAST_DAYS = 16  # Open-Meteo's full forecast window, in one call per cell
+PREFETCH_LOCK_KEY = "lock:meteo:prefetch"
+
+
+def paris_cells() -> list[tuple[float, float]]:
+    """Grid cells (lat_grid, lon_grid) touching Paris."""
+    lat_min, lon_min, lat_max, lon_max = PARIS_BBOX
+    lats = sorted({_round_to_grid(lat_min), _round_to_grid(lat_max)})
+    lons = sorted({_round_to_grid(lon_min), _round_to_grid(lon_max)})
+    step = GRID_RESOLUTION
+    return [
+        (_round_to_grid(lats[0] + i * step), _round_to_grid(lons[0] + j * step))
+        for i in range(round((lats[-1] - lats[0]) / step) + 1)
+        for j in range(round((lons[-1] - lons[0]) / step) + 1)
+    ]
+
+
+async def prefetch_cell(lat_grid: float, lon_grid: float, redis: Redis | None) -> int:
+    """Fetch the whole forecast window of a cell and cache it day by day."""
+    fetched_at = _utcnow()
+    days = await _fetch_days(lat_grid, lon_grid, forecast_days=FORECAST_DAYS)
+    encoded = {d: json.dumps(hourly) for d, hourly in days.items()}
+    await _store(lat_grid, lon_grid, encoded, fetched_at)
+    if redis:
+        pipe = redis.pipeline(transaction=False)
+        for d, hourly_json in encoded.items():
+            ttl = _redis_ttl(d, fetched_at, fetched_at)
+            pipe.set(_cache_key(lat_grid, lon_grid, d), _envelope(hourly_json, fetched_at), ex=ttl)
+        await pipe.execute()
+    return len(days)
+
+
+async def prefetch_all(redis: Redis | None) -> int:
+    """Refresh every Paris cell, unless another process did it this period.
+
+    Returns the number of (cell, day) entries written.
+    """
+    interval = settings.WEATHER_PREFETCH_MINUTES * 60
+    # Not released: the lock expiring paces the refreshes across processes
+    if redis and not await redis.set(PREFETCH_LOCK_KEY, b"1", nx=True, ex=max(int(interval * 0.9), 1)):
+        return 0
+
+    written = 0
+    for lat_grid, lon_grid in paris_cells():
+        try:
+            written += await prefetch_cell(lat_grid, lon_grid, redis)
+        except (httpx.HTTPError, KeyError, ValueError) as exc:
+            logger.warning("Weather prefetch failed for %s,%s: %s", lat_grid, lon_grid, exc)
+    return written
+
+
+_prefetch_task: asyncio.Task | None = None
+
+
+async def _prefetch_loop(redis: Redis | None) -> None:
+    while True:
+        try:
+            written = await prefetch_all(redis)
+            if written:
+                logger.info("Weather prefetched: %d cell-days", written)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Weather prefetch failed")
+        await asyncio.sleep(settings.WEATHER_PREFETCH_MINUTES * 60)
+
+
+async def start_weather_prefetch(redis: Redis | None) -> None:
+    """Keep every Paris cell fresh in the background (called at startup).
+
+    The period is shorter than FORECAST_MAX_AGE, so entries are replaced
+    before they expire and requests never wait on Open-Meteo.
+    """
+    global _prefetch_task
+    if settings.WEATHER_PREFETCH_MINUTES > 0 and _prefetch_task is None:
+        _prefetch_task = asyncio.create_task(_prefetch_loop(redis))
+
+
+async def stop_weather_prefetch() -> None:
+    global _prefetch_task
+    if _prefetch_task:
+        _prefetch_task.cancel()
+        try:
+            await _prefetch_task
+        except asyncio.CancelledError:
+            pass
+        _prefetch_task = None
+
+
 def weather_status(cloud_cover: int) -> str:
     """Classify weather from cloud cover percentage."""
     if cloud_cover > 80:
@@ -1,65 +1,263 @@
 """Mode 2: Find nearby terrasses and their sun status at a given time.
 
-Queries terrasses within a radius, checks their precomputed horizon profiles
-against the current sun position, and combines with weather data.
+Queries establishments within a radius, stacks their precomputed union
+horizon profiles (one per SIRET group) into one (M, 360) matrix checked
+against the sun track of the next 4 hours in a single comparison, and
+combines with weather data. When the day's sunny intervals have been
+precomputed (`sun_intervals` table, one batched read per request), they
+replace the profile checks.
+
+Once the in-process terrasse index is built, the terrasses and their
+profiles come from memory instead of Postgres, and the sun status is cached
+per 100 m cell and 15-min slot (quantized queries: nearby GPS positions
+share it, only distances and ordering are per request). That path never
+reads Postgres: the time is snapped to the slot the union profiles are
+checked at, so the precomputed intervals would give the same answer.
 
 Supports establishment grouping: multiple terrasses per SIRET are merged,
-and a group is "sunny" if ANY terrace in it is sunny.
+and a group is "sunny" if ANY terrace in it is sunny, i.e. if the sun clears
+the group's union profile.
 """
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple
 from zoneinfo import ZoneInfo
 
+import numpy as np
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repositories.terrasse import find_nearby as repo_find_nearby
+from app.repositories.terrasse import get_sun_intervals
+from app.services.building_index import from_metric, to_metric
 from app.services.meteo import get_hourly_weather, weather_status
-from app.services.shadow import is_sunny
-from app.services.sun import get_sun_position
+from app.services.sun_intervals import is_sunny_at, sun_until, union_intervals
+from app.services.sun_table import MINUTES_PER_DAY, sun_position_at, sun_track, warm_day
+from app.services.terrasse_index import TerrasseIndex, get_terrasse_index
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 
 
-def _is_any_sunny(profiles_coords: list[tuple], sun_alt: float, sun_azi: float) -> bool:
-    """Check if ANY terrace in a group is sunny."""
-    for profile, _lat, _lon in profiles_coords:
-        if profile is not None and is_sunny(profile, sun_alt, sun_azi):
-            return True
-    return False
-
-
-def _estimate_sun_until_group(
-    profiles_coords: list[tuple],
-    from_dt: datetime,
-) -> str | None:
-    """Estimate when ALL terraces in the group lose sun (union: latest time)."""
-    latest = None
-    for profile, lat, lon in profiles_coords:
-        if profile is None:
-            continue
-        end = _estimate_sun_until_single(profile, lat, lon, from_dt)
-        if end is None:
-            # At least one terrace has sun beyond scan window
-            return None
-        if latest is None or end > latest:
-            latest = end
-    return latest
-
-
-def _estimate_sun_until_single(
-    profile: list[float],
-    lat: float,
-    lon: float,
-    from_dt: datetime,
-) -> str | None:
-    """Estimate when a single terrace will lose sun (up to 4h ahead)."""
-    check = from_dt
-    for _ in range(4 * 4):  # 4 hours in 15-min steps
-        check += timedelta(minutes=15)
-        sun_alt, sun_azi = get_sun_position(lat, lon, check)
-        if not is_sunny(profile, sun_alt, sun_azi):
-            return check.strftime("%H:%M")
-    return None
+SUN_UNTIL_STEP_MIN = 15
+SUN_UNTIL_STEPS = 4 * 4  # 4 hours ahead in 15-min steps
+
+
+def _sun_track_ahead(dt: datetime) -> tuple[np.ndarray, np.ndarray]:
+    """Sun (altitude, azimuth) now and at each 15-min step of the next 4 hours.
+
+    Steps past midnight are night (the sun has set long before in Paris).
+    """
+    minutes = dt.hour * 60 + dt.minute + SUN_UNTIL_STEP_MIN * np.arange(SUN_UNTIL_STEPS + 1)
+    in_day = minutes < MINUTES_PER_DAY
+    alt, azi = sun_track(dt.date(), np.minimum(minutes, MINUTES_PER_DAY - 1))
+    alt = np.where(in_day, np.asarray(alt, dtype=np.float64), -90.0)
+    return alt, np.asarray(azi, dtype=np.float64)
+
+
+def _group_sun_status(
+    profiles: np.ndarray,
+    groups: np.ndarray,
+    n_groups: int,
+    sun_alt: np.ndarray,
+    sun_azi: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Sun status of every group of terrasses along a sun track, at once.
+
+    Args:
+        profiles: (M, 360) horizon profiles of the profiled terrasses.
+        groups: (M,) group index of each profile.
+        n_groups: number of groups.
+        sun_alt, sun_azi: (T,) sun track; step 0 is now, then every 15 min.
+
+    Returns:
+        sunny_now: (G,) True if ANY terrace of the group is sunny at step 0.
+        until: (G,) first step at which ALL terraces of the group have lost
+            the sun (union: latest member), or -1 if one keeps it past the
+            track. Only meaningful for groups with at least one profile.
+    """
+    az_idx = np.rint(sun_azi).astype(np.intp) % 360
+    # (M, T): profile elevation in the sun's direction at each step
+    sunny = (sun_alt > 0) & (sun_alt > profiles[:, az_idx])
+
+    sunny_now = np.zeros(n_groups, dtype=bool)
+    np.logical_or.at(sunny_now, groups, sunny[:, 0])
+
+    # First later step without sun, per terrace (T = never within the track)
+    steps = sunny.shape[1]
+    lost = ~sunny[:, 1:]
+    first_lost = np.where(lost.any(axis=1), lost.argmax(axis=1) + 1, steps)
+    until = np.zeros(n_groups, dtype=np.intp)
+    np.maximum.at(until, groups, first_lost)
+    until[until == steps] = -1
+    return sunny_now, until
+
+
+def _format_minute(minute: int) -> str:
+    return f"{(minute // 60) % 24:02d}:{minute % 60:02d}"
+
+
+def _group_intervals(
+    member_ids: list[int],
+    intervals_by_id: dict[int, list[int]],
+) -> list[list[int]] | None:
+    """Precomputed intervals of every profiled member, or None if any is missing."""
+    if not member_ids or any(tid not in intervals_by_id for tid in member_ids):
+        return None
+    return [intervals_by_id[tid] for tid in member_ids]
+
+
+def _sun_until_intervals(group: list[list[int]], from_minute: int) -> str | None:
+    """Interval-based sun-until of a group (same 15-min sampling as `_group_sun_status`).
+
+    First check at which no member is sunny, on the union of their intervals
+    (the group stays sunny while the sun moves from one terrace to another).
+    """
+    end = sun_until(union_intervals(group), from_minute)
+    return _format_minute(end) if end is not None else None
+
+
+# Query quantization for the nearby cache: positions snap to a cell, times to a slot
+NEARBY_CELL_M = 100.0
+NEARBY_SLOT_MIN = 15
+NEARBY_CACHE_SIZE = 2048  # Cells × slots kept per process
+# Terrasses cached around a cell's centre: the radius plus more than the
+# half-diagonal (71 m), so the radius around any position in the cell is covered
+_CELL_MARGIN_M = NEARBY_CELL_M
+
+
+class _CellStatus(NamedTuple):
+    """Sun status at a slot of every SIRET group around a cell (before weather)."""
+
+    positions: np.ndarray  # Terrasse index rows around the cell
+    has_profile: np.ndarray  # Per group, like the two arrays below
+    sunny: np.ndarray
+    until: np.ndarray  # First 15-min step without sun, -1 beyond the track
+    lookup: dict[int, int]  # index group id → position in the arrays above
+
+
+_cell_cache: OrderedDict[tuple, _CellStatus] = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0, "miss_seconds": 0.0}
+
+
+def nearby_cache_metrics() -> dict:
+    """Hit rate and estimated compute time saved by the nearby cache (this process)."""
+    hits, misses = _cache_stats["hits"], _cache_stats["misses"]
+    avg_miss_ms = 1000 * _cache_stats["miss_seconds"] / misses if misses else 0.0
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "avg_miss_ms": round(avg_miss_ms, 3),
+        "saved_ms": round(hits * avg_miss_ms, 1),
+        "entries": len(_cell_cache),
+    }
+
+
+def _cell_of(lat: float, lon: float) -> tuple[int, int]:
+    x, y = np.floor(to_metric(np.array([lon, lat])) / NEARBY_CELL_M).astype(int)
+    return int(x), int(y)
+
+
+def _cell_status(
+    index: TerrasseIndex, cell: tuple[int, int], radius_m: int, slot_dt: datetime,
+) -> _CellStatus:
+    """Cached sun status of the terrasses around a cell at a time slot."""
+    key = (index.version, cell, radius_m, slot_dt)
+    entry = _cell_cache.get(key)
+    if entry is not None:
+        _cell_cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+        return entry
+
+    t0 = time.perf_counter()
+    center_lon, center_lat = from_metric((np.array(cell) + 0.5) * NEARBY_CELL_M)
+    positions, _ = index.candidates(center_lat, center_lon, radius_m + _CELL_MARGIN_M)
+    groups = np.unique(index.group_ids[positions])
+    track_alt, track_azi = _sun_track_ahead(slot_dt)
+    # One union profile per group, compared at the precision of the profile
+    # matrix as the sun tiles are
+    sunny, until = _group_sun_status(
+        index.group_profiles[groups],
+        np.arange(groups.size),
+        groups.size,
+        track_alt.astype(index.group_profiles.dtype),
+        track_azi,
+    )
+    entry = _CellStatus(
+        positions=positions,
+        has_profile=index.group_has_profile[groups],
+        sunny=sunny,
+        until=until,
+        lookup={g: k for k, g in enumerate(groups.tolist())},
+    )
+    _cell_cache[key] = entry
+    while len(_cell_cache) > NEARBY_CACHE_SIZE:
+        _cell_cache.popitem(last=False)
+    _cache_stats["misses"] += 1
+    _cache_stats["miss_seconds"] += time.perf_counter() - t0
+    return entry
+
+
+def _nearby_from_index(
+    index: TerrasseIndex, lat: float, lon: float, radius_m: int, slot_dt: datetime,
+) -> tuple[list, list[tuple[bool, bool, int]]]:
+    """Groups around a position, with (has_profile, sunny, until step) each.
+
+    The sun status comes from the cached cell status (one union profile
+    per group); only distances, grouping and ordering are computed for the
+    exact position.
+    """
+    entry = _cell_status(index, _cell_of(lat, lon), radius_m, slot_dt)
+    dist = index.distances(entry.positions, lat, lon)
+    within = dist <= radius_m
+    rows = index.group_nearby(entry.positions[within], dist[within])
+
+    statuses = []
+    for row in rows:
+        k = entry.lookup[int(index.group_ids[index.position(row.id)])]
+        has_profile = bool(entry.has_profile[k])
+        statuses.append((
+            has_profile,
+            has_profile and bool(entry.sunny[k]),
+            int(entry.until[k]) if has_profile else -1,
+        ))
+    return rows, statuses
+
+
+async def _nearby_from_db(
+    session: AsyncSession, lat: float, lon: float, radius_m: int, dt: datetime,
+) -> tuple[list, list[tuple[bool, bool, int]], list]:
+    """Groups from Postgres, with (has_profile, sunny, until step) each, and
+    the precomputed sunny intervals of each group (None where missing)."""
+    rows = await repo_find_nearby(session, lat, lon, radius_m)
+    track_alt, track_azi = _sun_track_ahead(dt)
+
+    # Union profile of each profiled establishment, stacked into one (M, 360) matrix
+    profiled = [g for g, row in enumerate(rows) if row.profile is not None]
+    sunny_now = np.zeros(len(rows), dtype=bool)
+    until = np.full(len(rows), -1)
+    if profiled:
+        sunny_now, until = _group_sun_status(
+            np.asarray([rows[g].profile for g in profiled], dtype=np.float64),
+            np.asarray(profiled, dtype=np.intp),
+            len(rows),
+            track_alt,
+            track_azi,
+        )
+    statuses = [
+        (row.profile is not None, bool(sunny_now[g]), int(until[g])) for g, row in enumerate(rows)
+    ]
+    return rows, statuses, await _precomputed_intervals(session, rows, dt)
+
+
+async def _precomputed_intervals(session: AsyncSession, rows: list, dt: datetime) -> list:
+    """Sunny intervals of each group on the day of `dt` (None where missing), in one read."""
+    all_profiled = [tid for row in rows for tid in row.profiled_ids]
+    intervals_by_id = (
+        await get_sun_intervals(session, all_profiled, dt.date()) if all_profiled else {}
+    )
+    return [_group_intervals(row.profiled_ids, intervals_by_id) for row in rows]
 
 
 async def find_nearby_terrasses(
@@ -75,6 +273,10 @@ async def find_nearby_terrasses(
     Results are grouped by SIRET (establishment). A group is sunny if ANY
     terrace in it is sunny.
 
+    Once the terrasse index is built, the time snaps to its 15-min slot and
+    the sun status of the terrasses around the position's 100 m cell is
+    cached per slot; only distances and ordering are per request.
+
     Returns:
         {
             "meteo": {cloud_cover, status, precipitation_probability},
@@ -83,9 +285,22 @@ async def find_nearby_terrasses(
     """
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=PARIS_TZ)
+    else:
+        dt = dt.astimezone(PARIS_TZ)
+
+    # Sun table for the day (city-wide, shared by every terrasse)
+    await warm_day(dt.date(), redis)
 
-    # Get sun position
-    sun_alt, sun_azi = get_sun_position(lat, lon, dt)
+    # Terrasses grouped by SIRET, from the in-process index when built
+    index = get_terrasse_index()
+    if index is not None:
+        dt = dt.replace(minute=dt.minute - dt.minute % NEARBY_SLOT_MIN, second=0, microsecond=0)
+        rows, statuses = _nearby_from_index(index, lat, lon, radius_m, dt)
+        intervals = [None] * len(rows)
+    else:
+        rows, statuses, intervals = await _nearby_from_db(session, lat, lon, radius_m, dt)
+    sun_alt = sun_position_at(dt)[0]
+    minute = dt.hour * 60 + dt.minute
 
     # Get weather
     weather = await get_hourly_weather(lat, lon, dt.date(), redis=redis)
@@ -93,25 +308,15 @@ async def find_nearby_terrasses(
     hour_weather = weather.get(hour_key, {})
     cloud_cover = hour_weather.get("cloud_cover", 50)
 
-    # Query terrasses (already grouped by SIRET in repository)
-    rows = await repo_find_nearby(session, lat, lon, radius_m)
-
     terrasses = []
-    for row in rows:
-        # Build profiles list for union check
-        profiles_coords = []
-        if row.terrasse_count > 1 and row.all_profiles:
-            for p, rlat, rlon in zip(row.all_profiles, row.all_lats, row.all_lons):
-                profiles_coords.append((p, rlat, rlon))
-        else:
-            profiles_coords.append((row.profile, row.lat, row.lon))
-
+    for row, (has_any_profile, sunny_now, until), group_intervals in zip(rows, statuses, intervals):
         # Check sun status (union: any sunny = sunny)
-        has_any_profile = any(p is not None for p, _, _ in profiles_coords)
         if not has_any_profile:
             urban_sunny = sun_alt > 0
+        elif group_intervals is not None:
+            urban_sunny = any(is_sunny_at(iv, minute) for iv in group_intervals)
         else:
-            urban_sunny = _is_any_sunny(profiles_coords, sun_alt, sun_azi)
+            urban_sunny = sunny_now
 
         # Determine combined status
         if sun_alt <= 0:
@@ -127,8 +332,10 @@ async def find_nearby_terrasses(
 
         # Estimate "sunny until" if currently sunny
         soleil_jusqua = None
-        if status == "soleil" and has_any_profile:
-            soleil_jusqua = _estimate_sun_until_group(profiles_coords, dt)
+        if status == "soleil" and group_intervals is not None:
+            soleil_jusqua = _sun_until_intervals(group_intervals, minute)
+        elif status == "soleil" and has_any_profile and until >= 0:
+            soleil_jusqua = _format_minute(minute + SUN_UNTIL_STEP_MIN * until)
 
         surface_m2 = float(row.surface_m2) if row.surface_m2 and float(row.surface_m2) > 0 else None
 
@@ -8,7 +8,7 @@ Produces a high-resolution image (300 DPI) with:
 
 import io
 import math
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
@@ -21,7 +21,8 @@ import numpy as np  # noqa: E402
 import qrcode  # noqa: E402
 from PIL import Image  # noqa: E402
 
-from app.services.sun import get_sun_position  # noqa: E402
+from app.services.shadow import union_profile  # noqa: E402
+from app.services.sun_table import get_sun_table  # noqa: E402
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 PARIS_LAT, PARIS_LON = 48.8566, 2.3522
@@ -63,18 +64,20 @@ def generate_poster(
     qr_url: str = "",
     surface_m2: float | None = None,
     terrasse_count: int = 1,
-    profile: list[float] | None = None,  # backward compat
+    profile: list[float] | None = None,
 ) -> bytes:
     """Generate the sunshine poster and return PNG bytes.
 
-    Accepts multiple profiles for establishment grouping: a slot is sunny
-    if ANY profile says sunny (union semantics).
+    For an establishment, pass its union profile as `profile` (stored in
+    `etablissements`). Member `profiles` are still accepted and folded into
+    their union once: a slot is sunny if ANY profile says sunny.
     """
-    # Backward compatibility: single profile → list
-    if profiles is None:
-        profiles = [profile or [0.0] * 360]
+    if profiles is not None:
+        profile = union_profile(profiles)
+    elif profile is None:
+        profile = [0.0] * 360
 
-    grid, hours, day_summaries = _compute_sunshine_grid_union(profiles, year)
+    grid, hours, day_summaries = _compute_sunshine_grid(profile, year)
 
     fig = plt.figure(figsize=(FIG_W_IN, FIG_H_IN), dpi=DPI, facecolor=WHITE)
 
@@ -86,9 +89,8 @@ def generate_poster(
         facecolor=WHITE,
     )
 
-    # Compute orientation from best (most open) profile
-    best_profile = min(profiles, key=lambda p: sum(p[60:301]))
-    orientation_az, orientation_label = _compute_orientation(best_profile)
+    # Orientation of the union (at least as open as the most open member)
+    orientation_az, orientation_label = _compute_orientation(profile)
     _draw_sidebar(fig, ax_side, name, address, year, surface_m2, orientation_label,
                   terrasse_count=terrasse_count)
     _draw_chart(ax_chart, grid, hours, day_summaries)
@@ -113,7 +115,7 @@ _sun_cache: dict[int, list[list[tuple[float, float, int]]]] = {}
 def _get_sun_positions(year: int, day_step: int = 3) -> list[list[tuple[float, float, int]]]:
     """Precompute sun (altitude, azimuth_index, hour_frac) for sampled days.
 
-    Cached per year so the expensive pysolar calls happen only once.
+    Cached per year; positions are read from the city-wide sun table.
     Returns a list of (doy, positions) where positions is a list of
     (hour_frac, altitude, azimuth_index) tuples for each time step.
     """
@@ -123,31 +125,22 @@ def _get_sun_positions(year: int, day_step: int = 3) -> list[list[tuple[float, f
     total_days = (date(year, 12, 31) - date(year, 1, 1)).days + 1
     all_days: list[list[tuple[float, float, int]]] = [[] for _ in range(total_days)]
 
-    current = date(year, 1, 1)
-    end = date(year, 12, 31)
-    while current <= end:
-        doy = current.timetuple().tm_yday
-        dt_base = datetime(current.year, current.month, current.day, tzinfo=PARIS_TZ)
-        positions = []
-        for minutes in range(4 * 60, 22 * 60 + 1, STEP_MINUTES):
-            dt = dt_base + timedelta(minutes=minutes)
-            alt, azi = get_sun_position(PARIS_LAT, PARIS_LON, dt)
-            if alt > 0:
-                positions.append((minutes / 60.0, alt, int(round(azi)) % 360))
-        all_days[doy - 1] = positions
-        current += timedelta(days=day_step)
-
-    # Always include Dec 31
-    last_doy = total_days
-    if not all_days[last_doy - 1]:
-        dt_base = datetime(year, 12, 31, tzinfo=PARIS_TZ)
-        positions = []
-        for minutes in range(4 * 60, 22 * 60 + 1, STEP_MINUTES):
-            dt = dt_base + timedelta(minutes=minutes)
-            alt, azi = get_sun_position(PARIS_LAT, PARIS_LON, dt)
-            if alt > 0:
-                positions.append((minutes / 60.0, alt, int(round(azi)) % 360))
-        all_days[last_doy - 1] = positions
+    # Sampled days, always including Dec 31
+    sampled = list(range(0, total_days, day_step))
+    if sampled[-1] != total_days - 1:
+        sampled.append(total_days - 1)
+
+    table = get_sun_table(year)
+    time_minutes = np.arange(4 * 60, 22 * 60 + 1, STEP_MINUTES)
+    for day_idx in sampled:
+        day = date(year, 1, 1) + timedelta(days=day_idx)
+        alts, _ = table.positions(day, time_minutes)
+        az_idx = table.azimuth_index(day, time_minutes)
+        all_days[day_idx] = [
+            (minutes / 60.0, alt, az)
+            for minutes, alt, az in zip(time_minutes.tolist(), alts.tolist(), az_idx.tolist())
+            if alt > 0
+        ]
 
     # Interpolate empty days by copying nearest sampled day
     last_filled = 0
@@ -164,16 +157,10 @@ def _get_sun_positions(year: int, day_step: int = 3) -> list[list[tuple[float, f
 def _compute_sunshine_grid(
     profile: list[float], year: int,
 ) -> tuple[np.ndarray, list[float], list[dict]]:
-    """Build a 2D grid of sunshine status for a single profile."""
-    return _compute_sunshine_grid_union([profile], year)
+    """Build a 2D grid of sunshine status for a profile.
 
-
-def _compute_sunshine_grid_union(
-    profiles: list[list[float]], year: int,
-) -> tuple[np.ndarray, list[float], list[dict]]:
-    """Build a 2D grid of sunshine status using union of multiple profiles.
-
-    A slot is sunny if ANY profile says the sun clears the horizon.
+    For a group of terrasses, the union profile makes a slot sunny if ANY
+    member is.
 
     Returns:
         grid: (n_steps, n_days) array — 0=night, 1=shadow, 2=sunny
@@ -207,9 +194,7 @@ def _compute_sunshine_grid_union(
                 if sunrise is None:
                     sunrise = hf
                 sunset = hf
-                # Union: sunny if ANY profile clears the horizon
-                is_sunny = any(alt > p[az_idx] for p in profiles)
-                if is_sunny:
+                if alt > profile[az_idx]:
                     grid[step_idx, day_idx] = 2.0  # sunny
                     sunny_minutes += STEP_MINUTES
                 else:
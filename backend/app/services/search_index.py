@@ -0,0 +1,252 @@
+"""In-process search over terrasse names and addresses (autocomplete).
+
+Answers `/api/terrasses/search` from memory, without a Postgres round trip
+per keystroke (`repositories.terrasse.search_terrasses` serves it, with the
+same results, until the index is built):
+
+1. Fuzzy: pg_trgm similarity of the query against nom_commercial, nom and
+   adresse (word trigrams, "  word " padding, unique trigrams, |A∩B| / |A∪B|),
+   kept at >= SIMILARITY_THRESHOLD (the `%` operator). An establishment
+   (SIRET group) scores the best similarity among its terrasses.
+2. Substring fallback when nothing is similar enough:
+   establishments with a terrasse containing the query, by name.
+
+Both return the group's representative terrasse (commercial name first,
+then lowest id, as in the `etablissements` view).
+
+Text is accent-folded and lowercased on both sides, so "cafe" finds "Café".
+Each of the N*3 fields is an entry; postings map an n-gram (packed in an
+int64, built for all entries in a few array passes) to the sorted entry ids
+containing it:
+
+- word trigrams score the fuzzy pass: counting the entry ids over the query
+  trigrams' postings gives |A∩B| for every entry at once;
+- raw 2- and 3-grams of the whole folded text narrow the substring pass to
+  the entries containing every n-gram of the query (exact once verified),
+  which covers prefixes typed mid-word as well as whole-word ones.
+"""
+import math
+import re
+import unicodedata
+
+import numpy as np
+
+SIMILARITY_THRESHOLD = 0.3  # pg_trgm.similarity_threshold default
+FIELDS = ("nom_commercial", "nom", "adresse")
+
+_WORD = re.compile(r"[^\W_]+")  # pg_trgm words: runs of alphanumerics
+_SEP = "\x00"  # Never in folded text: n-grams don't span it
+_SPACE = ord(" ")
+_CODE_BITS = 21  # Unicode code points
+
+
+def fold(text: str | None) -> str:
+    """Lowercase without accents ("Café Noir" → "cafe noir")."""
+    if not text:
+        return ""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def padded_words(folded: str) -> str:
+    """Folded text as pg_trgm sees it: every word as "  word " (see `gram_codes`)."""
+    return "".join(f"  {word} " for word in _WORD.findall(folded))
+
+
+def gram_codes(texts: list[str], n: int, words: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """(text index, n-gram code) of every n-gram of every text (with repeats).
+
+    An n-gram is packed as an int64 of its code points. With `words`, texts
+    are `padded_words` output: the windows spanning two padded words are
+    exactly those ending in two spaces, which a pg_trgm trigram never does.
+    """
+    joined = _SEP.join(texts)
+    chars = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    count = chars.size - n + 1
+    if count <= 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    codes = np.zeros(count, dtype=np.int64)
+    valid = np.ones(count, dtype=bool)
+    for i in range(n):
+        window = chars[i:i + count]
+        codes = (codes << _CODE_BITS) | window
+        valid &= window != 0
+    if words:
+        valid &= ~((chars[n - 2:n - 2 + count] == _SPACE) & (chars[n - 1:n - 1 + count] == _SPACE))
+    starts = np.cumsum([0] + [len(t) + 1 for t in texts[:-1]])
+    positions = np.flatnonzero(valid)
+    text_idx = np.searchsorted(starts, positions, side="right") - 1
+    return text_idx, codes[positions]
+
+
+def _unique(values: np.ndarray) -> np.ndarray:
+    """Sorted unique values (sort-based: faster than np.unique's hashing here)."""
+    values = np.sort(values)
+    return values[np.r_[True, values[1:] != values[:-1]]] if values.size else values
+
+
+class _Postings:
+    """n-gram code → entry ids, in CSR form.
+
+    Entries are sorted by id within a gram, or by (n-gram count, id) with
+    `by_size`, so that `known` can skip those too long or too short to reach
+    a similarity.
+    """
+
+    def __init__(self, entries: np.ndarray, codes: np.ndarray, n_entries: int, by_size: bool = False):
+        self.vocab, gram_ids = np.unique(codes, return_inverse=True)
+        # One sort of (gram, entry) keys dedupes and lays out the postings
+        keys = _unique(gram_ids.astype(np.int64) * n_entries + entries)
+        gram_ids, entries = np.divmod(keys, n_entries)
+        self.sizes = np.bincount(entries, minlength=n_entries)
+        if by_size:
+            order = np.lexsort((entries, self.sizes[entries], gram_ids))
+            gram_ids, entries = gram_ids[order], entries[order]
+        self.entries = entries.astype(np.int32)
+        self.entry_sizes = self.sizes[entries]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(gram_ids, minlength=self.vocab.size))])
+
+    def _positions(self, codes: np.ndarray) -> np.ndarray:
+        """Vocabulary position of each code (or of its successor if unknown)."""
+        return np.minimum(np.searchsorted(self.vocab, codes), max(self.vocab.size - 1, 0))
+
+    def lookup(self, codes: np.ndarray) -> list[np.ndarray] | None:
+        """Postings of each code, or None if one of them is unknown."""
+        pos = self._positions(codes)
+        if self.vocab.size == 0 or (self.vocab[pos] != codes).any():
+            return None
+        return [self.entries[self.indptr[p]:self.indptr[p + 1]] for p in pos.tolist()]
+
+    def known(self, codes: np.ndarray, min_size: int, max_size: int) -> list[np.ndarray]:
+        """Postings of the known codes, restricted to entries of min_size..max_size
+        n-grams (requires `by_size`)."""
+        if self.vocab.size == 0:
+            return []
+        pos = self._positions(codes)
+        postings = []
+        for p in pos[self.vocab[pos] == codes].tolist():
+            start, end = self.indptr[p], self.indptr[p + 1]
+            sizes = self.entry_sizes[start:end]
+            lo = start + np.searchsorted(sizes, min_size, side="left")
+            hi = start + np.searchsorted(sizes, max_size, side="right")
+            postings.append(self.entries[lo:hi])
+        return postings
+
+
+class SearchIndex:
+    """Trigram postings over the names and addresses of all terrasses."""
+
+    def __init__(self, rows: list, group_ids: np.ndarray):
+        """
+        Args:
+            rows: objects with id, nom, nom_commercial and adresse (plus the
+                columns returned to callers), as in `TerrasseIndex`.
+            group_ids: SIRET group index of each row.
+        """
+        self.rows = rows
+        n = len(rows)
+        self._entry_group = np.repeat(np.asarray(group_ids, dtype=np.int64), len(FIELDS))
+        self._texts = [fold(getattr(r, f)) for r in rows for f in FIELDS]
+        n_entries = len(self._texts)
+
+        self._words = _Postings(
+            *gram_codes([padded_words(t) for t in self._texts], 3, words=True), n_entries, by_size=True,
+        )
+        self._sizes = self._words.sizes.astype(np.float32)
+        self._raw = {k: _Postings(*gram_codes(self._texts, k), n_entries) for k in (2, 3)}
+
+        # Representative row of each group: commercial name first, then lowest id
+        n_groups = int(self._entry_group.max()) + 1 if n else 0
+        ids = np.array([r.id for r in rows], dtype=np.int64)
+        unnamed = np.array([r.nom_commercial is None for r in rows], dtype=bool)
+        groups = np.asarray(group_ids, dtype=np.int64)
+        order = np.lexsort((ids, unnamed, groups))
+        first = np.ones(n, dtype=bool)
+        first[1:] = groups[order][1:] != groups[order][:-1]
+        self._representative = np.zeros(n_groups, dtype=np.int64)
+        self._representative[groups[order][first]] = order[first]
+        self._rep_ids = ids[self._representative]
+
+        # Substring results come by representative name (COALESCE(nom_commercial, nom))
+        names = [
+            fold(rows[i].nom_commercial if rows[i].nom_commercial is not None else rows[i].nom)
+            for i in self._representative.tolist()
+        ]
+        self._by_name = np.array(
+            sorted(range(n_groups), key=lambda g: (names[g], int(self._rep_ids[g]))), dtype=np.int64,
+        )
+        self._name_rank = np.empty(n_groups, dtype=np.int64)
+        self._name_rank[self._by_name] = np.arange(n_groups)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def similar(self, query: str, limit: int = 10) -> list[tuple[object, float]]:
+        """(representative row, similarity) of the best matching groups."""
+        trigrams = _unique(gram_codes([padded_words(fold(query))], 3, words=True)[1])
+        # |A∩B| <= min(|A|, |B|): similarity >= t needs t|Q| <= size <= |Q|/t
+        q = trigrams.size
+        hits = self._words.known(
+            trigrams,
+            math.ceil(SIMILARITY_THRESHOLD * q - 1e-6),
+            math.floor(q / SIMILARITY_THRESHOLD + 1e-6),
+        )
+        if not hits:
+            return []
+        # Run lengths of the sorted hits: |A∩B| of every entry sharing a trigram
+        merged = np.sort(np.concatenate(hits))
+        if merged.size == 0:
+            return []
+        starts = np.flatnonzero(np.r_[True, merged[1:] != merged[:-1]])
+        entries = merged[starts]
+        shared = np.diff(np.r_[starts, merged.size]).astype(np.float32)
+        sim = shared / (np.float32(q) + self._sizes[entries] - shared)
+        matched = sim >= SIMILARITY_THRESHOLD
+        entries, sim = entries[matched], sim[matched]
+        if entries.size == 0:
+            return []
+
+        # Best similarity per group, then by similarity and representative id
+        groups = self._entry_group[entries]
+        order = np.lexsort((-sim, groups))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = groups[order][1:] != groups[order][:-1]
+        best_groups, best_sim = groups[order][first], sim[order][first]
+        ranked = np.lexsort((self._rep_ids[best_groups], -best_sim))[:limit]
+        return [
+            (self.rows[self._representative[best_groups[k]]], float(best_sim[k]))
+            for k in ranked.tolist()
+        ]
+
+    def containing(self, query: str, limit: int = 10) -> list:
+        """Representative rows of the groups with a field containing the query, by name."""
+        q = fold(query)
+        if not q:
+            return []
+        n = min(len(q), 3)
+        if n < 2:
+            candidates = np.arange(len(self._texts))
+        else:
+            lists = self._raw[n].lookup(_unique(gram_codes([q], n)[1]))
+            if lists is None:
+                return []
+            lists.sort(key=len)
+            candidates = lists[0]
+            for other in lists[1:]:
+                candidates = np.intersect1d(candidates, other, assume_unique=True)
+                if candidates.size == 0:
+                    return []
+        if len(q) > n:
+            # Every n-gram of the query is there, maybe not in a row
+            candidates = np.array([e for e in candidates.tolist() if q in self._texts[e]], dtype=np.int64)
+        ranks = _unique(self._name_rank[self._entry_group[candidates]])[:limit]
+        return [self.rows[self._representative[g]] for g in self._by_name[ranks].tolist()]
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Fuzzy matches, or substring matches when nothing is similar enough."""
+        hits = self.similar(query, limit)
+        if hits:
+            return [row for row, _ in hits]
+        return self.containing(query, limit)
@@ -11,7 +11,7 @@ the terrace receives direct sunlight.
 import math
 
 import numpy as np
-from shapely import wkt
+import shapely
 from shapely.geometry import Polygon
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -45,6 +45,19 @@ def is_sunny(profile: list[float], sun_altitude: float, sun_azimuth: float) -> b
     return sun_altitude > profile[az_idx]
 
 
+def union_profile(profiles: list[list[float]]) -> list[float]:
+    """Horizon profile of a group of terraces under union semantics.
+
+    The sun is visible from at least one terrace exactly when it clears the
+    lowest obstacle among them at its azimuth, so the group behaves like a
+    single terrace with the element-wise minimum of the member profiles.
+    An empty group gets a flat horizon.
+    """
+    if not profiles:
+        return [0.0] * 360
+    return np.min(np.asarray(profiles, dtype=np.float64), axis=0).tolist()
+
+
 async def compute_horizon_profile(
     session: AsyncSession,
     lat: float,
@@ -67,22 +80,22 @@ async def compute_horizon_profile(
                 COALESCE(altitude_sol, 0) AS altitude_sol
             FROM batiments
             WHERE ST_DWithin(
-                geometry::geography,
-                ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography,
+                geom_l93,
+                ST_Transform(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 2154),
                 :radius
             )
         """),
         {"lat": lat, "lon": lon, "radius": radius_m},
     )
-    buildings = result.fetchall()
+    buildings = [
+        bldg for bldg in result.fetchall() if bldg.hauteur > OBSERVER_HEIGHT_M
+    ]
 
-    for bldg in buildings:
-        polygon = wkt.loads(bldg.geom_wkt)
-        building_height = bldg.hauteur
-        if building_height <= OBSERVER_HEIGHT_M:
-            continue
-
-        _update_profile_for_building(profile, lat, lon, polygon, building_height)
+    x1, y1, x2, y2, heights = building_edges(
+        shapely.from_wkt([bldg.geom_wkt for bldg in buildings]),
+        [bldg.hauteur for bldg in buildings],
+    )
+    update_profile_from_edges(profile, lat, lon, x1, y1, x2, y2, heights)
 
     return profile.tolist()
 
@@ -99,17 +112,117 @@ def compute_horizon_profile_sync(
     """
     profile = np.zeros(360, dtype=np.float64)
 
-    for bldg in buildings:
-        building_height = bldg["hauteur"]
-        if building_height <= OBSERVER_HEIGHT_M:
-            continue
-
-        polygon = wkt.loads(bldg["geom_wkt"])
-        _update_profile_for_building(profile, lat, lon, polygon, building_height)
+    buildings = [bldg for bldg in buildings if bldg["hauteur"] > OBSERVER_HEIGHT_M]
+    x1, y1, x2, y2, heights = building_edges(
+        shapely.from_wkt([bldg["geom_wkt"] for bldg in buildings]),
+        [bldg["hauteur"] for bldg in buildings],
+    )
+    update_profile_from_edges(profile, lat, lon, x1, y1, x2, y2, heights)
 
     return profile.tolist()
 
 
+def building_edges(
+    polygons,
+    heights,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten building exteriors into per-edge coordinate arrays.
+
+    `polygons` is a sequence (or object array) of shapely Polygons.
+    Returns (x1, y1, x2, y2, height): one entry per polygon edge, in
+    lon/lat degrees, with the height of the building the edge belongs to.
+    """
+    if len(polygons) == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty, empty, empty, empty
+
+    coords, ring_idx = shapely.get_coordinates(
+        shapely.get_exterior_ring(np.asarray(polygons, dtype=object)), return_index=True,
+    )
+    # An edge joins each vertex to the next one of the same ring
+    same_ring = ring_idx[:-1] == ring_idx[1:]
+    start = coords[:-1][same_ring]
+    end = coords[1:][same_ring]
+    edge_heights = np.asarray(heights, dtype=np.float64)[ring_idx[:-1][same_ring]]
+    return start[:, 0], start[:, 1], end[:, 0], end[:, 1], edge_heights
+
+
+def update_profile_from_edges(
+    profile: np.ndarray,
+    obs_lat: float,
+    obs_lon: float,
+    x1: np.ndarray,
+    y1: np.ndarray,
+    x2: np.ndarray,
+    y2: np.ndarray,
+    building_height: np.ndarray,
+) -> None:
+    """Vectorized `_update_profile_for_building` over many edges at once.
+
+    Same geometry, same close-edge and wide-arc rules and the same
+    interpolation as the scalar code, so the profile matches it up to float
+    rounding (NumPy's arctan2 may differ from `math.atan2` in the last bit);
+    every edge's azimuth span is expanded into (degree, elevation) pairs and
+    folded into the profile with `np.maximum.at`.
+    """
+    if len(x1) == 0:
+        return
+    apparent_height = building_height - OBSERVER_HEIGHT_M
+
+    # Both vertices in meters relative to observer
+    dx1 = (x1 - obs_lon) * M_PER_DEG_LON_PARIS
+    dy1 = (y1 - obs_lat) * M_PER_DEG_LAT
+    dx2 = (x2 - obs_lon) * M_PER_DEG_LON_PARIS
+    dy2 = (y2 - obs_lat) * M_PER_DEG_LAT
+
+    dist1 = np.sqrt(dx1 * dx1 + dy1 * dy1)
+    dist2 = np.sqrt(dx2 * dx2 + dy2 * dy2)
+
+    # Skip edges too close (likely the building the terrace is on)
+    keep = ~((dist1 < 2.0) & (dist2 < 2.0))
+
+    az1 = np.mod(np.degrees(np.arctan2(dx1[keep], dy1[keep])), 360)
+    az2 = np.mod(np.degrees(np.arctan2(dx2[keep], dy2[keep])), 360)
+    elev1 = np.degrees(np.arctan2(apparent_height[keep], np.maximum(dist1[keep], 1.0)))
+    elev2 = np.degrees(np.arctan2(apparent_height[keep], np.maximum(dist2[keep], 1.0)))
+
+    idx1 = np.rint(az1).astype(np.intp) % 360
+    idx2 = np.rint(az2).astype(np.intp) % 360
+
+    # Shortest arc: swap the endpoints when going the other way round is shorter
+    diff = (idx2 - idx1) % 360
+    swap = diff > 180
+    s_idx1 = np.where(swap, idx2, idx1)
+    s_elev1 = np.where(swap, elev2, elev1)
+    s_elev2 = np.where(swap, elev1, elev2)
+    diff = np.where(swap, 360 - diff, diff)
+
+    same = idx1 == idx2
+    wide = ~same & (diff > 90)
+    span = ~same & ~wide
+
+    # Single degree: max of both vertices
+    targets = [idx1[same]]
+    values = [np.maximum(elev1[same], elev2[same])]
+
+    # Wide arcs: vertex updates only. As in `_fill_azimuth_range`, the
+    # (possibly swapped) elevations go to the original vertex azimuths.
+    targets += [idx1[wide], idx2[wide]]
+    values += [s_elev1[wide], s_elev2[wide]]
+
+    # Regular arcs: every degree from s_idx1 to s_idx1 + diff, interpolated
+    lengths = diff[span] + 1
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    steps = np.arange(offsets.size) - offsets
+    span_diff = np.repeat(diff[span], lengths)
+    e1 = np.repeat(s_elev1[span], lengths)
+    e2 = np.repeat(s_elev2[span], lengths)
+    targets.append((np.repeat(s_idx1[span], lengths) + steps) % 360)
+    values.append(e1 + steps / span_diff * (e2 - e1))
+
+    np.maximum.at(profile, np.concatenate(targets), np.concatenate(values))
+
+
 def _update_profile_for_building(
     profile: np.ndarray,
     obs_lat: float,
@@ -121,6 +234,8 @@ def _update_profile_for_building(
 
     For each edge of the building polygon, compute the azimuth range
     it covers and the elevation angle, then update the profile.
+
+    Scalar reference implementation of `update_profile_from_edges`.
     """
     apparent_height = building_height - OBSERVER_HEIGHT_M
 
@@ -9,6 +9,8 @@ from dataclasses import dataclass
 
 import httpx
 
+from app.dependencies import http_client
+
 logger = logging.getLogger(__name__)
 
 SEARCH_URL = "https://recherche-entreprises.api.gouv.fr/search"
@@ -40,10 +42,9 @@ async def fetch_sirene_info(siret: str, client: httpx.AsyncClient | None = None)
     if not siret or len(siret.strip()) < 9:
         return None
 
-    close_client = False
     if client is None:
-        client = httpx.AsyncClient(timeout=10.0)
-        close_client = True
+        async with http_client() as shared:
+            return await fetch_sirene_info(siret, shared)
 
     try:
         resp = await client.get(
@@ -101,9 +102,6 @@ async def fetch_sirene_info(siret: str, client: httpx.AsyncClient | None = None)
     except Exception as e:
         logger.warning("SIRENE fetch error for %s: %s", siret, e)
         return None
-    finally:
-        if close_client:
-            await client.aclose()
 
 
 async def batch_fetch_sirene(
@@ -115,7 +113,7 @@ async def batch_fetch_sirene(
     Returns a dict mapping SIRET -> SireneInfo for successful lookups.
     """
     results = {}
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    async with http_client() as client:
         for i, siret in enumerate(sirets):
             info = await fetch_sirene_info(siret, client)
             if info:
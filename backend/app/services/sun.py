@@ -1,13 +1,21 @@
-"""Solar position calculations using pysolar.
+"""Solar position calculations.
 
 Provides sun altitude and azimuth for a given location and datetime.
 Azimuth convention: 0°=North, 90°=East, 180°=South, 270°=West (clockwise).
 Altitude: 0°=horizon, 90°=zenith, negative=below horizon.
+
+Positions come from a vectorized NumPy implementation of the NOAA solar
+calculator (Meeus, "Astronomical Algorithms"), with the same atmospheric
+refraction correction as NREL SPA / pysolar. It stays within ~0.02° of
+pysolar in altitude (~0.05° in azimuth), and a whole year of positions
+costs a few milliseconds instead of one pysolar call (~1 ms) per timestamp.
 """
-from datetime import datetime, time, timedelta
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import NamedTuple
 from zoneinfo import ZoneInfo
 
-from pysolar.solar import get_altitude, get_azimuth
+import numpy as np
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 
@@ -15,6 +23,143 @@ PARIS_TZ = ZoneInfo("Europe/Paris")
 PARIS_LAT = 48.8566
 PARIS_LON = 2.3522
 
+# Julian day of the Unix epoch and of J2000.0
+_JD_UNIX_EPOCH = 2440587.5
+_JD_J2000 = 2451545.0
+
+# Standard atmosphere used for refraction (same defaults as pysolar / SPA)
+_PRESSURE_HPA = 1013.25
+_TEMPERATURE_C = 15.0
+_SUN_RADIUS_DEG = 0.26667
+_ATMOS_REFRACT_DEG = 0.5667
+
+
+def _julian_day(times) -> np.ndarray:
+    """Convert timestamps to Julian days (UT).
+
+    Accepts a datetime, an iterable of datetimes (naive ones are taken as
+    Paris local time) or a numpy datetime64 array (taken as UTC).
+    """
+    if isinstance(times, datetime):
+        times = [times]
+    if isinstance(times, np.ndarray) and np.issubdtype(times.dtype, np.datetime64):
+        seconds = times.astype("datetime64[ms]").astype(np.int64) / 1000.0
+    else:
+        seconds = np.array([
+            (dt if dt.tzinfo is not None else dt.replace(tzinfo=PARIS_TZ)).timestamp()
+            for dt in times
+        ], dtype=np.float64)
+    return seconds / 86400.0 + _JD_UNIX_EPOCH
+
+
+def _refraction(elevation: np.ndarray) -> np.ndarray:
+    """Atmospheric refraction correction in degrees (NREL SPA formula)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correction = (
+            (_PRESSURE_HPA / 1010.0)
+            * (283.0 / (273.0 + _TEMPERATURE_C))
+            * 1.02
+            / (60.0 * np.tan(np.radians(elevation + 10.3 / (elevation + 5.11))))
+        )
+    return np.where(elevation >= -(_SUN_RADIUS_DEG + _ATMOS_REFRACT_DEG), correction, 0.0)
+
+
+def _declination_eot(jd: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sun declination (radians) and equation of time (minutes) at Julian days."""
+    t = (jd - _JD_J2000) / 36525.0  # Julian centuries since J2000.0
+
+    # Sun's geometric mean longitude / anomaly, orbit eccentricity
+    l0 = np.mod(280.46646 + t * (36000.76983 + t * 0.0003032), 360.0)
+    m = np.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    ecc = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+
+    # Equation of center → apparent longitude (nutation/aberration corrected)
+    center = (
+        np.sin(m) * (1.914602 - t * (0.004817 + 0.000014 * t))
+        + np.sin(2 * m) * (0.019993 - 0.000101 * t)
+        + np.sin(3 * m) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * t)
+    app_long = np.radians(l0 + center - 0.00569 - 0.00478 * np.sin(omega))
+
+    # Obliquity of the ecliptic
+    eps0 = 23.0 + (26.0 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60.0) / 60.0
+    eps = np.radians(eps0 + 0.00256 * np.cos(omega))
+
+    decl = np.arcsin(np.sin(eps) * np.sin(app_long))
+
+    # Equation of time (minutes)
+    y = np.tan(eps / 2.0) ** 2
+    l0_rad = np.radians(l0)
+    eot = 4.0 * np.degrees(
+        y * np.sin(2 * l0_rad)
+        - 2 * ecc * np.sin(m)
+        + 4 * ecc * y * np.sin(m) * np.cos(2 * l0_rad)
+        - 0.5 * y * y * np.sin(4 * l0_rad)
+        - 1.25 * ecc * ecc * np.sin(2 * m)
+    )
+    return decl, eot
+
+
+def _position_at_jd(lat, lon, jd: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    decl, eot = _declination_eot(jd)
+
+    # True solar time → hour angle
+    utc_minutes = np.mod(jd + 0.5, 1.0) * 1440.0
+    true_solar = np.mod(utc_minutes + eot + 4.0 * lon, 1440.0)
+    hour_angle = np.radians(true_solar / 4.0 - 180.0)
+
+    lat_rad = np.radians(lat)
+    sin_elev = np.sin(lat_rad) * np.sin(decl) + np.cos(lat_rad) * np.cos(decl) * np.cos(hour_angle)
+    elevation = np.degrees(np.arcsin(np.clip(sin_elev, -1.0, 1.0)))
+
+    azimuth = np.mod(
+        180.0 + np.degrees(np.arctan2(
+            np.sin(hour_angle),
+            np.cos(hour_angle) * np.sin(lat_rad) - np.tan(decl) * np.cos(lat_rad),
+        )),
+        360.0,
+    )
+
+    return elevation + _refraction(elevation), azimuth
+
+
+def solar_position(lat, lon, times) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized sun (altitude_degrees, azimuth_degrees).
+
+    Args:
+        lat, lon: Observer coordinates, scalars or arrays broadcastable
+            against the timestamps (e.g. shape (N, 1) with T timestamps
+            gives (N, T) results).
+        times: datetime, iterable of datetimes, or datetime64 array (UTC).
+
+    Returns:
+        (altitude, azimuth) float64 arrays, azimuth in [0, 360).
+    """
+    return _position_at_jd(lat, lon, _julian_day(times))
+
+
+def local_times(target_date: date, minutes) -> np.ndarray:
+    """UTC datetime64 array for Paris wall-clock minutes of a given date.
+
+    `minutes` are minutes since local midnight (may exceed 1440). DST is
+    handled the same way as aware-datetime arithmetic in `datetime`.
+    """
+    minutes = np.asarray(minutes, dtype=np.int64)
+    midnight = datetime(target_date.year, target_date.month, target_date.day)
+
+    # UTC offset per local hour (at most 24+ zoneinfo lookups per call)
+    hours = minutes // 60
+    offsets = np.empty_like(minutes)
+    for h in np.unique(hours):
+        local = (midnight + timedelta(hours=int(h))).replace(tzinfo=PARIS_TZ)
+        offsets[hours == h] = int(local.utcoffset().total_seconds())
+
+    base = np.datetime64(target_date.isoformat(), "s")
+    return base + (minutes * 60 - offsets).astype("timedelta64[s]")
+
 
 def get_sun_position(lat: float, lon: float, dt: datetime) -> tuple[float, float]:
     """Return (altitude_degrees, azimuth_degrees) for the sun.
@@ -24,40 +169,98 @@ def get_sun_position(lat: float, lon: float, dt: datetime) -> tuple[float, float
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=PARIS_TZ)
 
-    alt = get_altitude(lat, lon, dt)
-    azi = get_azimuth(lat, lon, dt)
+    alt, azi = solar_position(lat, lon, dt)
+    return round(float(alt[0]), 2), round(float(azi[0]), 2)
+
+
+class SunTimes(NamedTuple):
+    """Daily sun events in Paris local time (None if the event never happens)."""
+
+    solar_noon: time
+    sunrise: time | None
+    sunset: time | None
+    civil_dawn: time | None
+    civil_dusk: time | None
+    golden_hour_morning_end: time | None
+    golden_hour_evening_start: time | None
+
+
+# Event altitudes (refraction-corrected sun centre). Sunrise/sunset use 0°,
+# the same threshold as the "nuit" status everywhere else in the app.
+HORIZON_ALT = 0.0
+CIVIL_TWILIGHT_ALT = -6.0
+GOLDEN_HOUR_ALT = 6.0
+
+_BISECTION_STEPS = 18  # 12h / 2^18 ≈ 0.16 s
+
 
-    # pysolar azimuth: 0=N, positive=clockwise (E), but can return negatives
-    azi = azi % 360
+def _jd_to_local_time(jd: float) -> time:
+    seconds = round((jd - _JD_UNIX_EPOCH) * 86400.0)
+    return datetime.fromtimestamp(seconds, tz=PARIS_TZ).time()
 
-    return round(alt, 2), round(azi, 2)
+
+@lru_cache(maxsize=4096)
+def _sun_times(d: date, lat: float, lon: float) -> SunTimes:
+    # Solar noon: closed form, refined with the equation of time at noon
+    utc_midnight_jd = (d - date(1970, 1, 1)).days + _JD_UNIX_EPOCH
+    noon_jd = utc_midnight_jd + (720.0 - 4.0 * lon) / 1440.0
+    for _ in range(2):
+        _, eot = _declination_eot(np.array([noon_jd]))
+        noon_jd = utc_midnight_jd + (720.0 - 4.0 * lon - eot[0]) / 1440.0
+
+    # Bisection on every (threshold, morning/evening) crossing at once.
+    # Altitude is monotonic between solar midnight and solar noon.
+    thresholds = np.array([HORIZON_ALT, CIVIL_TWILIGHT_ALT, GOLDEN_HOUR_ALT] * 2)
+    rising = np.array([True] * 3 + [False] * 3)
+    lo = np.where(rising, noon_jd - 0.5, noon_jd)
+    hi = np.where(rising, noon_jd, noon_jd + 0.5)
+
+    alt_lo, _ = _position_at_jd(lat, lon, lo)
+    alt_hi, _ = _position_at_jd(lat, lon, hi)
+    crosses = np.where(rising, alt_lo <= thresholds, alt_hi <= thresholds) & np.where(
+        rising, alt_hi > thresholds, alt_lo > thresholds,
+    )
+
+    for _ in range(_BISECTION_STEPS):
+        mid = (lo + hi) / 2.0
+        alt_mid, _ = _position_at_jd(lat, lon, mid)
+        above = alt_mid > thresholds
+        # Rising: crossing is before mid if already above; setting: after mid
+        go_low = above == rising
+        hi = np.where(go_low, mid, hi)
+        lo = np.where(go_low, lo, mid)
+
+    events = [
+        _jd_to_local_time(jd) if ok else None
+        for jd, ok in zip(((lo + hi) / 2.0).tolist(), crosses.tolist())
+    ]
+    return SunTimes(
+        solar_noon=_jd_to_local_time(noon_jd),
+        sunrise=events[0],
+        sunset=events[3],
+        civil_dawn=events[1],
+        civil_dusk=events[4],
+        golden_hour_morning_end=events[2],
+        golden_hour_evening_start=events[5],
+    )
+
+
+def get_sun_times(lat: float, lon: float, d: date) -> SunTimes:
+    """Sunrise, sunset, solar noon, civil twilight and golden-hour bounds.
+
+    Second-level precision, memoized per (date, lat/lon rounded to 0.01°):
+    all of Paris resolves to a handful of cache entries per day.
+    """
+    return _sun_times(d, round(lat, 2), round(lon, 2))
 
 
 def get_sunrise_sunset(lat: float, lon: float, dt: datetime) -> tuple[time, time]:
-    """Estimate sunrise and sunset times for a given date.
+    """Sunrise and sunset times for a given date.
 
     Returns (sunrise, sunset) as time objects in Paris timezone.
-    Uses a simple scan: finds first and last moments where altitude > 0.
     """
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=PARIS_TZ)
 
-    day_start = dt.replace(hour=4, minute=0, second=0, microsecond=0)
-
-    sunrise = None
-    sunset = None
-
-    for minutes in range(0, 20 * 60, 5):  # scan 04:00 to 00:00 in 5-min steps
-        check_dt = day_start + timedelta(minutes=minutes)
-        alt, _ = get_sun_position(lat, lon, check_dt)
-        if alt > 0:
-            if sunrise is None:
-                sunrise = check_dt.time()
-            sunset = check_dt.time()
-
-    if sunrise is None:
-        sunrise = time(8, 0)
-    if sunset is None:
-        sunset = time(18, 0)
-
-    return sunrise, sunset
+    times = get_sun_times(lat, lon, dt.date())
+    return times.sunrise or time(8, 0), times.sunset or time(18, 0)
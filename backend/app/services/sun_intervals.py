@@ -0,0 +1,92 @@
+"""Precomputed daily sunny windows per terrasse.
+
+The horizon profile is static and the sun path depends only on the date, so
+the minutes during which a terrasse is in direct sun on a given day are
+fully deterministic. They are stored as sorted, non-overlapping intervals,
+flattened as [start, end, start, end, ...] minutes of the local day (end
+exclusive), and answer "is it sunny at 14:37?" or "sunny until when?" with
+a couple of comparisons instead of sun positions + profile lookups.
+
+Intervals are computed from the city-wide sun table with exactly the
+`is_sunny` rule (sun above 0° and above the profile at its azimuth).
+"""
+from bisect import bisect_right
+from datetime import date
+
+import numpy as np
+
+from app.services.sun_table import MINUTES_PER_DAY, get_sun_table
+
+
+def sunny_mask(profiles: np.ndarray, target_date: date) -> np.ndarray:
+    """(N, 1440) bool: whether each profile is sunny at each minute of the day."""
+    table = get_sun_table(target_date.year)
+    alt, _ = table.positions(target_date)
+    az_idx = table.azimuth_index(target_date)
+    return (alt > 0) & (alt > profiles[:, az_idx])
+
+
+def mask_to_intervals(mask: np.ndarray) -> list[list[int]]:
+    """Run-length encode each row of an (N, 1440) bool mask into flat intervals."""
+    n = mask.shape[0]
+    padded = np.zeros((n, MINUTES_PER_DAY + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    rows, edges = np.nonzero(np.diff(padded, axis=1))
+
+    result: list[list[int]] = [[] for _ in range(n)]
+    for row, edge in zip(rows.tolist(), edges.tolist()):
+        result[row].append(edge)
+    return result
+
+
+def compute_intervals(profile: list[float], target_date: date) -> list[int]:
+    """Sunny intervals of a single profile for one day."""
+    mask = sunny_mask(np.asarray(profile, dtype=np.float64)[None, :], target_date)
+    return mask_to_intervals(mask)[0]
+
+
+def is_sunny_at(intervals: list[int], minute: int) -> bool:
+    """Whether `minute` of the day falls inside one of the intervals."""
+    # Odd insertion point ⇒ inside a [start, end) pair
+    return bisect_right(intervals, minute) % 2 == 1
+
+
+def sun_until(
+    intervals: list[int],
+    from_minute: int,
+    step_minutes: int = 15,
+    steps: int = 16,
+) -> int | None:
+    """First check (from_minute + k*step, k=1..steps) that is not sunny.
+
+    Same sampling as the live estimate; None if sunny at every check. The
+    sun always sets well before midnight in Paris, so checks never need the
+    next day's intervals.
+    """
+    for k in range(1, steps + 1):
+        check = from_minute + k * step_minutes
+        if not is_sunny_at(intervals, check):
+            return check
+    return None
+
+
+def union_intervals(all_intervals: list[list[int]]) -> list[int]:
+    """Merge several terrasses' intervals (sunny if ANY is sunny)."""
+    pairs = sorted(
+        (iv[i], iv[i + 1]) for iv in all_intervals for i in range(0, len(iv), 2)
+    )
+    merged: list[int] = []
+    for start, end in pairs:
+        if merged and start <= merged[-1]:
+            merged[-1] = max(merged[-1], end)
+        else:
+            merged.extend((start, end))
+    return merged
+
+
+def group_intervals(members: list[list[int] | None]) -> list[int] | None:
+    """Union of the intervals of a group's profiled members, or None unless
+    every one has them (members without a profile are left out by callers)."""
+    if not members or any(iv is None for iv in members):
+        return None
+    return union_intervals(members)
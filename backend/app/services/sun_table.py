@@ -0,0 +1,171 @@
+"""City-wide sun-position table keyed by (date, minute).
+
+Across Paris the sun's position varies by only a fraction of a degree, so a
+single table computed at PARIS_LAT/PARIS_LON serves every terrasse. Each
+year is one memory-mapped file holding, for every minute of every day:
+
+    altitude  int16  centidegrees
+    azimuth   uint16 centidegrees
+
+Days are filled lazily on first access (one vectorized ephemeris call per
+day) and persisted in the file, so every worker process on the host shares
+them. Async callers can also warm a day from Redis (`suntable:{date}`),
+which lets a fresh container skip the computation entirely.
+
+Values are quantized to 0.01°, the same rounding `get_sun_position` applies.
+"""
+import os
+import tempfile
+from datetime import date, datetime
+
+import numpy as np
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.services.sun import PARIS_LAT, PARIS_LON, PARIS_TZ, local_times, solar_position
+
+MINUTES_PER_DAY = 1440
+DAYS_PER_YEAR = 366
+
+# File layout: filled flags (one byte per day), padded, then the two planes
+_HEADER_BYTES = 512
+_PLANE_BYTES = DAYS_PER_YEAR * MINUTES_PER_DAY * 2
+
+REDIS_TTL = 30 * 86400  # Sun positions never change; keep a month around
+
+
+def _day_index(d: date) -> int:
+    return d.timetuple().tm_yday - 1
+
+
+class SunTable:
+    """Sun altitude/azimuth for every (day, minute) of one year."""
+
+    def __init__(self, year: int, directory: str | None = None):
+        self.year = year
+        self.path = os.path.join(directory, f"sun_table_{year}.bin") if directory else None
+
+        if self.path is None:
+            buffer = np.zeros(_HEADER_BYTES + 2 * _PLANE_BYTES, dtype=np.uint8)
+        else:
+            if not os.path.exists(self.path):
+                self._create_file()
+            buffer = np.memmap(self.path, dtype=np.uint8, mode="r+")
+
+        self._buffer = buffer
+        self._filled = buffer[:DAYS_PER_YEAR]
+        self._alt = buffer[_HEADER_BYTES:_HEADER_BYTES + _PLANE_BYTES].view(np.int16).reshape(
+            DAYS_PER_YEAR, MINUTES_PER_DAY,
+        )
+        self._azi = buffer[_HEADER_BYTES + _PLANE_BYTES:].view(np.uint16).reshape(
+            DAYS_PER_YEAR, MINUTES_PER_DAY,
+        )
+
+    def _create_file(self) -> None:
+        """Create an empty table file atomically (safe with concurrent workers)."""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            os.ftruncate(fd, _HEADER_BYTES + 2 * _PLANE_BYTES)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, self.path)
+
+    def _check(self, d: date) -> int:
+        if d.year != self.year:
+            raise ValueError(f"{d} is outside the {self.year} sun table")
+        return _day_index(d)
+
+    def is_filled(self, d: date) -> bool:
+        return bool(self._filled[self._check(d)])
+
+    def _fill(self, d: date) -> None:
+        """Compute one day of positions with the vectorized ephemeris."""
+        idx = self._check(d)
+        alt, azi = solar_position(PARIS_LAT, PARIS_LON, local_times(d, np.arange(MINUTES_PER_DAY)))
+        self._alt[idx] = np.rint(alt * 100).astype(np.int16)
+        self._azi[idx] = (np.rint(azi * 100).astype(np.int32) % 36000).astype(np.uint16)
+        self._filled[idx] = 1  # Flag last: readers never see a half-written day
+
+    def day_bytes(self, d: date) -> bytes:
+        """Packed (altitude, azimuth) planes for one day, for the Redis tier."""
+        idx = self._check(d)
+        return self._alt[idx].tobytes() + self._azi[idx].tobytes()
+
+    def load_bytes(self, d: date, data: bytes) -> None:
+        idx = self._check(d)
+        half = MINUTES_PER_DAY * 2
+        self._alt[idx] = np.frombuffer(data[:half], dtype=np.int16)
+        self._azi[idx] = np.frombuffer(data[half:], dtype=np.uint16)
+        self._filled[idx] = 1
+
+    def positions(self, d: date, minutes=None) -> tuple[np.ndarray, np.ndarray]:
+        """(altitude, azimuth) in degrees for minutes of the local day.
+
+        `minutes` defaults to the whole day (0..1439).
+        """
+        idx = self._check(d)
+        if not self._filled[idx]:
+            self._fill(d)
+        if minutes is None:
+            minutes = slice(None)
+        return self._alt[idx, minutes] / 100.0, self._azi[idx, minutes] / 100.0
+
+    def azimuth_index(self, d: date, minutes=None) -> np.ndarray:
+        """Azimuth rounded to the horizon-profile degree index (0..359)."""
+        _, azi = self.positions(d, minutes)
+        return np.rint(azi).astype(np.intp) % 360
+
+
+_tables: dict[int, SunTable] = {}
+
+
+def get_sun_table(year: int) -> SunTable:
+    """Return the (process-wide) table for a year, mapping its file on first use."""
+    table = _tables.get(year)
+    if table is None:
+        table = SunTable(year, settings.SUN_TABLE_DIR or None)
+        _tables[year] = table
+    return table
+
+
+def open_sun_tables(today: date | None = None) -> None:
+    """Map the current and next year's tables (called at startup)."""
+    today = today or date.today()
+    get_sun_table(today.year)
+    get_sun_table(today.year + 1)
+
+
+async def warm_day(d: date, redis: Redis | None) -> None:
+    """Make sure a day is filled, pulling it from Redis when possible."""
+    table = get_sun_table(d.year)
+    if table.is_filled(d):
+        return
+
+    key = f"suntable:{d.isoformat()}"
+    if redis:
+        cached = await redis.get(key)
+        if cached and len(cached) == MINUTES_PER_DAY * 4:
+            table.load_bytes(d, cached)
+            return
+
+    table.positions(d, slice(0, 1))  # Fills the day
+    if redis:
+        await redis.set(key, table.day_bytes(d), ex=REDIS_TTL)
+
+
+def sun_track(d: date, minutes) -> tuple[np.ndarray, np.ndarray]:
+    """(altitude, azimuth) arrays for minutes of a local day."""
+    return get_sun_table(d.year).positions(d, np.asarray(minutes))
+
+
+def sun_position_at(dt: datetime) -> tuple[float, float]:
+    """(altitude, azimuth) at a datetime, to the minute (naive = Paris time)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=PARIS_TZ)
+    else:
+        dt = dt.astimezone(PARIS_TZ)
+    alt, azi = get_sun_table(dt.year).positions(dt.date(), dt.hour * 60 + dt.minute)
+    return float(alt), float(azi)
+
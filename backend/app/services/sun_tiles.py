@@ -0,0 +1,264 @@
+"""Binary sun-status tiles for the map time slider.
+
+For a date, every terrasse gets a bitset of its sun status for each 15-min
+slot of the day (96 bits, bit k = sunny at k*15 min local time), computed
+in one (N, 96) comparison of the index profile matrix against the day's sun
+track. Terrasses are bucketed into web-mercator tiles at TILE_ZOOM so the
+frontend fetches the few tiles covering the map once per date and scrubs
+the slider client-side.
+
+All the tiles of a date are generated in bulk on the first request for
+that date, then written to SUN_TILE_DIR (shared by the workers of a host)
+and to Redis (shared by the hosts). Keys include the terrasse index
+version, so a rebuilt index never serves stale tiles; on disk, the
+directories of other versions are deleted after each build once they have
+not been written to for PRUNE_AFTER (workers still on the previous index
+keep reading theirs meanwhile). The version is also in the tiles' ETag, so
+browsers and nginx revalidate instead of keeping a previous index's tile.
+
+Tile layout (little-endian):
+
+    magic     4s     b"SUNT"
+    version   u8     TILE_FORMAT
+    slots     u8     SLOTS
+    minutes   u16    SLOT_MINUTES
+    count     u32    N
+    ids       u32[N]
+    lats      f32[N]
+    lons      f32[N]
+    bits      u8[N * SLOTS / 8]   bit k of row i: byte i*12 + k//8, bit k%8
+
+Weather is not part of the tiles: the slider combines them with the hourly
+forecast it already has.
+"""
+import asyncio
+import logging
+import math
+import os
+import shutil
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.services.sun_table import MINUTES_PER_DAY, get_sun_table
+from app.services.terrasse_index import TerrasseIndex
+from app.services.timeline_cache import etag_for
+
+logger = logging.getLogger(__name__)
+
+TILE_ZOOM = 14  # ~1.6 km wide in Paris, ~60 tiles for the city
+TILE_FORMAT = 1
+SLOT_MINUTES = 15
+SLOTS = MINUTES_PER_DAY // SLOT_MINUTES
+SLOT_BYTES = SLOTS // 8
+
+REDIS_TTL = 7 * 86400
+PRUNE_AFTER = 3600  # Seconds since another version's last write before deleting it
+
+_HEADER = struct.Struct("<4sBBHI")
+_MAGIC = b"SUNT"
+
+
+def tile_xy(lat: np.ndarray, lon: np.ndarray, zoom: int = TILE_ZOOM) -> tuple[np.ndarray, np.ndarray]:
+    """Web-mercator (slippy map) tile coordinates of points."""
+    n = 1 << zoom
+    x = np.floor((np.asarray(lon) + 180.0) / 360.0 * n).astype(np.int64)
+    lat_rad = np.radians(np.asarray(lat))
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * n).astype(np.int64)
+    return x, y
+
+
+def tile_bounds(index: TerrasseIndex) -> tuple[int, int, int, int] | None:
+    """(x_min, y_min, x_max, y_max) of the tiles holding terrasses, or None if empty."""
+    if not len(index.ids):
+        return None
+    # x grows with longitude, y decreases with latitude
+    xs, ys = tile_xy(
+        np.array([index.lats.max(), index.lats.min()]),
+        np.array([index.lons.min(), index.lons.max()]),
+    )
+    return int(xs[0]), int(ys[0]), int(xs[1]), int(ys[1])
+
+
+def sunny_bits(
+    profiles: np.ndarray,
+    has_profile: np.ndarray,
+    sun_alt: np.ndarray,
+    sun_azi: np.ndarray,
+) -> np.ndarray:
+    """(N, T/8) packed sun status of N terrasses along a T-step sun track.
+
+    Terrasses without a profile are sunny whenever the sun is up, as in the
+    nearby search. The altitudes are compared at the precision of the profile
+    matrix, so a sun exactly level with an obstacle stays in the shade.
+    """
+    az_idx = np.rint(sun_azi).astype(np.intp) % 360
+    alt = np.asarray(sun_alt).astype(profiles.dtype)
+    sunny = (alt > 0) & ((alt > profiles[:, az_idx]) | ~has_profile[:, None])
+    return np.packbits(sunny, axis=1, bitorder="little")
+
+
+def encode_tile(ids: np.ndarray, lats: np.ndarray, lons: np.ndarray, bits: np.ndarray) -> bytes:
+    return b"".join([
+        _HEADER.pack(_MAGIC, TILE_FORMAT, SLOTS, SLOT_MINUTES, len(ids)),
+        np.asarray(ids, dtype="<u4").tobytes(),
+        np.asarray(lats, dtype="<f4").tobytes(),
+        np.asarray(lons, dtype="<f4").tobytes(),
+        np.ascontiguousarray(bits, dtype=np.uint8).tobytes(),
+    ])
+
+
+EMPTY_TILE = encode_tile([], [], [], np.zeros((0, SLOT_BYTES), np.uint8))
+
+
+def decode_tile(data: bytes) -> dict:
+    """Inverse of `encode_tile` (for tests and debugging)."""
+    magic, _version, slots, minutes, n = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("Not a sun tile")
+    offset = _HEADER.size
+    arrays = {}
+    for name, dtype in (("ids", "<u4"), ("lats", "<f4"), ("lons", "<f4")):
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+        offset += 4 * n
+    packed = np.frombuffer(data, dtype=np.uint8, count=n * slots // 8, offset=offset)
+    arrays["sunny"] = np.unpackbits(packed.reshape(n, slots // 8), axis=1, bitorder="little").astype(bool)
+    arrays["slot_minutes"] = minutes
+    return arrays
+
+
+def build_day_tiles(index: TerrasseIndex, d: date) -> dict[tuple[int, int], bytes]:
+    """Encode every non-empty tile of a date in one pass over the index."""
+    alt, azi = get_sun_table(d.year).positions(d, np.arange(SLOTS) * SLOT_MINUTES)
+    bits = sunny_bits(
+        index.profiles, index.has_profile,
+        np.asarray(alt, dtype=np.float64), np.asarray(azi, dtype=np.float64),
+    )
+    xs, ys = tile_xy(index.lats, index.lons)
+    keys = xs * (1 << TILE_ZOOM) + ys
+    order = np.argsort(keys, kind="stable")  # Index rows are sorted by id
+    keys = keys[order]
+    bounds = np.flatnonzero(np.diff(keys)) + 1
+
+    tiles = {}
+    for rows in np.split(order, bounds) if len(order) else []:
+        tile = (int(xs[rows[0]]), int(ys[rows[0]]))
+        tiles[tile] = encode_tile(index.ids[rows], index.lats[rows], index.lons[rows], bits[rows])
+    return tiles
+
+
+def _tile_dir(version: str, d: date) -> str | None:
+    if not settings.SUN_TILE_DIR:
+        return None
+    return os.path.join(settings.SUN_TILE_DIR, version, d.isoformat())
+
+
+def _read_disk(version: str, d: date, x: int, y: int) -> bytes | None:
+    directory = _tile_dir(version, d)
+    if directory is None or not os.path.isdir(directory):
+        return None
+    try:
+        with open(os.path.join(directory, f"{x}_{y}.bin"), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        # The day was generated: this tile is just empty
+        return EMPTY_TILE
+
+
+def _write_disk(version: str, d: date, tiles: dict[tuple[int, int], bytes]) -> None:
+    directory = _tile_dir(version, d)
+    if directory is None or os.path.isdir(directory):
+        return
+    # Written next to the final directory then renamed: readers see all or nothing
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+    for (x, y), data in tiles.items():
+        with open(os.path.join(tmp_dir, f"{x}_{y}.bin"), "wb") as f:
+            f.write(data)
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # Another worker got there first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    _prune_disk(version)
+
+
+def _prune_disk(version: str) -> None:
+    """Delete the tile directories of the other index versions unused for PRUNE_AFTER."""
+    cutoff = time.time() - PRUNE_AFTER
+    for entry in os.scandir(settings.SUN_TILE_DIR):
+        if entry.is_dir() and entry.name != version and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _redis_key(version: str, d: date, x: int, y: int) -> str:
+    return f"suntile:{version}:{d.isoformat()}:{x}:{y}"
+
+
+def tile_etag(version: str, d: date, x: int, y: int) -> str:
+    """ETag of a tile: changes with the index version and the tile format."""
+    return etag_for(f"{_redis_key(version, d, x, y)}:{TILE_FORMAT}")
+
+
+MEMORY_DAYS = 4  # Dates kept in-process (the slider rarely leaves today/tomorrow)
+
+_memory: OrderedDict[tuple[str, date], dict[tuple[int, int], bytes]] = OrderedDict()
+_locks: dict[tuple[str, date], asyncio.Lock] = {}
+
+
+async def _generate_day(index: TerrasseIndex, d: date, redis: Redis | None) -> dict[tuple[int, int], bytes]:
+    tiles = await asyncio.to_thread(build_day_tiles, index, d)
+    logger.info("Sun tiles built for %s: %d tiles", d, len(tiles))
+    await asyncio.to_thread(_write_disk, index.version, d, tiles)
+    if redis and tiles:
+        pipe = redis.pipeline(transaction=False)
+        for (x, y), tile in tiles.items():
+            pipe.set(_redis_key(index.version, d, x, y), tile, ex=REDIS_TTL)
+        await pipe.execute()
+    return tiles
+
+
+async def get_sun_tile(index: TerrasseIndex, d: date, x: int, y: int, redis: Redis | None) -> bytes:
+    """One tile of a date: process memory, Redis, disk, then bulk generation.
+
+    Tiles outside the bounding box of the index are empty and never cached,
+    so arbitrary x/y can't fill Redis with new keys.
+    """
+    bounds = tile_bounds(index)
+    if bounds is None or not (bounds[0] <= x <= bounds[2] and bounds[1] <= y <= bounds[3]):
+        return EMPTY_TILE
+
+    day_key = (index.version, d)
+    tiles = _memory.get(day_key)
+    if tiles is not None:
+        return tiles.get((x, y), EMPTY_TILE)
+
+    key = _redis_key(index.version, d, x, y)
+    if redis:
+        cached = await redis.get(key)
+        if cached:
+            return cached
+
+    data = await asyncio.to_thread(_read_disk, index.version, d, x, y)
+    if data is not None:
+        if redis and data != EMPTY_TILE:
+            await redis.set(key, data, ex=REDIS_TTL)
+        return data
+
+    # First request for the date: generate all its tiles once
+    async with _locks.setdefault(day_key, asyncio.Lock()):
+        tiles = _memory.get(day_key)
+        if tiles is None:
+            tiles = await _generate_day(index, d, redis)
+            _memory[day_key] = tiles
+            while len(_memory) > MEMORY_DAYS:
+                _memory.popitem(last=False)
+    _locks.pop(day_key, None)
+    return tiles.get((x, y), EMPTY_TILE)
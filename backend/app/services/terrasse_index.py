@@ -0,0 +1,332 @@
+"""In-process index of all terrasses for nearby queries.
+
+The whole terrasse set (~40k rows) fits comfortably in memory, so each
+worker keeps:
+
+- a uniform grid over the coordinates (sorted cell keys + row order),
+- the SIRET group of every row,
+- the horizon profiles as an (N, 360) float32 matrix, and the union profile
+  of every SIRET group (element-wise min of its members', see
+  shadow.union_profile) as a (G, 360) one,
+- the name/address search postings (services.search_index).
+
+`find_nearby` then answers the `/api/terrasses/nearby` query without
+touching Postgres: one row per SIRET group among the terrasses within the
+radius, with the group's in-radius members. The index is built in the background
+at startup and rebuilt when the write counters of the terrasses and
+horizon_profiles tables change (polled every TERRASSE_INDEX_REFRESH_SECONDS).
+Until the first build completes, callers fall back to the SQL query.
+
+Distances use the local ellipsoidal degree lengths at the query latitude,
+within a meter of PostGIS geography distances over the 1 km nearby radius.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.services.building_index import to_metric
+from app.services.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+CELL_SIZE_M = 250.0
+_ROW_STRIDE = 1 << 20  # Cell key = ix * stride + iy (|iy| stays far below)
+
+
+class IndexedTerrasse(NamedTuple):
+    """Columns of a terrasse kept per row (profiles live in the matrices)."""
+
+    id: int
+    nom: str
+    nom_commercial: str | None
+    adresse: str | None
+    arrondissement: str | None
+    siret: str | None
+    lon: float
+    lat: float
+    price_level: int | None
+    place_type: str | None
+    rating: float | None
+    user_rating_count: int | None
+    phone: str | None
+    website: str | None
+    google_maps_uri: str | None
+
+
+class NearbyRow(NamedTuple):
+    """A SIRET group near a position: its representative and in-radius members.
+
+    `profile` is the group's union profile (a row of the index matrix, shared)
+    and `profiled_ids` lists every profiled member, in radius or not.
+    """
+
+    id: int
+    nom: str
+    nom_commercial: str | None
+    adresse: str | None
+    lon: float
+    lat: float
+    distance_m: int
+    price_level: int | None
+    place_type: str | None
+    rating: float | None
+    user_rating_count: int | None
+    profile: np.ndarray | None
+    group_key: str
+    terrasse_count: int
+    surface_m2: float
+    all_ids: list[int]
+    profiled_ids: list[int]
+
+
+def _degree_lengths(lat: float) -> tuple[float, float]:
+    """Meters per degree of latitude and longitude on the WGS84 ellipsoid."""
+    phi = math.radians(lat)
+    m_lat = 111132.92 - 559.82 * math.cos(2 * phi) + 1.175 * math.cos(4 * phi)
+    m_lon = 111412.84 * math.cos(phi) - 93.5 * math.cos(3 * phi)
+    return m_lat, m_lon
+
+
+def _cell(xy: np.ndarray) -> np.ndarray:
+    return np.floor(xy / CELL_SIZE_M).astype(np.int64)
+
+
+class TerrasseIndex:
+    """Grid index, SIRET groups and profile matrix over all terrasses."""
+
+    def __init__(self, rows: list, version: str = ""):
+        """
+        Args:
+            rows: objects with the attributes id, nom, nom_commercial, adresse,
+                siret, longueur, largeur, lon, lat, price_level, place_type,
+                rating, user_rating_count and profile (None if not computed),
+                plus the other columns of search results. Only the
+                IndexedTerrasse columns are kept.
+            version: data fingerprint the rows were read at, for derived caches.
+        """
+        self.version = version
+        n = len(rows)
+        self.ids = np.array([r.id for r in rows], dtype=np.int64)
+        self._positions = {r.id: i for i, r in enumerate(rows)}
+        self.lats = np.array([r.lat for r in rows], dtype=np.float64)
+        self.lons = np.array([r.lon for r in rows], dtype=np.float64)
+        self.has_commercial_name = np.array([r.nom_commercial is not None for r in rows], dtype=bool)
+        self.surfaces = np.array([(r.longueur or 0) * (r.largeur or 0) for r in rows], dtype=np.float64)
+
+        # Profile matrix; rows without a profile stay at 0 and are masked out
+        self.has_profile = np.array([r.profile is not None for r in rows], dtype=bool)
+        self.profiles = np.zeros((n, 360), dtype=np.float32)
+        if self.has_profile.any():
+            self.profiles[self.has_profile] = np.array(
+                [r.profile for r in rows if r.profile is not None], dtype=np.float32,
+            )
+
+        # SIRET groups (rows without a SIRET are their own group)
+        self.group_keys = [
+            r.siret if r.siret and r.siret != "" else str(r.id) for r in rows
+        ]
+        group_keys, self.group_ids = np.unique(np.array(self.group_keys, dtype=object), return_inverse=True)
+        n_groups = len(group_keys)
+
+        # Union profile per group, over its profiled members (by id)
+        self.group_profiles = np.zeros((n_groups, 360), dtype=np.float32)
+        self.group_has_profile = np.zeros(n_groups, dtype=bool)
+        profiled = np.flatnonzero(self.has_profile)
+        profiled = profiled[np.lexsort((self.ids[profiled], self.group_ids[profiled]))]
+        groups = self.group_ids[profiled]
+        if profiled.size:
+            starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+            self.group_profiles[groups[starts]] = np.minimum.reduceat(self.profiles[profiled], starts, axis=0)
+            self.group_has_profile[groups[starts]] = True
+        self._profiled_ids = self.ids[profiled]
+        self._profiled_ptr = np.searchsorted(groups, np.arange(n_groups + 1))
+
+        # Drop the profile lists (and other unused columns) of the input rows
+        self.rows = [
+            IndexedTerrasse(*(getattr(r, f, None) for f in IndexedTerrasse._fields)) for r in rows
+        ]
+        self.search = SearchIndex(self.rows, self.group_ids)
+
+        # Grid: rows sorted by cell key
+        cells = _cell(to_metric(np.column_stack([self.lons, self.lats]))) if n else np.zeros((0, 2), np.int64)
+        keys = cells[:, 0] * _ROW_STRIDE + cells[:, 1]
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def position(self, terrasse_id: int) -> int | None:
+        """Row index of a terrasse, or None if unknown."""
+        return self._positions.get(terrasse_id)
+
+    def distances(self, idx: np.ndarray, lat: float, lon: float) -> np.ndarray:
+        """Distances in meters from a point to the given rows."""
+        m_lat, m_lon = _degree_lengths(lat)
+        return np.hypot((self.lons[idx] - lon) * m_lon, (self.lats[idx] - lat) * m_lat)
+
+    def candidates(self, lat: float, lon: float, radius_m: float) -> tuple[np.ndarray, np.ndarray]:
+        """(row indices, distances in meters) of rows within `radius_m`."""
+        center = _cell(to_metric(np.array([lon, lat])))
+        # One spare ring: the grid frame is scaled at the Paris reference latitude
+        reach = int(math.ceil(radius_m / CELL_SIZE_M)) + 1
+        span = np.arange(-reach, reach + 1)
+        keys = ((center[0] + span)[:, None] * _ROW_STRIDE + (center[1] + span)[None, :]).ravel()
+        starts = np.searchsorted(self._keys, keys, side="left")
+        ends = np.searchsorted(self._keys, keys, side="right")
+        idx = np.concatenate([self._order[s:e] for s, e in zip(starts, ends) if e > s] or [np.empty(0, np.int64)])
+
+        dist = self.distances(idx, lat, lon)
+        within = dist <= radius_m
+        return idx[within], dist[within]
+
+    def find_nearby(
+        self, lat: float, lon: float, radius_m: int = 500, limit: int = 50
+    ) -> list[NearbyRow]:
+        """SIRET groups of the terrasses within `radius_m`, closest first."""
+        idx, dist = self.candidates(lat, lon, radius_m)
+        return self.group_nearby(idx, dist, limit)
+
+    def group_nearby(self, idx: np.ndarray, dist: np.ndarray, limit: int = 50) -> list[NearbyRow]:
+        """SIRET groups of the given rows (at the given distances), closest first."""
+        if idx.size == 0:
+            return []
+        distance_m = np.rint(dist).astype(np.int64)
+        groups = self.group_ids[idx]
+
+        # Representative per group: commercial name first, then closest, then id
+        rank = np.lexsort((self.ids[idx], distance_m, ~self.has_commercial_name[idx], groups))
+        first = np.ones(rank.size, dtype=bool)
+        first[1:] = groups[rank][1:] != groups[rank][:-1]
+        reps = rank[first]
+        reps = reps[np.lexsort((self.ids[idx[reps]], distance_m[reps]))][:limit]
+
+        # Group members among the candidates, by id
+        by_group: dict[int, list[int]] = {}
+        for k in np.lexsort((self.ids[idx], groups)).tolist():
+            by_group.setdefault(int(groups[k]), []).append(k)
+
+        result = []
+        for k in reps.tolist():
+            i = int(idx[k])
+            g = int(groups[k])
+            row = self.rows[i]
+            members = [int(idx[m]) for m in by_group[g]]
+            result.append(NearbyRow(
+                id=row.id,
+                nom=row.nom,
+                nom_commercial=row.nom_commercial,
+                adresse=row.adresse,
+                lon=row.lon,
+                lat=row.lat,
+                distance_m=int(distance_m[k]),
+                price_level=row.price_level,
+                place_type=row.place_type,
+                rating=row.rating,
+                user_rating_count=row.user_rating_count,
+                profile=self.group_profiles[g] if self.group_has_profile[g] else None,
+                group_key=self.group_keys[i],
+                terrasse_count=len(members),
+                surface_m2=round(float(self.surfaces[members].sum()), 1),
+                all_ids=[int(self.ids[m]) for m in members],
+                profiled_ids=self._profiled_ids[self._profiled_ptr[g]:self._profiled_ptr[g + 1]].tolist(),
+            ))
+        return result
+
+
+async def load_terrasse_index(session: AsyncSession, version: str = "") -> TerrasseIndex:
+    """Read every terrasse with its profile and build the index."""
+    result = await session.execute(text("""
+        SELECT
+            t.id, t.nom, t.nom_commercial, t.adresse, t.siret,
+            t.longueur, t.largeur,
+            ST_X(t.geometry) AS lon, ST_Y(t.geometry) AS lat,
+            t.price_level, t.place_type, t.rating, t.user_rating_count,
+            t.arrondissement, t.phone, t.website, t.google_maps_uri,
+            hp.profile
+        FROM terrasses t
+        LEFT JOIN horizon_profiles hp ON hp.terrasse_id = t.id
+        ORDER BY t.id
+    """))
+    rows = result.fetchall()
+    # Numpy conversion of ~40k profiles: keep it off the event loop
+    return await asyncio.to_thread(TerrasseIndex, rows, version)
+
+
+async def data_fingerprint(session: AsyncSession) -> str:
+    """Changes whenever a terrasse or a horizon profile is added, edited or removed.
+
+    Read from the cumulative row counters of pg_stat_user_tables (no table
+    scan); the relation filenode catches TRUNCATE and table rewrites. A
+    rolled-back write or a statistics reset also changes it, which only
+    costs a rebuild.
+    """
+    result = await session.execute(text("""
+        SELECT md5(string_agg(
+            relname || ':' || pg_relation_filenode(relid) || ':'
+                || n_tup_ins || ':' || n_tup_upd || ':' || n_tup_del,
+            '/' ORDER BY relname
+        ))
+        FROM pg_stat_user_tables
+        WHERE schemaname = current_schema()
+          AND relname IN ('terrasses', 'horizon_profiles')
+    """))
+    return result.scalar()
+
+
+_index: TerrasseIndex | None = None
+_task: asyncio.Task | None = None
+
+
+def get_terrasse_index() -> TerrasseIndex | None:
+    """The current index, or None until the first build has completed."""
+    return _index
+
+
+async def _refresh_loop() -> None:
+    global _index
+    fingerprint = None
+    while True:
+        try:
+            async with async_session() as session:
+                current = await data_fingerprint(session)
+                if current != fingerprint:
+                    t0 = time.perf_counter()
+                    _index = await load_terrasse_index(session, current)
+                    fingerprint = current
+                    logger.info(
+                        "Terrasse index built: %d terrasses in %.1fs",
+                        len(_index), time.perf_counter() - t0,
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Terrasse index refresh failed")
+        await asyncio.sleep(settings.TERRASSE_INDEX_REFRESH_SECONDS)
+
+
+async def start_terrasse_index() -> None:
+    """Build the index in the background and keep it fresh (called at startup)."""
+    global _task
+    if settings.TERRASSE_INDEX_REFRESH_SECONDS > 0 and _task is None:
+        _task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_terrasse_index() -> None:
+    global _task, _index
+    if _task:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    _index = None
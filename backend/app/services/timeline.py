@@ -3,17 +3,21 @@
 Combines horizon profile (urban shadow) with weather data to produce
 15-minute time slots from sunrise to sunset.
 
-Supports multiple profiles for establishment grouping: a slot is "sunny"
-if ANY terrace in the group is sunny (union semantics).
+For establishment grouping, callers pass the union profile of the group
+(see shadow.union_profile): a slot is then "sunny" if ANY terrace in the
+group is sunny, at the cost of a single profile check.
 """
-from datetime import date, datetime, timedelta
+from datetime import date, time
 from zoneinfo import ZoneInfo
 
+import numpy as np
 from redis.asyncio import Redis
 
 from app.services.meteo import get_hourly_weather, weather_status, weather_summary
 from app.services.shadow import is_sunny
-from app.services.sun import get_sun_position, get_sunrise_sunset
+from app.services.sun_intervals import is_sunny_at
+from app.services.sun import SunTimes, get_sun_times
+from app.services.sun_table import sun_track, warm_day
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 STEP_MINUTES = 15
@@ -74,83 +78,56 @@ def _find_best_window(slots: list[dict]) -> dict | None:
     }
 
 
-def _is_any_sunny(
-    profiles: list[tuple[list[float], float, float]],
-    sun_alt: float,
-    sun_azi: float,
-) -> bool:
-    """Check if ANY terrace in the group is sunny (union semantics)."""
-    for profile, _lat, _lon in profiles:
-        if is_sunny(profile, sun_alt, sun_azi):
-            return True
-    return False
+def _ephemeride(sun_times: SunTimes) -> dict:
+    """Sun events of the day as "HH:MM" strings (None if they don't occur)."""
+    def fmt(t):
+        return t.strftime("%H:%M") if t is not None else None
 
+    return {
+        "lever": fmt(sun_times.sunrise),
+        "coucher": fmt(sun_times.sunset),
+        "midi_solaire": fmt(sun_times.solar_noon),
+        "aube_civile": fmt(sun_times.civil_dawn),
+        "crepuscule_civil": fmt(sun_times.civil_dusk),
+        "fin_heure_doree_matin": fmt(sun_times.golden_hour_morning_end),
+        "debut_heure_doree_soir": fmt(sun_times.golden_hour_evening_start),
+    }
 
-async def build_timeline(
+
+def _build_slots(
     profile: list[float],
-    lat: float,
-    lon: float,
+    sun_times: SunTimes,
     target_date: date,
-    redis: Redis | None = None,
-    lang: str = "fr",
-    extra_profiles: list[tuple[list[float], float, float]] | None = None,
-) -> dict:
-    """Build the full timeline for a terrace on a given date.
-
-    Args:
-        profile: Primary terrace horizon profile
-        lat, lon: Primary terrace coordinates
-        target_date: Date to compute timeline for
-        redis: Redis client for weather caching
-        lang: Language for weather summary
-        extra_profiles: Additional (profile, lat, lon) tuples for sibling
-                       terraces. When provided, a slot is "sunny" if ANY
-                       terrace is sunny.
+    weather: dict[str, dict],
+    intervals: list[int] | None = None,
+) -> list[dict]:
+    """Compute the 15-minute slots for a day from a profile and hourly weather.
 
-    Returns:
-        {
-            "slots": [{time, sun_altitude, urban_sunny, cloud_cover, status}, ...],
-            "meilleur_creneau": {debut, fin, duree_minutes} | null,
-            "meteo_resume": str,
-        }
+    With precomputed `intervals` (union for the group), urban sun is an
+    interval lookup instead of a profile check per slot.
     """
-    # Build list of all profiles for union check
-    all_profiles = [(profile, lat, lon)]
-    if extra_profiles:
-        all_profiles.extend(extra_profiles)
-
-    # Get weather data (graceful fallback for dates beyond forecast range)
-    try:
-        weather = await get_hourly_weather(lat, lon, target_date, redis=redis)
-    except Exception:
-        weather = {}
-
-    # Get sunrise/sunset for time range
-    day_dt = datetime(target_date.year, target_date.month, target_date.day, tzinfo=PARIS_TZ)
-    sunrise, sunset = get_sunrise_sunset(lat, lon, day_dt)
+    sunrise = sun_times.sunrise or time(8, 0)
+    sunset = sun_times.sunset or time(18, 0)
 
     # Start 1h before sunrise, end 1h after sunset (clamped to 6-22h)
     start_hour = max(6, sunrise.hour - 1)
     end_hour = min(22, sunset.hour + 1)
 
-    slots = []
-    current = datetime(
-        target_date.year, target_date.month, target_date.day,
-        start_hour, 0, tzinfo=PARIS_TZ,
-    )
-    end = current.replace(hour=end_hour, minute=0)
+    # Sun positions for every slot, looked up in the city-wide table
+    slot_minutes = np.arange(start_hour * 60, end_hour * 60 + 1, STEP_MINUTES)
+    sun_alts, sun_azis = sun_track(target_date, slot_minutes)
 
-    while current <= end:
-        sun_alt, sun_azi = get_sun_position(lat, lon, current)
+    slots = []
+    for minutes, sun_alt, sun_azi in zip(slot_minutes.tolist(), sun_alts.tolist(), sun_azis.tolist()):
+        hour, minute = divmod(minutes, 60)
 
-        # Union: sunny if ANY terrace in the group is sunny
-        if len(all_profiles) == 1:
-            urban_sunny = is_sunny(profile, sun_alt, sun_azi)
+        if intervals is not None:
+            urban_sunny = is_sunny_at(intervals, minutes)
         else:
-            urban_sunny = _is_any_sunny(all_profiles, sun_alt, sun_azi)
+            urban_sunny = is_sunny(profile, sun_alt, sun_azi)
 
         # Interpolate cloud cover and UV from hourly data
-        hour_key = f"{current.hour:02d}:00"
+        hour_key = f"{hour:02d}:00"
         hour_weather = weather.get(hour_key, {})
         cloud_cover = hour_weather.get("cloud_cover", 0)
         uv_index = hour_weather.get("uv_index", 0.0)
@@ -158,7 +135,7 @@ async def build_timeline(
         status = _combined_status(sun_alt, urban_sunny, cloud_cover)
 
         slots.append({
-            "time": current.strftime("%H:%M"),
+            "time": f"{hour:02d}:{minute:02d}",
             "sun_altitude": round(sun_alt, 1),
             "sun_azimuth": round(sun_azi, 1),
             "urban_sunny": urban_sunny,
@@ -167,10 +144,72 @@ async def build_timeline(
             "status": status,
         })
 
-        current += timedelta(minutes=STEP_MINUTES)
+    return slots
+
+
+async def build_timeline(
+    profile: list[float],
+    lat: float,
+    lon: float,
+    target_date: date,
+    redis: Redis | None = None,
+    lang: str = "fr",
+    intervals: list[int] | None = None,
+    weather: dict[str, dict] | None = None,
+) -> dict:
+    """Build the full timeline for a terrace on a given date.
+
+    Args:
+        profile: Horizon profile of the terrace, or the union profile of
+                 its establishment (a slot is then "sunny" if ANY terrace is)
+        lat, lon: Terrace coordinates
+        target_date: Date to compute timeline for
+        redis: Redis client for weather caching
+        lang: Language for weather summary
+        intervals: Precomputed sunny intervals for the day (union over the
+                   group). When provided, profiles are not evaluated.
+        weather: Hourly weather already fetched by the caller (skips the
+                 lookup).
+
+    Returns:
+        {
+            "slots": [{time, sun_altitude, urban_sunny, cloud_cover, status}, ...],
+            "meilleur_creneau": {debut, fin, duree_minutes} | null,
+            "meteo_resume": str,
+            "ephemeride": {lever, coucher, midi_solaire, aube_civile, ...},
+        }
+    """
+    # Get weather data (graceful fallback for dates beyond forecast range)
+    if weather is None:
+        try:
+            weather = await get_hourly_weather(lat, lon, target_date, redis=redis)
+        except Exception:
+            weather = {}
+
+    await warm_day(target_date, redis)
+    sun_times = get_sun_times(lat, lon, target_date)
+    slots = _build_slots(profile, sun_times, target_date, weather, intervals)
 
     return {
         "slots": slots,
         "meilleur_creneau": _find_best_window(slots),
         "meteo_resume": weather_summary(weather, lang=lang),
+        "ephemeride": _ephemeride(sun_times),
     }
+
+
+def build_clear_sky_timeline(
+    profile: list[float],
+    lat: float,
+    lon: float,
+    target_date: date,
+) -> dict:
+    """Timeline without weather (clear sky), for reference/seasonal stats.
+
+    Pure table lookups: no network, no Redis.
+
+    Returns:
+        {"slots": [...], "meilleur_creneau": {debut, fin, duree_minutes} | null}
+    """
+    slots = _build_slots(profile, get_sun_times(lat, lon, target_date), target_date, {})
+    return {"slots": slots, "meilleur_creneau": _find_best_window(slots)}
@@ -0,0 +1,65 @@
+"""Whole-response cache for the timeline endpoint.
+
+A timeline only changes when the weather of its cell is refetched or when
+the terrasse data (profiles, siblings) changes, so the serialized response
+is cached under a key made of:
+
+- the SIRET group and the requested terrasse (the response describes it),
+- the date and the language,
+- the weather fetch time of the cell,
+- the terrasse index data version (empty until the index is built).
+
+The same key, hashed, is the ETag: a client (or nginx) revalidating with
+If-None-Match gets a 304 without the response being rebuilt or even read.
+"""
+import hashlib
+from datetime import date, datetime
+
+from redis.asyncio import Redis
+
+CACHE_TTL = 3600  # Weather refreshes change the key well before this
+
+MAX_AGE_FORECAST = 300  # Browsers/nginx revalidate forecasts every 5 min
+MAX_AGE_FINAL = 86400  # Past days with final weather
+
+
+def timeline_cache_key(
+    group_key: str,
+    terrasse_id: int,
+    target_date: date,
+    lang: str,
+    weather_fetched_at: datetime | None,
+    data_version: str = "",
+) -> str:
+    weather = weather_fetched_at.isoformat() if weather_fetched_at else "none"
+    return f"timeline:{group_key}:{terrasse_id}:{target_date.isoformat()}:{lang}:{weather}:{data_version}"
+
+
+def etag_for(cache_key: str) -> str:
+    return '"' + hashlib.sha1(cache_key.encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """RFC 9110 weak comparison against an If-None-Match header."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def cache_control(final: bool) -> str:
+    """Cache-Control for a timeline, `final` when its weather can no longer change."""
+    return f"public, max-age={MAX_AGE_FINAL if final else MAX_AGE_FORECAST}"
+
+
+async def get_cached_timeline(redis: Redis | None, cache_key: str) -> bytes | None:
+    if not redis:
+        return None
+    return await redis.get(cache_key)
+
+
+async def set_cached_timeline(redis: Redis | None, cache_key: str, body: bytes) -> None:
+    if redis:
+        await redis.set(cache_key, body, ex=CACHE_TTL)
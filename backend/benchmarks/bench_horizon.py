@@ -0,0 +1,145 @@
+"""Benchmark: vectorized horizon-profile builder vs the per-edge Python loop.
+
+A synthetic Paris-like block (buildings every ~22 m, 10–30 m tall, 4–8
+vertices) around random terraces; each terrace sees every building within
+BUILDING_SEARCH_RADIUS_M, as compute_horizon_profiles.py does. Each path
+is measured from WKT (like the batch job) and from already-parsed polygons
+(geometry cost only), and all profiles are checked against the per-edge
+loop with np.allclose.
+
+Usage:
+    python -m benchmarks.bench_horizon [--terraces N]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+from shapely import wkt
+from shapely.geometry import Polygon
+
+from app.services.shadow import (
+    BUILDING_SEARCH_RADIUS_M,
+    M_PER_DEG_LAT,
+    M_PER_DEG_LON_PARIS,
+    OBSERVER_HEIGHT_M,
+    _update_profile_for_building,
+    building_edges,
+    compute_horizon_profile_sync,
+    update_profile_from_edges,
+)
+from app.services.sun import PARIS_LAT, PARIS_LON
+
+BLOCK_SPACING_M = 22.0
+CITY_HALF_SIZE_M = 600.0
+
+
+def _city(rng: np.random.Generator) -> list[dict]:
+    """Buildings on a jittered grid, as dicts with local metric centres."""
+    buildings = []
+    steps = np.arange(-CITY_HALF_SIZE_M, CITY_HALF_SIZE_M, BLOCK_SPACING_M)
+    for cx in steps:
+        for cy in steps:
+            n = int(rng.integers(4, 9))
+            angles = np.sort(rng.uniform(0, 2 * math.pi, n))
+            radii = rng.uniform(6, 11, n)
+            x = cx + rng.uniform(-3, 3) + radii * np.cos(angles)
+            y = cy + rng.uniform(-3, 3) + radii * np.sin(angles)
+            polygon = Polygon(zip(
+                PARIS_LON + x / M_PER_DEG_LON_PARIS,
+                PARIS_LAT + y / M_PER_DEG_LAT,
+            ))
+            buildings.append({
+                "cx": cx, "cy": cy,
+                "geom_wkt": polygon.wkt,
+                "hauteur": float(rng.uniform(10, 30)),
+                "altitude_sol": 0.0,
+            })
+    return buildings
+
+
+def _terraces(rng: np.random.Generator, buildings: list[dict], count: int) -> list[tuple]:
+    """(lat, lon, nearby buildings) for random points in the city centre."""
+    centres = np.array([(b["cx"], b["cy"]) for b in buildings])
+    terraces = []
+    for _ in range(count):
+        px, py = rng.uniform(-CITY_HALF_SIZE_M / 2, CITY_HALF_SIZE_M / 2, 2)
+        near = np.hypot(centres[:, 0] - px, centres[:, 1] - py) <= BUILDING_SEARCH_RADIUS_M
+        terraces.append((
+            PARIS_LAT + py / M_PER_DEG_LAT,
+            PARIS_LON + px / M_PER_DEG_LON_PARIS,
+            [b for b, ok in zip(buildings, near) if ok],
+        ))
+    return terraces
+
+
+def _reference(buildings: list[dict], lat: float, lon: float) -> list[float]:
+    """The previous compute_horizon_profile_sync: one scalar update per building."""
+    profile = np.zeros(360, dtype=np.float64)
+    for bldg in buildings:
+        if bldg["hauteur"] <= OBSERVER_HEIGHT_M:
+            continue
+        polygon = wkt.loads(bldg["geom_wkt"])
+        _update_profile_for_building(profile, lat, lon, polygon, bldg["hauteur"])
+    return profile.tolist()
+
+
+def _parsed(terraces: list[tuple]) -> list[tuple]:
+    """Same terraces with polygons already parsed (geometry cost only)."""
+    return [
+        (lat, lon, [(wkt.loads(b["geom_wkt"]), b["hauteur"]) for b in buildings])
+        for lat, lon, buildings in terraces
+    ]
+
+
+def _reference_geometry(buildings: list[tuple], lat: float, lon: float) -> list[float]:
+    profile = np.zeros(360, dtype=np.float64)
+    for polygon, height in buildings:
+        _update_profile_for_building(profile, lat, lon, polygon, height)
+    return profile.tolist()
+
+
+def _vectorized_geometry(buildings: list[tuple], lat: float, lon: float) -> list[float]:
+    profile = np.zeros(360, dtype=np.float64)
+    polygons, heights = zip(*buildings)
+    update_profile_from_edges(profile, lat, lon, *building_edges(polygons, heights))
+    return profile.tolist()
+
+
+def _rate(fn, terraces: list[tuple]) -> tuple[float, list]:
+    t0 = time.perf_counter()
+    profiles = [fn(buildings, lat, lon) for lat, lon, buildings in terraces]
+    return len(terraces) / (time.perf_counter() - t0), profiles
+
+
+def main(count: int) -> None:
+    rng = np.random.default_rng(42)
+    buildings = _city(rng)
+    terraces = _terraces(rng, buildings, count)
+    edges = sum(len(wkt.loads(b["geom_wkt"]).exterior.coords) - 1 for _, _, bs in terraces for b in bs)
+    print(f"{count} terraces, {edges / count:,.0f} building edges each on average")
+
+    ref_rate, ref_profiles = _rate(_reference, terraces)
+    vec_rate, vec_profiles = _rate(compute_horizon_profile_sync, terraces)
+
+    parsed = _parsed(terraces)
+    ref_geo_rate, ref_geo = _rate(_reference_geometry, parsed)
+    vec_geo_rate, vec_geo = _rate(_vectorized_geometry, parsed)
+
+    ref = np.array(ref_profiles)
+    diff = max(float(np.max(np.abs(np.array(p) - ref))) for p in (vec_profiles, ref_geo, vec_geo))
+    match = all(np.allclose(p, ref, rtol=0, atol=1e-9) for p in (vec_profiles, ref_geo, vec_geo))
+    print("From WKT (compute_horizon_profile_sync):")
+    print(f"  per-edge loop   {ref_rate:>8.1f} terraces/s")
+    print(f"  vectorized      {vec_rate:>8.1f} terraces/s  → ×{vec_rate / ref_rate:.1f}")
+    print("Geometry only (polygons already parsed):")
+    print(f"  per-edge loop   {ref_geo_rate:>8.1f} terraces/s")
+    print(f"  vectorized      {vec_geo_rate:>8.1f} terraces/s  → ×{vec_geo_rate / ref_geo_rate:.1f}")
+    print(f"Profiles match (allclose): {match}, max difference {diff:.1e}°")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Horizon profile benchmark")
+    parser.add_argument("--terraces", type=int, default=200, help="Number of terraces (default: 200)")
+    args = parser.parse_args()
+    main(args.terraces)
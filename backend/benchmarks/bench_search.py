@@ -0,0 +1,101 @@
+"""Benchmark: in-process autocomplete search over ~40k terrasses.
+
+Builds the search index over synthetic Paris-like establishments (names
+drawn from common café vocabulary plus a unique part, real-looking street
+addresses, SIRET groups), then replays keystroke sequences: every prefix of
+a name or street a user would type, as the debounced SearchBar sends them.
+
+Reports the index build time, then queries/s, p50 and p99 latency, split
+into queries answered by the fuzzy pass and by the substring fallback.
+
+Usage:
+    python -m benchmarks.bench_search [--terrasses N] [--queries N]
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.search_index import SearchIndex
+
+WORDS = [
+    "Café", "Le", "La", "Les", "Bistrot", "Brasserie", "du", "de", "des", "Commerce",
+    "Marché", "Zinc", "Étoile", "Chez", "Comptoir", "Petit", "Grand", "Royal", "Paris",
+    "Saint", "Sainte", "Gare", "Place", "Rendez-vous", "Palais", "Terrasse", "Bar", "Tabac",
+    "Jardin", "Soleil", "Lune", "Roi", "Fontaine", "Pont", "Nord", "Sud", "Halles", "Opéra",
+]
+FIRST_NAMES = ["Paul", "Jeanne", "Marcel", "Louise", "Antoine", "Camille", "Hugo", "Léa", "Mehdi", "Inès"]
+STREET_TYPES = ["rue", "boulevard", "avenue", "place", "quai", "passage", "impasse"]
+STREET_NAMES = [
+    "de Rivoli", "Saint-Germain", "des Champs-Élysées", "Oberkampf", "de la Bastille",
+    "de la Roquette", "de Valmy", "Montorgueil", "du Faubourg Saint-Antoine", "de Belleville",
+    "Mouffetard", "de Charonne", "des Martyrs", "Lepic", "de Ménilmontant", "du Temple",
+    "Saint-Denis", "de la République", "Voltaire", "Richard-Lenoir", "de Clichy", "Daguerre",
+]
+
+
+def synthetic_rows(n: int, seed: int = 0) -> tuple[list, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    streets = [f"{t} {s}" for t in STREET_TYPES for s in STREET_NAMES]
+    rows = []
+    for i in range(1, n + 1):
+        words = rng.choice(WORDS, rng.integers(2, 4)).tolist()
+        if rng.random() < 0.3:
+            words.append(f"Chez {rng.choice(FIRST_NAMES)}")
+        rows.append(SimpleNamespace(
+            id=i,
+            nom=" ".join(words) + f" {rng.integers(0, 5000)}",
+            nom_commercial=" ".join(rng.choice(WORDS, 2)) if rng.random() < 0.4 else None,
+            adresse=f"{rng.integers(1, 250)} {rng.choice(streets)}",
+            siret=f"{rng.integers(0, n // 3):014d}" if rng.random() < 0.8 else None,
+        ))
+    keys = [r.siret or str(r.id) for r in rows]
+    _, group_ids = np.unique(np.array(keys, dtype=object), return_inverse=True)
+    return rows, group_ids
+
+
+def keystrokes(rows: list, count: int, seed: int = 1) -> list[str]:
+    """Prefixes (min 2 chars) of names and addresses, as typed."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    while len(queries) < count:
+        row = rows[rng.integers(len(rows))]
+        target = (row.nom_commercial or row.nom) if rng.random() < 0.6 else row.adresse.split(" ", 1)[1]
+        queries.extend(target[:k] for k in range(2, len(target) + 1))
+    return queries[:count]
+
+
+def main(n_terrasses: int, n_queries: int) -> None:
+    rows, group_ids = synthetic_rows(n_terrasses)
+    t0 = time.perf_counter()
+    index = SearchIndex(rows, group_ids)
+    print(f"Index build: {n_terrasses} terrasses in {time.perf_counter() - t0:.2f}s")
+
+    queries = keystrokes(rows, n_queries)
+    fuzzy, fallback = [], []
+    t_all = time.perf_counter()
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = index.similar(q)
+        if not hits:
+            index.containing(q)
+        (fuzzy if hits else fallback).append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - t_all
+
+    latencies = np.array(fuzzy + fallback) * 1e3
+    print(f"{len(queries)} keystroke queries: {len(queries) / elapsed:,.0f} queries/s, "
+          f"p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms")
+    for name, times in (("fuzzy", fuzzy), ("substring fallback", fallback)):
+        if times:
+            ms = np.array(times) * 1e3
+            print(f"  {name:<20} {len(times):>6} queries  p50 {np.percentile(ms, 50):.2f} ms  "
+                  f"p99 {np.percentile(ms, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process search benchmark")
+    parser.add_argument("--terrasses", type=int, default=40_000)
+    parser.add_argument("--queries", type=int, default=5_000)
+    args = parser.parse_args()
+    main(args.terrasses, args.queries)
@@ -0,0 +1,64 @@
+"""Benchmark: vectorized solar ephemeris vs per-call pysolar.
+
+Two workloads:
+  - one day on the 15-minute timeline grid (96 positions)
+  - one full year at 10-minute steps (52 560 positions)
+
+pysolar costs ~1 ms per position, so the full-year reference is measured on
+a sample and extrapolated unless --full is given.
+
+Usage:
+    python -m benchmarks.bench_sun [--full]
+"""
+import argparse
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+from pysolar.solar import get_altitude, get_azimuth
+
+from app.services.sun import PARIS_LAT, PARIS_LON, local_times, solar_position
+
+
+def _pysolar(times: np.ndarray) -> None:
+    for t in times.astype("datetime64[s]").astype(np.int64).tolist():
+        dt = datetime.fromtimestamp(t, tz=timezone.utc)
+        get_altitude(PARIS_LAT, PARIS_LON, dt)
+        get_azimuth(PARIS_LAT, PARIS_LON, dt)
+
+
+def _vectorized(times: np.ndarray) -> None:
+    solar_position(PARIS_LAT, PARIS_LON, times)
+
+
+def _best_of(fn, times: np.ndarray, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(times)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(name: str, times: np.ndarray, sample: int = 1) -> None:
+    ref = _best_of(_pysolar, times[::sample], repeat=1 if sample > 1 else 3) * sample
+    vec = _best_of(_vectorized, times, repeat=5)
+    note = f" (extrapolated from 1/{sample})" if sample > 1 else ""
+    print(f"{name:<28} {times.size:>7} pos  pysolar {ref * 1e3:>10.1f} ms{note}")
+    print(f"{'':<28} {'':>11}  numpy   {vec * 1e3:>10.2f} ms  → ×{ref / vec:,.0f}")
+
+
+def main(full: bool) -> None:
+    day = local_times(date(2026, 6, 21), np.arange(0, 24 * 60, 15))
+    run("Full day, 15-min grid", day)
+
+    year_minutes = np.arange(0, 365 * 24 * 60, 10)
+    year = np.datetime64("2026-01-01T00:00:00") + (year_minutes * 60).astype("timedelta64[s]")
+    run("Full year, 10-min steps", year, sample=1 if full else 50)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solar ephemeris benchmark")
+    parser.add_argument("--full", action="store_true", help="Run pysolar on every year step (~1 min)")
+    args = parser.parse_args()
+    main(args.full)
@@ -18,13 +18,13 @@ from app.config import settings
 from app.database import async_session
 from app.dependencies import get_redis
 from app.repositories.terrasse import (
-    find_siblings,
-    get_with_profile,
+    get_group_with_profiles,
     search_terrasses,
 )
-from app.services.horizon_cache import get_cached_profile
+from app.services.horizon_cache import get_group_profile
 from app.services.nearby import find_nearby_terrasses
-from app.services.timeline import build_timeline
+from app.services.sun_intervals import group_intervals
+from app.services.timeline import build_clear_sky_timeline, build_timeline
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 
@@ -114,31 +114,28 @@ async def get_sunshine_timeline(
         et informations sur l'établissement.
     """
     redis = await get_redis()
+    target_date = date.fromisoformat(date_str) if date_str else date.today()
     async with async_session() as db:
-        row = await get_with_profile(db, terrasse_id)
+        # The terrasse and its siblings (same SIRET) in one query
+        group_rows = await get_group_with_profiles(db, terrasse_id, target_date)
+        row = next((r for r in group_rows if r.id == terrasse_id), None)
         if row is None:
             return json.dumps({"error": "Terrasse non trouvée"}, ensure_ascii=False)
 
-        profile = await get_cached_profile(redis, terrasse_id, row.profile)
-        target_date = date.fromisoformat(date_str) if date_str else date.today()
+        # Union profile of the establishment (same SIRET)
+        profile = await get_group_profile(redis, group_rows)
 
-        # Find sibling terrasses (same SIRET)
-        extra_profiles = []
         surface_totale = 0.0
         terrasse_count = 1
 
         if row.siret and row.siret.strip():
-            siblings_rows = await find_siblings(db, row.siret)
-            terrasse_count = len(siblings_rows)
-            for sib in siblings_rows:
-                s_surface = (sib.longueur or 0) * (sib.largeur or 0)
-                surface_totale += s_surface
-                if sib.id != terrasse_id:
-                    sib_profile = await get_cached_profile(redis, sib.id, sib.profile)
-                    extra_profiles.append((sib_profile, sib.lat, sib.lon))
+            terrasse_count = len(group_rows)
+            surface_totale = sum((sib.longueur or 0) * (sib.largeur or 0) for sib in group_rows)
         else:
             surface_totale = (row.longueur or 0) * (row.largeur or 0)
 
+        intervals = group_intervals([r.intervals for r in group_rows])
+
         timeline = await build_timeline(
             profile=profile,
             lat=row.lat,
@@ -146,7 +143,7 @@ async def get_sunshine_timeline(
             target_date=target_date,
             redis=redis,
             lang="fr",
-            extra_profiles=extra_profiles if extra_profiles else None,
+            intervals=intervals,
         )
 
     result = {
@@ -165,6 +162,7 @@ async def get_sunshine_timeline(
         "slots": timeline["slots"],
         "meilleur_creneau": timeline["meilleur_creneau"],
         "meteo_resume": timeline["meteo_resume"],
+        "ephemeride": timeline["ephemeride"],
     }
     return json.dumps(result, ensure_ascii=False)
 
@@ -232,36 +230,29 @@ async def get_sunshine_profile(
     """
     redis = await get_redis()
     async with async_session() as db:
-        row = await get_with_profile(db, terrasse_id)
+        # The terrasse and its siblings (same SIRET) in one query
+        group_rows = await get_group_with_profiles(db, terrasse_id)
+        row = next((r for r in group_rows if r.id == terrasse_id), None)
         if row is None:
             return json.dumps({"error": "Terrasse non trouvée"}, ensure_ascii=False)
 
-        profile = await get_cached_profile(redis, terrasse_id, row.profile)
+        # Union profile of the establishment (same SIRET)
+        profile = await get_group_profile(redis, group_rows)
 
-        # Find siblings
-        extra_profiles = []
         surface_totale = 0.0
         terrasse_count = 1
 
         if row.siret and row.siret.strip():
-            siblings_rows = await find_siblings(db, row.siret)
-            terrasse_count = len(siblings_rows)
-            for sib in siblings_rows:
-                surface_totale += (sib.longueur or 0) * (sib.largeur or 0)
-                if sib.id != terrasse_id:
-                    sib_profile = await get_cached_profile(redis, sib.id, sib.profile)
-                    extra_profiles.append((sib_profile, sib.lat, sib.lon))
+            terrasse_count = len(group_rows)
+            surface_totale = sum((sib.longueur or 0) * (sib.largeur or 0) for sib in group_rows)
         else:
             surface_totale = (row.longueur or 0) * (row.largeur or 0)
 
-    # Analyze horizon profile for orientation quality
-    orientations = _analyze_orientations(profile)
+    # Analyze horizon profile for orientation quality (this terrace's own)
+    orientations = _analyze_orientations(row.profile if row.profile is not None else profile)
 
-    # Compute seasonal sunshine stats
-    seasonal_stats = await _compute_seasonal_stats(
-        profile, row.lat, row.lon,
-        extra_profiles if extra_profiles else None,
-    )
+    # Compute seasonal sunshine stats (union over the establishment)
+    seasonal_stats = await _compute_seasonal_stats(profile, row.lat, row.lon)
 
     result = {
         "terrasse": {
@@ -340,7 +331,6 @@ async def _compute_seasonal_stats(
     profile: list[float],
     lat: float,
     lon: float,
-    extra_profiles: list[tuple] | None = None,
 ) -> dict:
     """Compute sunshine statistics for representative dates of each season."""
     seasons = {
@@ -352,14 +342,12 @@ async def _compute_seasonal_stats(
 
     stats = {}
     for season_name, season_date in seasons.items():
-        timeline = await build_timeline(
+        # Clear sky assumption for reference stats: sun table lookups only
+        timeline = build_clear_sky_timeline(
             profile=profile,
             lat=lat,
             lon=lon,
             target_date=season_date,
-            redis=None,  # Clear sky assumption for reference stats
-            lang="fr",
-            extra_profiles=extra_profiles,
         )
 
         slots = timeline["slots"]
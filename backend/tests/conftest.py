@@ -1,6 +1,6 @@
 """Shared fixtures for integration tests."""
 import asyncio
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 import pytest_asyncio
@@ -23,7 +23,15 @@ async def fake_redis():
     store: dict = {}
     redis = AsyncMock()
     redis.get = AsyncMock(side_effect=lambda k: store.get(k))
-    redis.set = AsyncMock(side_effect=lambda k, v, **kw: store.__setitem__(k, v))
+
+    async def _set(k, v, nx=False, **kw):
+        if nx and k in store:
+            return None
+        store[k] = v
+        return True
+
+    redis.set = AsyncMock(side_effect=_set)
+    redis.delete = AsyncMock(side_effect=lambda *keys: sum(store.pop(k, None) is not None for k in keys))
 
     async def _incr(k):
         store[k] = store.get(k, 0) + 1
@@ -31,6 +39,18 @@ async def fake_redis():
 
     redis.incr = AsyncMock(side_effect=_incr)
     redis.expire = AsyncMock(return_value=True)
+    redis.store = store
+
+    def _pipeline(transaction=True):
+        """Queue set/mget calls, run them against the store on execute()."""
+        calls = []
+        pipe = MagicMock()
+        pipe.set = MagicMock(side_effect=lambda k, v, **kw: calls.append(lambda: store.__setitem__(k, v)))
+        pipe.mget = MagicMock(side_effect=lambda keys: calls.append(lambda: [store.get(k) for k in keys]))
+        pipe.execute = AsyncMock(side_effect=lambda: [call() for call in calls])
+        return pipe
+
+    redis.pipeline = MagicMock(side_effect=_pipeline)
     return redis
 
 
@@ -1,4 +1,6 @@
 """Integration tests for terrasse API endpoints."""
+from datetime import datetime
+
 import pytest
 from unittest.mock import patch, AsyncMock
 
@@ -41,10 +43,8 @@ async def test_search_terrasses_query_too_short(client):
     assert resp.status_code == 422
 
 
-@pytest.mark.asyncio
-async def test_timeline_nominal(client):
-    """Timeline should return slots for a valid terrasse."""
-    mock_row = type("Row", (), {
+def _timeline_row():
+    return type("Row", (), {
         "id": 1, "nom": "Le Soleil", "nom_commercial": None,
         "adresse": "1 place de la Bastille", "arrondissement": "75004",
         "lat": 48.853, "lon": 2.369,
@@ -53,29 +53,96 @@ async def test_timeline_nominal(client):
         "website": None, "google_maps_uri": None,
         "profile": [0.0] * 360,
         "siret": None, "longueur": None, "largeur": None, "typologie": None,
+        "intervals": None,
+        "union_profile": [0.0] * 360, "union_ids": [1],
     })()
-    mock_timeline = {
-        "slots": [
-            {"time": "10:00", "sun_altitude": 35.0, "sun_azimuth": 165.2,
-             "urban_sunny": True, "cloud_cover": 20, "uv_index": 3.0, "status": "soleil"},
-        ],
-        "meilleur_creneau": {"debut": "10:00", "fin": "14:00", "duree_minutes": 240},
-        "meteo_resume": "Matin ensoleille, apres-midi degagee",
-    }
-    with patch("app.routers.terrasses.get_with_profile", new_callable=AsyncMock, return_value=mock_row), \
-         patch("app.routers.terrasses.build_timeline", new_callable=AsyncMock, return_value=mock_timeline):
+
+
+MOCK_TIMELINE = {
+    "slots": [
+        {"time": "10:00", "sun_altitude": 35.0, "sun_azimuth": 165.2,
+         "urban_sunny": True, "cloud_cover": 20, "uv_index": 3.0, "status": "soleil"},
+    ],
+    "meilleur_creneau": {"debut": "10:00", "fin": "14:00", "duree_minutes": 240},
+    "meteo_resume": "Matin ensoleille, apres-midi degagee",
+}
+
+WEATHER_ENTRY = ({}, datetime(2026, 6, 15, 8, 0))
+
+
+@pytest.mark.asyncio
+async def test_timeline_nominal(client):
+    """Timeline should return slots for a valid terrasse."""
+    with patch("app.routers.terrasses.get_group_with_profiles", new_callable=AsyncMock, return_value=[_timeline_row()]), \
+         patch("app.routers.terrasses.get_hourly_weather_entry", new_callable=AsyncMock, return_value=WEATHER_ENTRY), \
+         patch("app.routers.terrasses.build_timeline", new_callable=AsyncMock, return_value=MOCK_TIMELINE):
         resp = await client.get("/api/terrasses/1/timeline", params={"date": "2026-06-15"})
     assert resp.status_code == 200
     data = resp.json()
     assert data["terrasse"]["id"] == 1
     assert len(data["slots"]) == 1
     assert data["meilleur_creneau"]["duree_minutes"] == 240
+    assert resp.headers["cache-control"] == "public, max-age=300"
+
+
+@pytest.mark.asyncio
+async def test_timeline_cached_and_revalidated(client):
+    """Same weather version: served from cache, then 304 on If-None-Match."""
+    build = AsyncMock(return_value=MOCK_TIMELINE)
+    with patch("app.routers.terrasses.get_group_with_profiles", new_callable=AsyncMock, return_value=[_timeline_row()]), \
+         patch("app.routers.terrasses.get_hourly_weather_entry", new_callable=AsyncMock, return_value=WEATHER_ENTRY), \
+         patch("app.routers.terrasses.build_timeline", build):
+        first = await client.get("/api/terrasses/1/timeline", params={"date": "2026-06-15"})
+        second = await client.get("/api/terrasses/1/timeline", params={"date": "2026-06-15"})
+        revalidated = await client.get(
+            "/api/terrasses/1/timeline", params={"date": "2026-06-15"},
+            headers={"If-None-Match": first.headers["etag"]},
+        )
+    assert build.await_count == 1
+    assert second.content == first.content
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_timeline_new_weather_new_etag(client):
+    with patch("app.routers.terrasses.get_group_with_profiles", new_callable=AsyncMock, return_value=[_timeline_row()]), \
+         patch("app.routers.terrasses.get_hourly_weather_entry", new_callable=AsyncMock, return_value=WEATHER_ENTRY), \
+         patch("app.routers.terrasses.build_timeline", new_callable=AsyncMock, return_value=MOCK_TIMELINE):
+        first = await client.get("/api/terrasses/1/timeline", params={"date": "2026-06-15"})
+    refreshed = ({}, datetime(2026, 6, 15, 9, 0))
+    with patch("app.routers.terrasses.get_group_with_profiles", new_callable=AsyncMock, return_value=[_timeline_row()]), \
+         patch("app.routers.terrasses.get_hourly_weather_entry", new_callable=AsyncMock, return_value=refreshed), \
+         patch("app.routers.terrasses.build_timeline", new_callable=AsyncMock, return_value=MOCK_TIMELINE):
+        second = await client.get(
+            "/api/terrasses/1/timeline", params={"date": "2026-06-15"},
+            headers={"If-None-Match": first.headers["etag"]},
+        )
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_timeline_intervals_skip_unprofiled_members(client):
+    """Members without a profile have no intervals and do not disable them."""
+    profiled = _timeline_row()
+    profiled.siret, profiled.intervals = "123", [600, 900]
+    unprofiled = _timeline_row()
+    unprofiled.id, unprofiled.siret, unprofiled.profile = 2, "123", None
+    build = AsyncMock(return_value=MOCK_TIMELINE)
+    with patch("app.routers.terrasses.get_group_with_profiles", new_callable=AsyncMock,
+               return_value=[profiled, unprofiled]), \
+         patch("app.routers.terrasses.get_hourly_weather_entry", new_callable=AsyncMock, return_value=WEATHER_ENTRY), \
+         patch("app.routers.terrasses.build_timeline", build):
+        resp = await client.get("/api/terrasses/1/timeline", params={"date": "2026-06-15"})
+    assert resp.status_code == 200
+    assert build.await_args.kwargs["intervals"] == [600, 900]
 
 
 @pytest.mark.asyncio
 async def test_timeline_not_found(client):
     """Timeline for nonexistent terrasse should return 404."""
-    with patch("app.routers.terrasses.get_with_profile", new_callable=AsyncMock, return_value=None):
+    with patch("app.routers.terrasses.get_group_with_profiles", new_callable=AsyncMock, return_value=[]):
         resp = await client.get("/api/terrasses/9999/timeline")
     assert resp.status_code == 404
 
@@ -0,0 +1,90 @@
+"""Tests for the in-memory building index."""
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+from app.services.building_index import BuildingIndex, morton_code, tile_bounds, tile_of, to_metric
+from app.services.shadow import M_PER_DEG_LAT, M_PER_DEG_LON_PARIS, compute_horizon_profile_sync
+
+OBS_LAT = 48.8566
+OBS_LON = 2.3522
+
+
+def _square(cx: float, cy: float, half: float = 6.0) -> Polygon:
+    """Square footprint centred (cx, cy) meters east/north of the observer."""
+    return Polygon([
+        (OBS_LON + x / M_PER_DEG_LON_PARIS, OBS_LAT + y / M_PER_DEG_LAT)
+        for x, y in [(cx - half, cy - half), (cx + half, cy - half),
+                     (cx + half, cy + half), (cx - half, cy + half), (cx - half, cy - half)]
+    ])
+
+
+def _city() -> tuple[list[Polygon], list[float]]:
+    rng = np.random.default_rng(3)
+    polygons, heights = [], []
+    for cx in range(-400, 401, 25):
+        for cy in range(-400, 401, 25):
+            polygons.append(_square(cx + rng.uniform(-4, 4), cy + rng.uniform(-4, 4)))
+            heights.append(float(rng.uniform(5, 35)))
+    return polygons, heights
+
+
+class TestBuildingIndex:
+    def test_query_matches_brute_force(self):
+        polygons, heights = _city()
+        index = BuildingIndex(polygons, heights)
+        metric = shapely.transform(np.asarray(polygons, dtype=object), to_metric)
+        for lat, lon in [(OBS_LAT, OBS_LON), (OBS_LAT + 0.001, OBS_LON - 0.002)]:
+            point = shapely.points(to_metric(np.array([lon, lat])))
+            expected = np.nonzero(shapely.distance(metric, point) <= 200.0)[0]
+            assert np.array_equal(index.query(lat, lon), expected)
+
+    def test_profile_matches_sync_computation(self):
+        """Same profile as the WKT path on the buildings found by the query."""
+        polygons, heights = _city()
+        index = BuildingIndex(polygons, heights)
+        buildings = [
+            {"geom_wkt": polygons[i].wkt, "hauteur": heights[i], "altitude_sol": 0}
+            for i in index.query(OBS_LAT, OBS_LON)
+        ]
+        assert index.horizon_profile(OBS_LAT, OBS_LON) == compute_horizon_profile_sync(
+            buildings, OBS_LAT, OBS_LON,
+        )
+
+    def test_short_buildings_dropped(self):
+        index = BuildingIndex([_square(30, 0), _square(-30, 0)], [1.0, 12.0])
+        assert len(index) == 1
+        profile = index.horizon_profile(OBS_LAT, OBS_LON)
+        assert profile[270] > 0
+        assert profile[90] == 0.0
+
+    def test_nothing_in_range(self):
+        index = BuildingIndex([_square(1000, 1000)], [20.0])
+        assert index.horizon_profile(OBS_LAT, OBS_LON) == [0.0] * 360
+
+
+class TestTiles:
+    def test_halo_covers_search_radius(self):
+        """Buildings sliced for a tile + halo give the same profiles as the full index."""
+        polygons, heights = _city()
+        index = BuildingIndex(polygons, heights)
+        lat, lon = OBS_LAT + 0.0004, OBS_LON + 0.0007
+        tile = tile_of(lat, lon, 250.0)
+        local = index.subset(index.query_box(*tile_bounds(tile, 250.0, halo_m=200.0)))
+        assert len(local) < len(index)
+        assert local.horizon_profile(lat, lon) == index.horizon_profile(lat, lon)
+
+    def test_tile_of_and_bounds(self):
+        tile = tile_of(OBS_LAT + 0.001, OBS_LON + 0.001, 100.0)
+        minx, miny, maxx, maxy = tile_bounds(tile, 100.0)
+        x, y = to_metric(np.array([OBS_LON + 0.001, OBS_LAT + 0.001]))
+        assert minx <= x < maxx
+        assert miny <= y < maxy
+
+    def test_morton_order_keeps_neighbours_together(self):
+        tiles = [(x, y) for x in range(-2, 2) for y in range(-2, 2)]
+        ordered = sorted(tiles, key=morton_code)
+        # Each aligned 2×2 block of tiles is visited contiguously
+        for i in range(0, 16, 4):
+            block = ordered[i:i + 4]
+            assert len({(x // 2, y // 2) for x, y in block}) == 1
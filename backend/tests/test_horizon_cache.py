@@ -0,0 +1,130 @@
+"""Tests for the horizon profile cache."""
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import horizon_cache
+from app.services.horizon_cache import (
+    decode_profile,
+    encode_profile,
+    get_cached_profile,
+    get_cached_profiles,
+    get_group_profile,
+    invalidate_profile,
+)
+
+PROFILE = [round(i * 0.25 % 60, 2) for i in range(360)]
+
+
+@pytest.fixture(autouse=True)
+def _empty_lru():
+    horizon_cache._lru.clear()
+    yield
+    horizon_cache._lru.clear()
+    horizon_cache._lru.generation = None
+
+
+class TestEncoding:
+    def test_compact_and_within_half_tenth(self):
+        data = encode_profile(PROFILE)
+        assert len(data) == 720
+        decoded = decode_profile(data)
+        assert max(abs(a - b) for a, b in zip(decoded, PROFILE)) <= 0.05 + 1e-9
+
+
+class TestGetCachedProfile:
+    async def test_db_profile_written_once(self, fake_redis):
+        """Redis is written on the first sight of a profile, not on every call."""
+        for _ in range(3):
+            assert await get_cached_profile(fake_redis, 1, PROFILE) == PROFILE
+        assert fake_redis.set.await_count == 1
+        key, value = fake_redis.set.await_args.args
+        assert key == "horizon:1"
+        assert value == encode_profile(PROFILE)
+
+    async def test_changed_profile_rewritten(self, fake_redis):
+        await get_cached_profile(fake_redis, 1, PROFILE)
+        await get_cached_profile(fake_redis, 1, [10.0] * 360)
+        assert fake_redis.set.await_count == 2
+
+    async def test_miss_served_from_redis(self, fake_redis):
+        await fake_redis.set("horizon:2", encode_profile(PROFILE))
+        profile = await get_cached_profile(fake_redis, 2, None)
+        assert profile == decode_profile(encode_profile(PROFILE))
+
+        # Second lookup hits the in-process tier
+        await get_cached_profile(fake_redis, 2, None)
+        assert fake_redis.get.await_count == 1
+
+    async def test_legacy_json_ignored(self, fake_redis):
+        await fake_redis.set("horizon:3", b"[0.0, 1.0]")
+        assert await get_cached_profile(fake_redis, 3, None) == [0.0] * 360
+
+    async def test_invalidate_clears_lru(self, fake_redis):
+        await get_cached_profile(fake_redis, 4, PROFILE)
+        await invalidate_profile(fake_redis, 4)
+        fake_redis.get.side_effect = lambda k: None
+        assert await get_cached_profile(fake_redis, 4, None) == [0.0] * 360
+
+    async def test_recompute_clears_lru(self, fake_redis, monkeypatch):
+        """A bumped generation (profiles recomputed elsewhere) empties the in-process tier."""
+        monkeypatch.setattr(horizon_cache, "GENERATION_CHECK_SECONDS", 0)
+        await get_cached_profile(fake_redis, 5, PROFILE)
+        # compute_horizon_profiles: key deleted, generation bumped
+        await fake_redis.delete("horizon:5")
+        await fake_redis.incr(horizon_cache.GENERATION_KEY)
+        assert await get_cached_profile(fake_redis, 5, None) == [0.0] * 360
+        profiles = await get_cached_profiles(fake_redis, [(6, PROFILE)])
+        assert profiles[6] == PROFILE
+        assert horizon_cache._lru.get(6) == encode_profile(PROFILE)
+
+
+class TestGetCachedProfiles:
+    async def test_one_round_trip_for_a_group(self, fake_redis):
+        """DB profiles written and cache misses read in a single pipeline."""
+        await fake_redis.set("horizon:12", encode_profile(PROFILE))
+        profiles = await get_cached_profiles(
+            fake_redis, [(10, PROFILE), (11, [5.0] * 360), (12, None), (13, None)],
+        )
+
+        assert fake_redis.pipeline.call_count == 1
+        assert profiles[10] == PROFILE
+        assert profiles[11] == [5.0] * 360
+        assert profiles[12] == decode_profile(encode_profile(PROFILE))
+        assert profiles[13] == [0.0] * 360
+        assert fake_redis.store["horizon:11"] == encode_profile([5.0] * 360)
+
+    async def test_warm_group_skips_redis(self, fake_redis):
+        items = [(20, PROFILE), (21, PROFILE)]
+        await get_cached_profiles(fake_redis, items)
+        await get_cached_profiles(fake_redis, items)
+        assert fake_redis.pipeline.call_count == 1
+
+    async def test_without_redis(self):
+        profiles = await get_cached_profiles(None, [(30, PROFILE), (31, None)])
+        assert profiles == {30: PROFILE, 31: [0.0] * 360}
+
+
+def _member(id, profile, union_profile=None, union_ids=None):
+    return SimpleNamespace(id=id, profile=profile, union_profile=union_profile, union_ids=union_ids)
+
+
+class TestGetGroupProfile:
+    async def test_stored_union_used_when_current(self):
+        stored = [1.0] * 360
+        rows = [_member(1, PROFILE, stored, [1, 2]), _member(2, [5.0] * 360, stored, [1, 2])]
+        assert await get_group_profile(None, rows) == stored
+
+    async def test_recomputed_when_members_changed(self):
+        """A sibling profiled since the last refresh of etablissements."""
+        stored = [30.0] * 360
+        rows = [_member(1, [30.0] * 360, stored, [1]), _member(2, [5.0] * 360, stored, [1])]
+        assert await get_group_profile(None, rows) == [5.0] * 360
+
+    async def test_unprofiled_members_ignored(self):
+        rows = [_member(1, [12.0] * 360), _member(2, None)]
+        assert await get_group_profile(None, rows) == [12.0] * 360
+
+    async def test_no_profile_falls_back_to_cache(self, fake_redis):
+        await fake_redis.set("horizon:7", encode_profile([8.0] * 360))
+        assert await get_group_profile(fake_redis, [_member(7, None)]) == [8.0] * 360
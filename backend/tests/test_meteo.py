@@ -0,0 +1,168 @@
+"""Tests for the two-tier weather cache."""
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from app.services import meteo
+from app.services.meteo import get_hourly_weather
+
+HOURLY = {"12:00": {"cloud_cover": 20, "direct_radiation": 500.0,
+                    "precipitation_probability": 0, "uv_index": 5.0}}
+NOW = datetime(2026, 6, 21, 10, 0)  # Naive UTC
+TODAY = date(2026, 6, 21)
+KEY = "meteo:48.85:2.35:2026-06-21"
+
+
+@pytest.fixture
+def l2():
+    """Patched meteo_cache access: {(lat, lon, date): (json, fetched_at)}."""
+    rows = {}
+
+    async def read(lat, lon, d):
+        return rows.get((lat, lon, d))
+
+    async def store(lat, lon, days, fetched_at):
+        for d, data in days.items():
+            rows[(lat, lon, d)] = (data, fetched_at)
+
+    with (
+        patch.object(meteo, "_read_stored", side_effect=read),
+        patch.object(meteo, "_store", side_effect=store),
+        patch.object(meteo, "_utcnow", return_value=NOW),
+    ):
+        yield rows
+
+
+def _cached(redis, key: str) -> dict:
+    return json.loads(redis.store[key])
+
+
+class TestGetHourlyWeather:
+    async def test_fetch_persisted_in_both_tiers(self, fake_redis, l2):
+        with patch.object(meteo, "_fetch", AsyncMock(return_value=HOURLY)) as fetch:
+            assert await get_hourly_weather(48.86, 2.35, TODAY, fake_redis) == HOURLY
+            assert await get_hourly_weather(48.86, 2.35, TODAY, fake_redis) == HOURLY
+        assert fetch.await_count == 1
+        assert _cached(fake_redis, KEY) == {"fetched_at": NOW.isoformat(), "hourly": HOURLY}
+        assert l2[(48.85, 2.35, TODAY)] == (json.dumps(HOURLY), NOW)
+        # Kept in Redis as long as it may be served stale
+        assert fake_redis.set.await_args.kwargs["ex"] == 6 * 3600
+        assert "lock:" + KEY not in fake_redis.store
+
+    async def test_redis_flush_served_from_db(self, fake_redis, l2):
+        l2[(48.85, 2.35, TODAY)] = (json.dumps(HOURLY), NOW - timedelta(minutes=20))
+        with patch.object(meteo, "_fetch", AsyncMock()) as fetch:
+            assert await get_hourly_weather(48.86, 2.35, TODAY, fake_redis) == HOURLY
+        fetch.assert_not_awaited()
+        assert fake_redis.set.await_args.kwargs["ex"] == 6 * 3600 - 20 * 60
+
+    async def test_past_date_permanent(self, l2):
+        past = date(2026, 3, 1)
+        l2[(48.85, 2.35, past)] = (json.dumps(HOURLY), datetime(2026, 3, 5))
+        with patch.object(meteo, "_fetch", AsyncMock()) as fetch:
+            assert await get_hourly_weather(48.86, 2.35, past) == HOURLY
+        fetch.assert_not_awaited()
+
+    async def test_stale_served_while_revalidating(self, l2):
+        l2[(48.85, 2.35, TODAY)] = (json.dumps({}), NOW - timedelta(hours=2))
+        with patch.object(meteo, "_fetch", AsyncMock(return_value=HOURLY)) as fetch:
+            assert await get_hourly_weather(48.86, 2.35, TODAY) == {}
+            await asyncio.gather(*meteo._inflight.values())
+        fetch.assert_awaited_once()
+        assert l2[(48.85, 2.35, TODAY)] == (json.dumps(HOURLY), NOW)
+
+    async def test_expired_refetched(self, l2):
+        l2[(48.85, 2.35, TODAY)] = (json.dumps({}), NOW - timedelta(hours=7))
+        with patch.object(meteo, "_fetch", AsyncMock(return_value=HOURLY)):
+            assert await get_hourly_weather(48.86, 2.35, TODAY) == HOURLY
+
+    async def test_expired_served_when_open_meteo_down(self, l2):
+        l2[(48.85, 2.35, TODAY)] = (json.dumps(HOURLY), NOW - timedelta(hours=7))
+        down = AsyncMock(side_effect=httpx.ConnectError("down"))
+        with patch.object(meteo, "_fetch", down):
+            assert await get_hourly_weather(48.86, 2.35, TODAY) == HOURLY
+
+    async def test_database_down(self, fake_redis):
+        session = MagicMock(side_effect=OSError("connection refused"))
+        with (
+            patch.object(meteo, "async_session", session),
+            patch.object(meteo, "_fetch", AsyncMock(return_value=HOURLY)),
+        ):
+            assert await get_hourly_weather(48.86, 2.35, TODAY, fake_redis) == HOURLY
+        assert KEY in fake_redis.store
+
+
+class TestSingleFlight:
+    async def test_concurrent_misses_fetch_once(self, fake_redis, l2):
+        async def slow_fetch(*args):
+            await asyncio.sleep(0.01)
+            return HOURLY
+
+        with patch.object(meteo, "_fetch", AsyncMock(side_effect=slow_fetch)) as fetch:
+            results = await asyncio.gather(*[
+                get_hourly_weather(48.86, 2.35, TODAY, fake_redis) for _ in range(10)
+            ])
+        assert results == [HOURLY] * 10
+        assert fetch.await_count == 1
+
+    async def test_waits_for_other_process(self, fake_redis, l2, monkeypatch):
+        """Lock held elsewhere: the result it writes to Redis is used."""
+        monkeypatch.setattr(meteo, "LOCK_POLL", 0.001)
+        fake_redis.store["lock:" + KEY] = b"1"
+
+        async def other_process():
+            await asyncio.sleep(0.005)
+            fake_redis.store[KEY] = meteo._envelope(json.dumps(HOURLY), NOW)
+
+        with patch.object(meteo, "_fetch", AsyncMock()) as fetch:
+            result, _ = await asyncio.gather(
+                get_hourly_weather(48.86, 2.35, TODAY, fake_redis), other_process(),
+            )
+        assert result == HOURLY
+        fetch.assert_not_awaited()
+
+
+def _open_meteo_payload(start: date, days: int) -> dict:
+    times = [
+        f"{start + timedelta(days=d)}T{h:02d}:00" for d in range(days) for h in range(24)
+    ]
+    n = len(times)
+    return {"hourly": {
+        "time": times, "cloud_cover": [10] * n, "direct_radiation": [300.0] * n,
+        "precipitation_probability": [0] * n, "uv_index": [3.0] * n,
+    }}
+
+
+class TestPrefetch:
+    def test_cells_cover_paris(self):
+        cells = meteo.paris_cells()
+        for lat, lon in [(48.8566, 2.3522), (48.8167, 2.2300), (48.9000, 2.4650)]:
+            assert (meteo._round_to_grid(lat), meteo._round_to_grid(lon)) in cells
+
+    async def test_one_call_per_cell_split_per_day(self, fake_redis, l2):
+        payload = _open_meteo_payload(TODAY, 16)
+        fetch = AsyncMock(return_value=meteo._split_days(payload))
+        with patch.object(meteo, "_fetch_days", fetch):
+            written = await meteo.prefetch_all(fake_redis)
+
+        cells = meteo.paris_cells()
+        assert fetch.await_count == len(cells)
+        assert fetch.await_args.kwargs == {"forecast_days": 16}
+        assert written == 16 * len(cells)
+        assert l2[(48.85, 2.35, TODAY + timedelta(days=15))][1] == NOW
+
+        # Requests for any of these days are now served from Redis
+        with patch.object(meteo, "_fetch", AsyncMock()) as single:
+            hourly = await get_hourly_weather(48.86, 2.35, TODAY + timedelta(days=3), fake_redis)
+        single.assert_not_awaited()
+        assert len(hourly) == 24
+
+    async def test_one_process_per_period(self, fake_redis, l2):
+        with patch.object(meteo, "_fetch_days", AsyncMock(return_value={})) as fetch:
+            await meteo.prefetch_all(fake_redis)
+            assert await meteo.prefetch_all(fake_redis) == 0
+        assert fetch.await_count == len(meteo.paris_cells())
@@ -1,77 +1,225 @@
 """Tests for nearby service pure functions."""
 from datetime import datetime
-from unittest.mock import patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 from zoneinfo import ZoneInfo
 
-from app.services.nearby import _estimate_sun_until_single as _estimate_sun_until
+import numpy as np
+
+from app.services import nearby
+from app.services.nearby import (
+    _format_minute,
+    _group_sun_status,
+    _nearby_from_db,
+    _nearby_from_index,
+    _sun_track_ahead,
+    _sun_until_intervals,
+    find_nearby_terrasses,
+    nearby_cache_metrics,
+)
+from app.services.shadow import is_sunny, union_profile
+from app.services.sun_intervals import compute_intervals
+from app.services.sun_table import sun_position_at
+from app.services.terrasse_index import TerrasseIndex
+from tests.test_terrasse_index import _rows
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
-PARIS_LAT = 48.853
-PARIS_LON = 2.369
-DUMMY_PROFILE = [0.0] * 360  # flat horizon
 
+FLAT = [0.0] * 360
+WALL = [90.0] * 360
 
-class TestEstimateSunUntil:
-    def test_loses_sun_after_2_hours(self):
-        """Terrace sunny for 2h (8 checks) then shadow → returns correct HH:MM."""
-        from_dt = datetime(2026, 6, 21, 14, 0, tzinfo=PARIS_TZ)
-        call_count = 0
 
-        def mock_is_sunny(profile, alt, azi):
-            nonlocal call_count
-            call_count += 1
-            # First 8 checks (2 hours) sunny, then shadow
-            return call_count <= 8
+def _status(profiles, groups, alt, azi):
+    return _group_sun_status(
+        np.asarray(profiles, dtype=np.float64),
+        np.asarray(groups),
+        max(groups) + 1,
+        np.asarray(alt, dtype=np.float64),
+        np.asarray(azi, dtype=np.float64),
+    )
 
-        with (
-            patch("app.services.nearby.get_sun_position", return_value=(40.0, 220.0)),
-            patch("app.services.nearby.is_sunny", side_effect=mock_is_sunny),
-        ):
-            result = _estimate_sun_until(DUMMY_PROFILE, PARIS_LAT, PARIS_LON, from_dt)
 
-        # 8 sunny checks × 15 min = 2h → loses sun at check 9 = 14:00 + 9×15min = 16:15
-        assert result == "16:15"
+class TestGroupSunStatus:
+    def test_loses_sun_after_2_hours(self):
+        """Sunny for 2h (8 steps) then shadow → first lost step is 9."""
+        alt = [40.0] * 9 + [5.0] * 8
+        profile = [10.0] * 360
+        sunny_now, until = _status([profile], [0], alt, [220.0] * 17)
+        assert sunny_now.tolist() == [True]
+        assert until.tolist() == [9]
 
     def test_stays_sunny_beyond_window(self):
-        """Terrace sunny for 4+ hours → returns None."""
-        from_dt = datetime(2026, 6, 21, 12, 0, tzinfo=PARIS_TZ)
-
-        with (
-            patch("app.services.nearby.get_sun_position", return_value=(50.0, 200.0)),
-            patch("app.services.nearby.is_sunny", return_value=True),
-        ):
-            result = _estimate_sun_until(DUMMY_PROFILE, PARIS_LAT, PARIS_LON, from_dt)
-
-        assert result is None
+        sunny_now, until = _status([FLAT], [0], [50.0] * 17, [200.0] * 17)
+        assert sunny_now.tolist() == [True]
+        assert until.tolist() == [-1]
 
     def test_immediate_shadow(self):
-        """Terrace loses sun at the very first check (15 min ahead)."""
-        from_dt = datetime(2026, 6, 21, 17, 0, tzinfo=PARIS_TZ)
-
-        with (
-            patch("app.services.nearby.get_sun_position", return_value=(10.0, 280.0)),
-            patch("app.services.nearby.is_sunny", return_value=False),
-        ):
-            result = _estimate_sun_until(DUMMY_PROFILE, PARIS_LAT, PARIS_LON, from_dt)
-
-        # First check is from_dt + 15min = 17:15
-        assert result == "17:15"
-
-    def test_loses_sun_after_1_hour(self):
-        """Terrace sunny for 1h (4 checks) then shadow."""
-        from_dt = datetime(2026, 3, 21, 15, 30, tzinfo=PARIS_TZ)
-        call_count = 0
-
-        def mock_is_sunny(profile, alt, azi):
-            nonlocal call_count
-            call_count += 1
-            return call_count <= 4
-
-        with (
-            patch("app.services.nearby.get_sun_position", return_value=(25.0, 240.0)),
-            patch("app.services.nearby.is_sunny", side_effect=mock_is_sunny),
-        ):
-            result = _estimate_sun_until(DUMMY_PROFILE, PARIS_LAT, PARIS_LON, from_dt)
-
-        # 4 sunny × 15min = 1h, loses sun at check 5 = 15:30 + 5×15min = 16:45
-        assert result == "16:45"
+        """Obstacle in the sun's direction from the first step on."""
+        profile = [0.0] * 360
+        profile[281] = 30.0
+        sunny_now, until = _status([profile], [0], [10.0] * 17, [280.0] + [281.0] * 16)
+        assert sunny_now.tolist() == [True]
+        assert until.tolist() == [1]
+
+    def test_group_union(self):
+        """A group is sunny if ANY member is, and stays so until the LAST loses it."""
+        early = [0.0] * 360
+        early[200:] = [60.0] * 160
+        late = [0.0] * 360
+        late[230:] = [60.0] * 130
+        azi = [180.0 + 5 * k for k in range(17)]  # 200° at step 4, 230° at step 10
+        sunny_now, until = _status([early, late, WALL, FLAT], [0, 0, 1, 2], [40.0] * 17, azi)
+        assert sunny_now.tolist() == [True, False, True]
+        assert until.tolist() == [10, 1, -1]
+
+    def test_matches_scalar_checks(self):
+        """Same answers as is_sunny at each step along a real sun track."""
+        rng = np.random.default_rng(0)
+        profiles = rng.uniform(0, 60, size=(30, 360))
+        groups = np.repeat(np.arange(10), 3)
+        dt = datetime(2026, 6, 21, 14, 7, tzinfo=PARIS_TZ)
+        alt, azi = _sun_track_ahead(dt)
+        sunny_now, until = _group_sun_status(profiles, groups, 10, alt, azi)
+
+        for g in range(10):
+            members = profiles[groups == g].tolist()
+            assert sunny_now[g] == any(is_sunny(p, alt[0], azi[0]) for p in members)
+            ends = []
+            for p in members:
+                lost = [k for k in range(1, 17) if not is_sunny(p, alt[k], azi[k])]
+                ends.append(lost[0] if lost else -1)
+            assert until[g] == (-1 if -1 in ends else max(ends))
+
+
+class TestSunUntilIntervals:
+    def test_same_as_union_profile(self):
+        """The sun moving from one terrace to the other keeps the group sunny."""
+        dt = datetime(2026, 6, 21, 14, 0, tzinfo=PARIS_TZ)
+        first = [90.0] * 360
+        first[:210] = [0.0] * 210  # Sunny until the sun passes 210° (15:00)
+        second = [90.0] * 360
+        second[203:235] = [0.0] * 32  # Sunny from 14:45 until 235° (16:00)
+        alt, azi = _sun_track_ahead(dt)
+        _, until = _group_sun_status(
+            np.asarray([union_profile([first, second])]), np.zeros(1, np.intp), 1, alt, azi,
+        )
+        minute = dt.hour * 60 + dt.minute
+        from_profile = _format_minute(minute + 15 * int(until[0]))
+
+        group = [compute_intervals(first, dt.date()), compute_intervals(second, dt.date())]
+        assert _sun_until_intervals(group, minute) == from_profile == "16:00"
+
+
+class TestSunTrackAhead:
+    def test_steps_every_15_minutes(self):
+        dt = datetime(2026, 3, 21, 15, 30, tzinfo=PARIS_TZ)
+        alt, azi = _sun_track_ahead(dt)
+        assert len(alt) == 17
+        assert (alt[4], azi[4]) == sun_position_at(datetime(2026, 3, 21, 16, 30, tzinfo=PARIS_TZ))
+
+    def test_past_midnight_is_night(self):
+        alt, _ = _sun_track_ahead(datetime(2026, 6, 21, 22, 30, tzinfo=PARIS_TZ))
+        assert (alt[6:] == -90.0).all()
+
+
+class TestNearbyCellCache:
+    def _rows(self):
+        rows = _rows(600, seed=9)
+        rng = np.random.default_rng(1)
+        for r in rows:
+            if r.profile is not None:
+                r.profile = rng.uniform(0, 60, 360).round(1).tolist()
+        return rows
+
+    def _index(self):
+        return TerrasseIndex(self._rows(), version="t")
+
+    def test_same_as_uncached_for_positions_in_a_cell(self):
+        fixture = self._rows()
+        index = TerrasseIndex(fixture, version="t")
+        slot = datetime(2026, 6, 21, 15, 30, tzinfo=PARIS_TZ)
+        alt, azi = _sun_track_ahead(slot)
+        nearby._cell_cache.clear()
+        base_lat, base_lon = 48.8566, 2.3522
+        for dlat, dlon in [(0, 0), (0.0004, -0.0005), (-0.0003, 0.0006)]:
+            lat, lon = base_lat + dlat, base_lon + dlon
+            rows, statuses = _nearby_from_index(index, lat, lon, 400, slot)
+            expected = index.find_nearby(lat, lon, 400)
+            assert [(r.id, r.distance_m, r.all_ids) for r in rows] == [
+                (r.id, r.distance_m, r.all_ids) for r in expected
+            ]
+
+            for row, (has_profile, sunny, until) in zip(rows, statuses):
+                # Union over every profiled member of the group, in radius or not
+                profiles = [
+                    r.profile for r in fixture
+                    if r.profile is not None and (r.siret or str(r.id)) == row.group_key
+                ]
+                assert has_profile == bool(profiles)
+                if profiles:
+                    s, u = _group_sun_status(
+                        np.asarray([union_profile(profiles)], dtype=np.float32), np.zeros(1, np.intp), 1,
+                        alt.astype(np.float32), azi,
+                    )
+                    assert (sunny, until) == (bool(s[0]), int(u[0]))
+
+    def test_hits_counted(self):
+        index = self._index()
+        slot = datetime(2026, 6, 21, 15, 30, tzinfo=PARIS_TZ)
+        nearby._cell_cache.clear()
+        before = nearby_cache_metrics()
+        _nearby_from_index(index, 48.8566, 2.3522, 500, slot)
+        _nearby_from_index(index, 48.85661, 2.35221, 500, slot)
+        after = nearby_cache_metrics()
+        assert after["misses"] - before["misses"] == 1
+        assert after["hits"] - before["hits"] == 1
+
+
+class TestNearbyFromDb:
+    def _row(self, id, profile, profiled_ids):
+        return SimpleNamespace(id=id, profile=profile, profiled_ids=profiled_ids)
+
+    async def test_union_profile_per_establishment(self):
+        rows = [
+            self._row(1, WALL, [1]),
+            self._row(2, FLAT, [2, 3]),
+            self._row(4, None, []),
+        ]
+        dt = datetime(2026, 6, 21, 14, 0, tzinfo=PARIS_TZ)
+        with patch("app.services.nearby.repo_find_nearby", new_callable=AsyncMock, return_value=rows), \
+             patch("app.services.nearby.get_sun_intervals", new_callable=AsyncMock, return_value={}) as intervals:
+            _, statuses, group_intervals = await _nearby_from_db(None, 48.85, 2.35, 500, dt)
+
+        assert [s[:2] for s in statuses] == [(True, False), (True, True), (False, False)]
+        assert intervals.await_args.args[1] == [1, 2, 3]
+        assert group_intervals == [None, None, None]
+
+    async def test_intervals_need_every_profiled_member(self):
+        rows = [self._row(2, FLAT, [2, 3]), self._row(5, FLAT, [5])]
+        dt = datetime(2026, 6, 21, 14, 0, tzinfo=PARIS_TZ)
+        with patch("app.services.nearby.repo_find_nearby", new_callable=AsyncMock, return_value=rows), \
+             patch("app.services.nearby.get_sun_intervals", new_callable=AsyncMock,
+                   return_value={2: [600, 900], 5: [700, 800]}):
+            _, _, group_intervals = await _nearby_from_db(None, 48.85, 2.35, 500, dt)
+
+        assert group_intervals == [None, [[700, 800]]]
+
+
+class TestFindNearbyFromIndex:
+    async def test_no_database_read(self):
+        """Statuses come from the cached cell status only, not from sun_intervals."""
+        index = TerrasseIndex(_rows(), version="i")
+        dt = datetime(2026, 6, 21, 14, 7, tzinfo=PARIS_TZ)
+        nearby._cell_cache.clear()
+        with patch("app.services.nearby.get_terrasse_index", return_value=index), \
+             patch("app.services.nearby.get_sun_intervals", new_callable=AsyncMock) as intervals, \
+             patch("app.services.nearby.repo_find_nearby", new_callable=AsyncMock) as repo, \
+             patch("app.services.nearby.get_hourly_weather", new_callable=AsyncMock,
+                   return_value={"14:00": {"cloud_cover": 10}}):
+            result = await find_nearby_terrasses(None, 48.8566, 2.3522, dt, radius_m=500)
+
+        assert intervals.await_count == 0
+        assert repo.await_count == 0
+        rows, statuses = _nearby_from_index(index, 48.8566, 2.3522, 500, dt.replace(minute=0))
+        assert [t["id"] for t in result["terrasses"]] == [r.id for r in rows]
+        assert [t["has_profile"] for t in result["terrasses"]] == [s[0] for s in statuses]
@@ -0,0 +1,128 @@
+"""Tests for the in-process search index."""
+import re
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.search_index import SIMILARITY_THRESHOLD, SearchIndex, fold
+
+WORDS = ["Café", "Le", "Bistrot", "Brasserie", "du", "Marché", "Étoile", "Chez", "Paul", "Zinc", "Comptoir"]
+STREETS = ["rue de Rivoli", "boulevard Saint-Germain", "rue Oberkampf", "place de la Bastille", "quai de Valmy"]
+
+
+def _rows(n: int = 300, seed: int = 2) -> list:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(1, n + 1):
+        rows.append(SimpleNamespace(
+            id=i,
+            nom=" ".join(rng.choice(WORDS, 2)) + f" {rng.integers(0, 50)}",
+            nom_commercial=" ".join(rng.choice(WORDS, 2)) if rng.random() < 0.4 else None,
+            adresse=f"{rng.integers(1, 90)} {rng.choice(STREETS)}",
+            siret=f"S{rng.integers(0, 120)}" if rng.random() < 0.7 else None,
+        ))
+    return rows
+
+
+def _index(rows) -> SearchIndex:
+    keys = [r.siret or str(r.id) for r in rows]
+    _, group_ids = np.unique(np.array(keys, dtype=object), return_inverse=True)
+    return SearchIndex(rows, group_ids)
+
+
+def _trigrams(text: str | None) -> set[str]:
+    """show_trgm, as documented by pg_trgm (on folded text)."""
+    grams = set()
+    for word in re.findall(r"[^\W_]+", fold(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(a: str | None, b: str) -> float:
+    ta, tb = _trigrams(a), _trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return float(np.float32(len(ta & tb)) / np.float32(len(ta | tb)))
+
+
+def _representative(members):
+    return min(members, key=lambda r: (r.nom_commercial is None, r.id))
+
+
+def _groups(rows) -> dict[str, list]:
+    groups: dict[str, list] = {}
+    for r in rows:
+        groups.setdefault(r.siret or str(r.id), []).append(r)
+    return groups
+
+
+def _reference_similar(rows, q, limit=10):
+    """Best per-field pg_trgm similarity of each group, as SQL would rank it."""
+    scored = []
+    for members in _groups(rows).values():
+        sim = max(
+            max(_similarity(r.nom_commercial, q), _similarity(r.nom, q), _similarity(r.adresse, q))
+            for r in members
+        )
+        if sim >= SIMILARITY_THRESHOLD:
+            rep = _representative(members)
+            scored.append((-sim, rep.id, rep))
+    return [(rep.id, -neg) for neg, _, rep in sorted(scored, key=lambda s: s[:2])[:limit]]
+
+
+def _reference_containing(rows, q, limit=10):
+    """Groups with a field containing the query (ILIKE), by name."""
+    hits = []
+    for members in _groups(rows).values():
+        if any(fold(q) in fold(getattr(r, f)) for r in members for f in ("nom_commercial", "nom", "adresse")):
+            rep = _representative(members)
+            hits.append((fold(rep.nom_commercial or rep.nom), rep.id))
+    return [rep_id for _, rep_id in sorted(hits)[:limit]]
+
+
+class TestFold:
+    def test_accents_and_case(self):
+        assert fold("Café de l'Étoile") == "cafe de l'etoile"
+        assert fold(None) == ""
+
+
+class TestSimilar:
+    def test_pg_trgm_documented_value(self):
+        """similarity('word', 'two words') = 0.363636 in the pg_trgm docs."""
+        index = _index([SimpleNamespace(id=1, nom="two words", nom_commercial=None, adresse=None, siret=None)])
+        assert index.similar("word") == [(index.rows[0], pytest.approx(0.363636, abs=1e-6))]
+
+    @pytest.mark.parametrize("q", ["cafe", "Bistrot du", "chez paul 12", "rue de rivoli", "etoile", "brasery"])
+    def test_matches_sql_semantics(self, q):
+        rows = _rows()
+        got = [(row.id, sim) for row, sim in _index(rows).similar(q, 10)]
+        expected = _reference_similar(rows, q)
+        assert [i for i, _ in got] == [i for i, _ in expected]
+        assert [s for _, s in got] == pytest.approx([s for _, s in expected])
+
+
+class TestContaining:
+    @pytest.mark.parametrize("q", ["ri", "oberk", "é", "de la", "Marché 4", "vAlMy", "zzz"])
+    def test_matches_sql_semantics(self, q):
+        rows = _rows()
+        assert [r.id for r in _index(rows).containing(q, 10)] == _reference_containing(rows, q)
+
+
+class TestSearch:
+    def test_one_row_per_establishment(self):
+        rows = _rows()
+        for q in ["cafe", "rivoli", "ok"]:
+            result = _index(rows).search(q, 20)
+            keys = [r.siret or str(r.id) for r in result]
+            assert len(keys) == len(set(keys))
+
+    def test_fallback_when_nothing_similar(self):
+        rows = _rows()
+        index = _index(rows)
+        assert index.similar("oberk") == []
+        assert index.search("oberk") == index.containing("oberk")
+
+    def test_empty(self):
+        assert _index([]).search("cafe") == []
@@ -1,10 +1,37 @@
 """Tests for shadow/horizon profile logic."""
 from app.services.shadow import (
+    M_PER_DEG_LAT,
+    M_PER_DEG_LON_PARIS,
+    building_edges,
     compute_horizon_profile_sync,
     is_sunny,
+    union_profile,
+    update_profile_from_edges,
     _fill_azimuth_range,
+    _update_profile_for_building,
 )
 import numpy as np
+from shapely.geometry import Polygon
+
+OBS_LAT = 48.8566
+OBS_LON = 2.3522
+
+
+def _polygon(points_m: list[tuple[float, float]]) -> Polygon:
+    """Polygon from (east, north) offsets in meters from the observer."""
+    return Polygon([
+        (OBS_LON + x / M_PER_DEG_LON_PARIS, OBS_LAT + y / M_PER_DEG_LAT) for x, y in points_m
+    ])
+
+
+def _both_profiles(polygons: list[Polygon], heights: list[float]) -> tuple[np.ndarray, np.ndarray]:
+    """(scalar reference, vectorized) profiles for the same buildings."""
+    scalar = np.zeros(360)
+    for polygon, height in zip(polygons, heights):
+        _update_profile_for_building(scalar, OBS_LAT, OBS_LON, polygon, height)
+    vectorized = np.zeros(360)
+    update_profile_from_edges(vectorized, OBS_LAT, OBS_LON, *building_edges(polygons, heights))
+    return scalar, vectorized
 
 
 class TestIsSunny:
@@ -49,6 +76,19 @@ class TestIsSunny:
         assert is_sunny(profile, 15.0, 360.0) is False
 
 
+class TestUnionProfile:
+    def test_sunny_exactly_when_any_member_is(self):
+        rng = np.random.default_rng(3)
+        profiles = rng.uniform(0, 60, (4, 360)).round(1).tolist()
+        union = union_profile(profiles)
+        for alt in (5.0, 20.0, 35.0, 50.0):
+            for azi in range(0, 360, 7):
+                assert is_sunny(union, alt, azi) == any(is_sunny(p, alt, azi) for p in profiles)
+
+    def test_empty_group_is_flat(self):
+        assert union_profile([]) == [0.0] * 360
+
+
 class TestFillAzimuthRange:
     def test_single_degree(self):
         """Same azimuth for both endpoints fills a single cell."""
@@ -118,3 +158,41 @@ class TestComputeHorizonProfileSync:
         # South should be clear
         south_values = [profile[i] for i in range(170, 190)]
         assert max(south_values) == 0.0, "No obstacle expected to the south"
+
+
+class TestUpdateProfileFromEdges:
+    def test_wide_arc_matches_scalar(self):
+        """Edges spanning > 90° only update their vertices, with the same quirk."""
+        # Long thin building passing close to the east of the observer
+        polygon = _polygon([(5, 40), (5, -60), (8, -60), (8, 40), (5, 40)])
+        scalar, vectorized = _both_profiles([polygon], [20.0])
+        assert np.allclose(scalar, vectorized, rtol=0, atol=1e-9)
+        assert np.count_nonzero(vectorized) > 0
+
+    def test_close_edges_skipped(self):
+        """Edges with both vertices within 2 m contribute nothing."""
+        polygon = _polygon([(-1, -1), (1, -1), (1, 1), (-1, 1), (-1, -1)])
+        scalar, vectorized = _both_profiles([polygon], [20.0])
+        assert np.allclose(scalar, vectorized, rtol=0, atol=1e-9)
+        assert not vectorized.any()
+
+    def test_random_city_identical_to_scalar(self):
+        """Same profile as the per-edge loop on random buildings (to float rounding)."""
+        rng = np.random.default_rng(7)
+        polygons, heights = [], []
+        for _ in range(150):
+            cx, cy = rng.uniform(-150, 150, 2)
+            n = int(rng.integers(3, 9))
+            angles = np.sort(rng.uniform(0, 2 * np.pi, n))
+            radii = rng.uniform(1, 30, n)
+            points = [(cx + r * np.cos(a), cy + r * np.sin(a)) for a, r in zip(angles, radii)]
+            polygons.append(_polygon(points + points[:1]))
+            heights.append(float(rng.uniform(2, 40)))
+
+        scalar, vectorized = _both_profiles(polygons, heights)
+        assert np.allclose(scalar, vectorized, rtol=0, atol=1e-9)
+
+    def test_no_edges(self):
+        profile = np.zeros(360)
+        update_profile_from_edges(profile, OBS_LAT, OBS_LON, *building_edges([], []))
+        assert not profile.any()
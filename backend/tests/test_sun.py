@@ -1,8 +1,17 @@
 """Tests for solar position calculations."""
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
-from app.services.sun import get_sun_position, get_sunrise_sunset
+import numpy as np
+from pysolar.solar import get_altitude, get_azimuth
+
+from app.services.sun import (
+    get_sun_position,
+    get_sun_times,
+    get_sunrise_sunset,
+    local_times,
+    solar_position,
+)
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 PARIS_LAT = 48.8566
@@ -66,3 +75,86 @@ class TestGetSunriseSunset:
         sunrise, sunset = get_sunrise_sunset(PARIS_LAT, PARIS_LON, dt)
         assert sunrise.hour >= 8, f"Winter sunrise should be after 8am, got {sunrise}"
         assert sunset.hour <= 17, f"Winter sunset should be by 5pm, got {sunset}"
+
+
+class TestGetSunTimes:
+    def test_sunrise_sunset_to_the_second(self):
+        """Altitude crosses 0° within a couple of seconds of the returned times."""
+        d = date(2026, 4, 10)
+        times = get_sun_times(PARIS_LAT, PARIS_LON, d)
+        for event, sign in ((times.sunrise, 1), (times.sunset, -1)):
+            dt = datetime.combine(d, event, tzinfo=PARIS_TZ)
+            (before, after), _ = solar_position(
+                round(PARIS_LAT, 2), round(PARIS_LON, 2),
+                [dt - timedelta(seconds=2), dt + timedelta(seconds=2)],
+            )
+            assert sign * before < 0 < sign * after, f"No 0° crossing around {event}"
+
+    def test_events_in_order(self):
+        """Dawn < sunrise < golden hour end < noon < golden hour start < sunset < dusk."""
+        t = get_sun_times(PARIS_LAT, PARIS_LON, date(2026, 10, 1))
+        assert (
+            t.civil_dawn < t.sunrise < t.golden_hour_morning_end < t.solar_noon
+            < t.golden_hour_evening_start < t.sunset < t.civil_dusk
+        )
+
+    def test_solar_noon_is_highest_point(self):
+        d = date(2026, 8, 15)
+        noon = datetime.combine(d, get_sun_times(PARIS_LAT, PARIS_LON, d).solar_noon, tzinfo=PARIS_TZ)
+        alts, _ = solar_position(PARIS_LAT, PARIS_LON, [
+            noon - timedelta(minutes=10), noon, noon + timedelta(minutes=10),
+        ])
+        assert alts[1] > alts[0] and alts[1] > alts[2]
+
+    def test_memoized_per_rounded_coordinates(self):
+        """Nearby points share one cache entry."""
+        d = date(2026, 2, 2)
+        assert get_sun_times(48.8566, 2.3522, d) is get_sun_times(48.8601, 2.3549, d)
+
+
+class TestSolarPosition:
+    def test_matches_pysolar(self):
+        """Vectorized engine stays within a few hundredths of a degree of pysolar."""
+        rng = np.random.default_rng(42)
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        offsets = rng.integers(0, 3 * 365 * 86400, size=300)
+        times = [base + timedelta(seconds=int(s)) for s in offsets]
+
+        alts, azis = solar_position(PARIS_LAT, PARIS_LON, times)
+        for dt, alt, azi in zip(times, alts, azis):
+            ref_alt = get_altitude(PARIS_LAT, PARIS_LON, dt)
+            if ref_alt <= 0:
+                continue
+            ref_azi = get_azimuth(PARIS_LAT, PARIS_LON, dt) % 360
+            azi_diff = abs(azi - ref_azi)
+            assert abs(alt - ref_alt) < 0.03, f"Altitude off at {dt}: {alt} vs {ref_alt}"
+            assert min(azi_diff, 360 - azi_diff) < 0.06, f"Azimuth off at {dt}: {azi} vs {ref_azi}"
+
+    def test_broadcasts_coordinates_against_times(self):
+        """(N, 1) coordinates × T timestamps → (N, T) results."""
+        lats = np.array([[48.85], [48.87]])
+        lons = np.array([[2.33], [2.37]])
+        times = local_times(date(2026, 6, 21), np.arange(8 * 60, 20 * 60, 15))
+        alts, azis = solar_position(lats, lons, times)
+        assert alts.shape == (2, 48)
+        assert azis.shape == (2, 48)
+
+    def test_scalar_and_vector_agree(self):
+        """get_sun_position is the scalar view of solar_position."""
+        minutes = np.arange(6 * 60, 22 * 60, 30)
+        alts, azis = solar_position(PARIS_LAT, PARIS_LON, local_times(date(2026, 3, 29), minutes))
+        for m, alt, azi in zip(minutes, alts, azis):
+            dt = datetime(2026, 3, 29, tzinfo=PARIS_TZ) + timedelta(minutes=int(m))
+            assert get_sun_position(PARIS_LAT, PARIS_LON, dt) == (round(alt, 2), round(azi, 2))
+
+
+class TestLocalTimes:
+    def test_summer_offset(self):
+        """Paris wall clock is UTC+2 in summer."""
+        times = local_times(date(2026, 6, 21), [12 * 60])
+        assert times[0] == np.datetime64("2026-06-21T10:00:00")
+
+    def test_winter_offset(self):
+        """Paris wall clock is UTC+1 in winter."""
+        times = local_times(date(2026, 1, 15), [12 * 60 + 30])
+        assert times[0] == np.datetime64("2026-01-15T11:30:00")
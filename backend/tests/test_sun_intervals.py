@@ -0,0 +1,88 @@
+"""Tests for precomputed sunny intervals."""
+from datetime import date
+
+import numpy as np
+
+from app.services.shadow import is_sunny
+from app.services.sun_intervals import (
+    compute_intervals,
+    is_sunny_at,
+    mask_to_intervals,
+    sun_until,
+    union_intervals,
+)
+from app.services.sun_table import sun_track
+
+FLAT_PROFILE = [0.0] * 360
+
+
+def _urban_profile() -> list[float]:
+    """Buildings to the east (60° high) and a low skyline elsewhere."""
+    profile = [10.0] * 360
+    for az in range(45, 135):
+        profile[az] = 60.0
+    return profile
+
+
+class TestIsSunnyAt:
+    def test_inside_and_outside(self):
+        intervals = [600, 720, 900, 960]
+        assert is_sunny_at(intervals, 600)
+        assert is_sunny_at(intervals, 719)
+        assert not is_sunny_at(intervals, 720)  # End is exclusive
+        assert not is_sunny_at(intervals, 800)
+        assert is_sunny_at(intervals, 930)
+        assert not is_sunny_at(intervals, 1000)
+
+    def test_empty(self):
+        assert not is_sunny_at([], 720)
+
+
+class TestSunUntil:
+    def test_loses_sun_at_first_failing_check(self):
+        # Sunny 12:00–14:10 → checks at 12:15, …, 14:00 sunny, 14:15 not
+        assert sun_until([720, 850], 720) == 855
+
+    def test_sunny_beyond_window(self):
+        assert sun_until([600, 1200], 720) is None
+
+    def test_immediate_shadow(self):
+        assert sun_until([600, 730], 720) == 735
+
+
+class TestMaskToIntervals:
+    def test_runs(self):
+        mask = np.zeros((2, 1440), dtype=bool)
+        mask[0, 10:20] = True
+        mask[0, 30:40] = True
+        mask[1, 1430:] = True
+        assert mask_to_intervals(mask) == [[10, 20, 30, 40], [1430, 1440]]
+
+
+class TestUnionIntervals:
+    def test_overlapping_and_disjoint(self):
+        merged = union_intervals([[600, 700, 900, 1000], [650, 800], [1100, 1200]])
+        assert merged == [600, 800, 900, 1000, 1100, 1200]
+
+    def test_touching_intervals_merge(self):
+        assert union_intervals([[600, 700], [700, 800]]) == [600, 800]
+
+
+class TestComputeIntervals:
+    def test_matches_is_sunny_every_minute(self):
+        """Intervals reproduce the live profile check minute by minute."""
+        d = date(2026, 6, 21)
+        profile = _urban_profile()
+        intervals = compute_intervals(profile, d)
+
+        minutes = np.arange(1440)
+        alt, azi = sun_track(d, minutes)
+        for m, a, z in zip(minutes.tolist(), alt.tolist(), azi.tolist()):
+            assert is_sunny_at(intervals, m) == is_sunny(profile, a, z), m
+
+    def test_flat_profile_is_daylight(self):
+        """With no obstruction, the single interval spans sunrise to sunset."""
+        intervals = compute_intervals(FLAT_PROFILE, date(2026, 3, 21))
+        assert len(intervals) == 2
+        assert 6 * 60 < intervals[0] < 8 * 60
+        assert 19 * 60 < intervals[1] < 20 * 60
@@ -0,0 +1,82 @@
+"""Tests for the city-wide sun-position table."""
+from datetime import date, datetime
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from app.services import sun_table
+from app.services.sun import PARIS_LAT, PARIS_LON, get_sun_position
+from app.services.sun_table import SunTable, sun_position_at, warm_day
+
+PARIS_TZ = ZoneInfo("Europe/Paris")
+
+
+class TestSunTable:
+    def test_matches_sun_position(self):
+        """Table lookups equal get_sun_position at Paris (same 0.01° rounding)."""
+        table = SunTable(2026)
+        d = date(2026, 6, 21)
+        for minute in (6 * 60, 9 * 60 + 15, 13 * 60 + 30, 20 * 60 + 45):
+            alt, azi = table.positions(d, minute)
+            dt = datetime(2026, 6, 21, minute // 60, minute % 60, tzinfo=PARIS_TZ)
+            ref_alt, ref_azi = get_sun_position(PARIS_LAT, PARIS_LON, dt)
+            assert abs(alt - ref_alt) < 0.011
+            assert abs(azi - ref_azi) < 0.011
+
+    def test_days_filled_lazily(self):
+        """Only accessed days are computed."""
+        table = SunTable(2026)
+        assert not table.is_filled(date(2026, 3, 1))
+        table.positions(date(2026, 3, 1))
+        assert table.is_filled(date(2026, 3, 1))
+        assert not table.is_filled(date(2026, 3, 2))
+
+    def test_persisted_file_is_reused(self, tmp_path):
+        """A second instance maps the same file and sees filled days."""
+        d = date(2026, 9, 1)
+        first = SunTable(2026, str(tmp_path))
+        alt, azi = first.positions(d)
+        first._buffer.flush()
+
+        second = SunTable(2026, str(tmp_path))
+        assert second.is_filled(d)
+        alt2, azi2 = second.positions(d)
+        assert np.array_equal(alt, alt2)
+        assert np.array_equal(azi, azi2)
+
+    def test_azimuth_index_in_range(self):
+        table = SunTable(2026)
+        idx = table.azimuth_index(date(2026, 12, 21))
+        assert idx.min() >= 0 and idx.max() < 360
+
+    def test_rejects_other_year(self):
+        table = SunTable(2026)
+        with pytest.raises(ValueError):
+            table.positions(date(2027, 1, 1))
+
+
+class TestRedisTier:
+    async def test_warm_day_round_trips_through_redis(self, fake_redis):
+        """A day computed once is published to Redis and loaded elsewhere."""
+        d = date(2026, 5, 10)
+        with patch.dict(sun_table._tables, {2026: SunTable(2026)}, clear=True):
+            await warm_day(d, fake_redis)
+            expected = sun_table._tables[2026].positions(d)
+
+        fresh = SunTable(2026)
+        with patch.dict(sun_table._tables, {2026: fresh}, clear=True), \
+             patch.object(fresh, "_fill", side_effect=AssertionError("should load from Redis")):
+            await warm_day(d, fake_redis)
+            alt, azi = fresh.positions(d)
+
+        assert np.array_equal(alt, expected[0])
+        assert np.array_equal(azi, expected[1])
+
+    def test_sun_position_at_converts_timezone(self):
+        """UTC datetimes are looked up at the matching Paris minute."""
+        with patch.dict(sun_table._tables, {2026: SunTable(2026)}, clear=True):
+            utc = sun_position_at(datetime.fromisoformat("2026-06-21T11:00:00+00:00"))
+            paris = sun_position_at(datetime(2026, 6, 21, 13, 0))
+        assert utc == paris
@@ -0,0 +1,156 @@
+"""Tests for the sun-status map tiles."""
+import os
+import time
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services import sun_tiles
+from app.services.shadow import is_sunny
+from app.services.sun_table import sun_track
+from app.services.sun_tiles import (
+    EMPTY_TILE,
+    SLOT_MINUTES,
+    SLOTS,
+    build_day_tiles,
+    decode_tile,
+    get_sun_tile,
+    tile_bounds,
+    tile_xy,
+)
+from app.services.terrasse_index import TerrasseIndex
+
+DAY = date(2026, 6, 21)
+
+
+def _rows() -> list:
+    rng = np.random.default_rng(2)
+    return [
+        SimpleNamespace(
+            id=i, nom=f"T{i}", nom_commercial=None, adresse=None, siret=None,
+            longueur=None, largeur=None,
+            lon=2.35 + float(rng.uniform(-0.03, 0.03)),
+            lat=48.86 + float(rng.uniform(-0.02, 0.02)),
+            price_level=None, place_type=None, rating=None, user_rating_count=None,
+            profile=rng.uniform(0, 50, 360).round(1).tolist() if i % 4 else None,
+        )
+        for i in range(1, 201)
+    ]
+
+
+def _index() -> TerrasseIndex:
+    return TerrasseIndex(_rows(), version="v1")
+
+
+@pytest.fixture(autouse=True)
+def _tile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SUN_TILE_DIR", str(tmp_path))
+    sun_tiles._memory.clear()
+    yield
+    sun_tiles._memory.clear()
+
+
+class TestBuildDayTiles:
+    def test_every_terrasse_once_with_its_status(self):
+        index = _index()
+        tiles = build_day_tiles(index, DAY)
+        assert len(tiles) > 1
+
+        alt, azi = sun_track(DAY, np.arange(SLOTS) * SLOT_MINUTES)
+        by_id = {r.id: r for r in _rows()}
+        seen = []
+        for (x, y), data in tiles.items():
+            tile = decode_tile(data)
+            xs, ys = tile_xy(tile["lats"], tile["lons"])
+            assert set(xs) == {x} and set(ys) == {y}
+            for tid, sunny in zip(tile["ids"].tolist(), tile["sunny"]):
+                profile = by_id[tid].profile
+                expected = [
+                    is_sunny(profile, a, z) if profile is not None else a > 0
+                    for a, z in zip(alt.tolist(), azi.tolist())
+                ]
+                assert sunny.tolist() == expected
+                seen.append(tid)
+        assert sorted(seen) == list(range(1, 201))
+
+    def test_empty_index(self):
+        assert build_day_tiles(TerrasseIndex([]), DAY) == {}
+        assert decode_tile(EMPTY_TILE)["ids"].size == 0
+
+
+class TestGetSunTile:
+    async def test_generated_once_per_day(self, fake_redis, tmp_path):
+        index = _index()
+        tiles = build_day_tiles(index, DAY)
+        (x, y), expected = next(iter(tiles.items()))
+
+        assert await get_sun_tile(index, DAY, x, y, fake_redis) == expected
+        # Bulk-written to Redis and to disk
+        assert fake_redis.store[f"suntile:v1:{DAY}:{x}:{y}"] == expected
+        assert (tmp_path / "v1" / DAY.isoformat() / f"{x}_{y}.bin").read_bytes() == expected
+
+        # Another worker (empty memory and Redis) reads the disk copy
+        sun_tiles._memory.clear()
+        assert await get_sun_tile(index, DAY, x, y, None) == expected
+        assert await get_sun_tile(index, DAY, 0, 0, None) == EMPTY_TILE
+
+    async def test_other_versions_pruned_from_disk(self, tmp_path):
+        """Only once no worker has written to them for PRUNE_AFTER."""
+        for old in ("v0", "v00"):
+            (tmp_path / old / DAY.isoformat()).mkdir(parents=True)
+        stale = time.time() - sun_tiles.PRUNE_AFTER - 60
+        os.utime(tmp_path / "v0", (stale, stale))
+        index = _index()
+        x, y = next(iter(build_day_tiles(index, DAY)))
+        await get_sun_tile(index, DAY, x, y, None)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["v00", "v1"]
+
+    async def test_empty_tiles_not_cached(self, fake_redis):
+        index = _index()
+        tiles = build_day_tiles(index, DAY)
+        x_min, y_min, x_max, y_max = tile_bounds(index)
+        assert all(x_min <= x <= x_max and y_min <= y <= y_max for x, y in tiles)
+        empty = next(
+            (x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)
+            if (x, y) not in tiles
+        )
+        await get_sun_tile(index, DAY, *next(iter(tiles)), fake_redis)
+        keys = set(fake_redis.store)
+
+        sun_tiles._memory.clear()
+        # Inside the bounds but without terrasses (read from disk), then outside
+        assert await get_sun_tile(index, DAY, *empty, fake_redis) == EMPTY_TILE
+        assert await get_sun_tile(index, DAY, x_max + 1, y_min, fake_redis) == EMPTY_TILE
+        assert await get_sun_tile(index, DAY, 0, 0, fake_redis) == EMPTY_TILE
+        assert set(fake_redis.store) == keys
+
+
+class TestEndpoint:
+    async def test_index_not_ready(self, client):
+        resp = await client.get(f"/api/sun-tiles/{date.today()}/14/8300/5636.bin")
+        assert resp.status_code == 503
+
+    async def test_wrong_zoom(self, client):
+        resp = await client.get(f"/api/sun-tiles/{date.today()}/12/0/0.bin")
+        assert resp.status_code == 404
+
+    async def test_revalidated_against_the_index_version(self, client):
+        index = _index()
+        x, y = next(iter(build_day_tiles(index, date.today())))
+        url = f"/api/sun-tiles/{date.today()}/14/{x}/{y}.bin"
+        with patch("app.routers.sun_tiles.get_terrasse_index", return_value=index):
+            first = await client.get(url)
+            revalidated = await client.get(url, headers={"If-None-Match": first.headers["etag"]})
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == "public, no-cache"
+        assert revalidated.status_code == 304
+
+        rebuilt = TerrasseIndex(_rows(), version="v2")
+        with patch("app.routers.sun_tiles.get_terrasse_index", return_value=rebuilt):
+            after_rebuild = await client.get(url, headers={"If-None-Match": first.headers["etag"]})
+        assert after_rebuild.status_code == 200
+        assert after_rebuild.headers["etag"] != first.headers["etag"]
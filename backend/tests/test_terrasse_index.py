@@ -0,0 +1,111 @@
+"""Tests for the in-process terrasse index."""
+import math
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.terrasse_index import TerrasseIndex, _degree_lengths
+
+LAT = 48.8566
+LON = 2.3522
+
+
+def _rows(n: int = 400, seed: int = 5) -> list:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(1, n + 1):
+        siret = rng.choice(["", None, f"S{rng.integers(0, 60)}"], p=[0.1, 0.1, 0.8])
+        rows.append(SimpleNamespace(
+            id=i,
+            nom=f"T{i}",
+            nom_commercial=f"Café {i}" if rng.random() < 0.5 else None,
+            adresse=f"{i} rue de Test",
+            siret=siret,
+            longueur=float(rng.uniform(1, 10)) if rng.random() < 0.9 else None,
+            largeur=float(rng.uniform(1, 5)),
+            lon=LON + float(rng.uniform(-0.012, 0.012)),
+            lat=LAT + float(rng.uniform(-0.008, 0.008)),
+            price_level=2,
+            place_type="cafe",
+            rating=4.2,
+            user_rating_count=10,
+            profile=[float(i % 30)] * 360 if rng.random() < 0.7 else None,
+        ))
+    return rows
+
+
+def _brute_force(rows, lat, lon, radius_m, limit=50):
+    """Straight transcription of the original per-request SQL grouping."""
+    m_lat, m_lon = _degree_lengths(lat)
+    nearby = []
+    for r in rows:
+        d = math.hypot((r.lon - lon) * m_lon, (r.lat - lat) * m_lat)
+        if d <= radius_m:
+            nearby.append((r, round(d), r.siret if r.siret else str(r.id)))
+    groups: dict[str, list] = {}
+    for item in nearby:
+        groups.setdefault(item[2], []).append(item)
+    reps = []
+    for key, members in groups.items():
+        rep = min(members, key=lambda m: (m[0].nom_commercial is None, m[1], m[0].id))
+        members = sorted(members, key=lambda m: m[0].id)
+        surface = sum((m[0].longueur or 0) * (m[0].largeur or 0) for m in members)
+        reps.append((rep[1], rep[0].id, key, len(members), round(surface, 1),
+                     [m[0].id for m in members]))
+    reps.sort()
+    return reps[:limit]
+
+
+class TestFindNearby:
+    def test_matches_sql_semantics(self):
+        rows = _rows()
+        index = TerrasseIndex(rows)
+        for lat, lon, radius in [(LAT, LON, 500), (LAT + 0.003, LON - 0.004, 300), (LAT, LON, 1000)]:
+            result = index.find_nearby(lat, lon, radius)
+            expected = _brute_force(rows, lat, lon, radius)
+            assert [
+                (r.distance_m, r.id, r.group_key, r.terrasse_count, r.surface_m2, r.all_ids)
+                for r in result
+            ] == expected
+
+    def test_group_profile_and_profiled_ids(self):
+        rows = _rows()
+        index = TerrasseIndex(rows)
+        for row in index.find_nearby(LAT, LON, 800):
+            members = [r for r in rows if (r.siret or str(r.id)) == row.group_key]
+            assert row.profiled_ids == [r.id for r in members if r.profile is not None]
+            if row.profiled_ids:
+                union = np.min([r.profile for r in members if r.profile is not None], axis=0)
+                assert (row.profile == union.astype(np.float32)).all()
+            else:
+                assert row.profile is None
+
+    def test_rows_keep_no_profiles(self):
+        rows = _rows(50)
+        index = TerrasseIndex(rows)
+        assert not hasattr(index.rows[0], "profile")
+        assert [(r.id, r.nom, r.lat) for r in index.rows] == [(r.id, r.nom, r.lat) for r in rows]
+
+    def test_limit_and_empty(self):
+        index = TerrasseIndex(_rows())
+        assert len(index.find_nearby(LAT, LON, 1000, limit=5)) == 5
+        assert index.find_nearby(LAT + 1.0, LON, 500) == []
+        assert TerrasseIndex([]).find_nearby(LAT, LON, 500) == []
+
+    def test_profile_matrix(self):
+        rows = _rows(50)
+        index = TerrasseIndex(rows)
+        assert index.profiles.shape == (50, 360)
+        for i, r in enumerate(rows):
+            assert index.has_profile[i] == (r.profile is not None)
+            if r.profile is not None:
+                assert index.profiles[i, 0] == r.profile[0]
+
+    def test_group_union_profiles(self):
+        rows = _rows(200)
+        index = TerrasseIndex(rows)
+        for g, key in enumerate(sorted(set(index.group_keys))):
+            members = [r.profile for r in rows if (r.siret or str(r.id)) == key and r.profile is not None]
+            assert index.group_has_profile[g] == bool(members)
+            if members:
+                assert (index.group_profiles[g] == np.min(np.asarray(members, np.float32), axis=0)).all()
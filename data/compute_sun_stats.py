@@ -7,28 +7,38 @@ stored in a `sun_stats` table for SQL analysis.
 Also computes shade-friendly stats: terraces that stay shaded during the
 hottest hours (12h–16h) — useful for canicule/summer blog posts.
 
+The sun position is city-wide, so the dates × hours slots form one sun
+track (from the sun table); each chunk of profiles is compared against it
+as a (terrasses, slots) matrix with the `is_sunny` rule. Rows are encoded
+as a packed binary COPY payload, loaded into an unlogged staging table and
+upserted into sun_stats in one transaction, so a whole year (20k terrasses
+× 365 days × 15 hours ≈ 110M rows) fits in one run.
+
 Usage:
     python data/compute_sun_stats.py 2026-04-05 2026-04-06
     python data/compute_sun_stats.py --clear 2026-04-05  # recompute a date
     python data/compute_sun_stats.py --export-csv 2026-04-05  # also dump CSV
+    python data/compute_sun_stats.py --year 2026  # every date of a year
 
 Runs inside Docker:
     docker compose exec backend python /app/data/compute_sun_stats.py 2026-04-05 2026-04-06
 """
 import argparse
 import csv
+import io
 import os
+import struct
 import sys
 import time
-from datetime import date, datetime
+from datetime import date, timedelta
 from zoneinfo import ZoneInfo
 
+import numpy as np
 from sqlalchemy import create_engine, text
 
 # Add backend to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
-from app.services.shadow import is_sunny  # noqa: E402
-from app.services.sun import get_sun_position  # noqa: E402
+from app.services.sun_table import sun_track  # noqa: E402
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 
@@ -44,6 +54,30 @@ HOUR_END = 21
 # Canicule / shade analysis: hottest hours
 SHADE_HOURS = range(12, 17)  # 12h–16h inclusive
 
+STAGING_TABLE = "sun_stats_staging"
+DEFAULT_CHUNK_ROWS = 1_000_000
+SUMMARY_MAX_DATES = 31  # Per-date summary beyond that is noise
+
+# PostgreSQL binary COPY framing; dates are int4 days since 2000-01-01
+PG_EPOCH = date(2000, 1, 1)
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_TRAILER = struct.pack("!h", -1)
+# Binary wire type of each sun_stats column, in COPY order
+_COPY_TYPES = {
+    "terrasse_id": np.dtype(">i4"),
+    "date": np.dtype(">i4"),
+    "heure": np.dtype(">i4"),
+    "sun_altitude": np.dtype(">f8"),
+    "sun_azimuth": np.dtype(">f8"),
+    "soleil": np.dtype("?"),
+}
+STAGING_COLUMNS = tuple(_COPY_TYPES)
+# One row: field count, then (byte length, value) per column, packed
+_COPY_ROW = np.dtype(
+    [("fields", ">i2")]
+    + [field for name, dtype in _COPY_TYPES.items() for field in ((f"{name}_len", ">i4"), (name, dtype))]
+)
+
 
 def ensure_table(engine) -> None:
     """Create sun_stats table if it doesn't exist."""
@@ -74,74 +108,150 @@ def ensure_table(engine) -> None:
 def clear_dates(engine, dates: list[date]) -> None:
     """Remove existing data for specified dates."""
     with engine.begin() as conn:
-        for d in dates:
-            deleted = conn.execute(
-                text("DELETE FROM sun_stats WHERE date = :d"),
-                {"d": d},
-            ).rowcount
-            if deleted:
-                print(f"  Cleared {deleted} rows for {d}")
+        deleted = conn.execute(
+            text("DELETE FROM sun_stats WHERE date = ANY(:dates)"),
+            {"dates": dates},
+        ).rowcount
+    if deleted:
+        print(f"  Cleared {deleted} rows for {len(dates)} date(s)")
+
+
+def existing_counts(engine, dates: list[date]) -> dict[date, int]:
+    """Rows already in sun_stats per date (dates without rows are absent)."""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("""
+                SELECT date, COUNT(*) FROM sun_stats
+                WHERE date = ANY(:dates)
+                GROUP BY date
+            """),
+            {"dates": dates},
+        ).fetchall()
+    return {r[0]: r[1] for r in rows}
 
 
-def fetch_terrasses_with_profiles(engine) -> list[dict]:
-    """Fetch all terrasses that have a horizon profile."""
+def fetch_profiles(engine) -> tuple[np.ndarray, np.ndarray]:
+    """Ids (N,) and horizon profiles (N, 360) of all terrasses that have one."""
     with engine.connect() as conn:
         rows = conn.execute(text("""
-            SELECT
-                t.id,
-                ST_X(t.geometry) AS lon,
-                ST_Y(t.geometry) AS lat,
-                hp.profile
+            SELECT t.id, hp.profile
             FROM terrasses t
             JOIN horizon_profiles hp ON hp.terrasse_id = t.id
             ORDER BY t.id
         """)).fetchall()
-    return [
-        {"id": r[0], "lon": r[1], "lat": r[2], "profile": r[3]}
-        for r in rows
-    ]
-
-
-def compute_for_terrace(terrace: dict, dates: list[date]) -> list[dict]:
-    """Compute sun stats for one terrace across all dates and hours."""
-    profile = terrace["profile"]
-    lat, lon = terrace["lat"], terrace["lon"]
-    rows = []
-
-    for d in dates:
-        for hour in range(HOUR_START, HOUR_END + 1):
-            dt = datetime(d.year, d.month, d.day, hour, 0, tzinfo=PARIS_TZ)
-            sun_alt, sun_azi = get_sun_position(lat, lon, dt)
-            sunny = is_sunny(profile, sun_alt, sun_azi)
-
-            rows.append({
-                "terrasse_id": terrace["id"],
-                "date": d,
-                "heure": hour,
-                "sun_altitude": sun_alt,
-                "sun_azimuth": sun_azi,
-                "soleil": sunny,
-            })
-
-    return rows
-
-
-def save_batch(engine, rows: list[dict]) -> None:
-    """Bulk insert rows into sun_stats."""
-    if not rows:
-        return
+    ids = np.array([r[0] for r in rows], dtype=np.int32)
+    profiles = np.array([r[1] for r in rows], dtype=np.float64).reshape(len(rows), 360)
+    return ids, profiles
+
+
+def sun_track_for_dates(dates: list[date]) -> dict[str, np.ndarray]:
+    """City-wide sun position of every (date, hour) slot, from the sun table.
+
+    Returns flat arrays over the S = len(dates) × hours slots: date (days
+    since 2000-01-01, the binary COPY epoch), heure, altitude, azimuth and
+    the profile index of the azimuth (rounded like `is_sunny`).
+    """
+    hours = np.arange(HOUR_START, HOUR_END + 1)
+    alts, azis = zip(*(sun_track(d, hours * 60) for d in dates))
+    azimuth = np.concatenate(azis)
+    return {
+        "date": np.repeat([(d - PG_EPOCH).days for d in dates], hours.size).astype(np.int32),
+        "heure": np.tile(hours, len(dates)).astype(np.int32),
+        "altitude": np.concatenate(alts),
+        "azimuth": azimuth,
+        "az_idx": np.rint(azimuth).astype(np.intp) % 360,
+    }
+
+
+def sunny_matrix(profiles: np.ndarray, track: dict[str, np.ndarray]) -> np.ndarray:
+    """(N, S) bool: the `is_sunny` rule for every profile × slot at once."""
+    altitude = track["altitude"]
+    return (altitude > 0) & (altitude > profiles[:, track["az_idx"]])
+
+
+def copy_payload(ids: np.ndarray, track: dict[str, np.ndarray], sunny: np.ndarray) -> bytes:
+    """Encode (terrasse × slot) rows in binary COPY format, without a Python loop.
+
+    Every row has the same layout (fixed-width fields, no NULLs), so the
+    rows are one packed big-endian structured array.
+    """
+    slots = track["date"].size
+    rows = np.empty(ids.size * slots, dtype=_COPY_ROW)
+    rows["fields"] = len(STAGING_COLUMNS)
+    for name, dtype in _COPY_TYPES.items():
+        rows[f"{name}_len"] = dtype.itemsize
+    rows["terrasse_id"] = np.repeat(ids, slots)
+    for name in ("date", "heure"):
+        rows[name] = np.tile(track[name], ids.size)
+    rows["sun_altitude"] = np.tile(track["altitude"], ids.size)
+    rows["sun_azimuth"] = np.tile(track["azimuth"], ids.size)
+    rows["soleil"] = sunny.ravel()
+    return _COPY_HEADER + rows.tobytes() + _COPY_TRAILER
+
+
+def create_staging(engine) -> None:
+    """Empty unlogged staging table shaped like sun_stats, without indexes."""
     with engine.begin() as conn:
-        conn.execute(
-            text("""
-                INSERT INTO sun_stats (terrasse_id, date, heure, sun_altitude, sun_azimuth, soleil)
-                VALUES (:terrasse_id, :date, :heure, :sun_altitude, :sun_azimuth, :soleil)
-                ON CONFLICT (terrasse_id, date, heure) DO UPDATE
-                SET sun_altitude = EXCLUDED.sun_altitude,
-                    sun_azimuth = EXCLUDED.sun_azimuth,
-                    soleil = EXCLUDED.soleil
-            """),
-            rows,
-        )
+        conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+        conn.execute(text(
+            f"CREATE UNLOGGED TABLE {STAGING_TABLE} "
+            "(LIKE sun_stats INCLUDING DEFAULTS EXCLUDING CONSTRAINTS)"
+        ))
+
+
+def load_staging(engine, ids: np.ndarray, profiles: np.ndarray, track: dict[str, np.ndarray],
+                 chunk_rows: int) -> int:
+    """Compare profile chunks against the sun track and COPY them into staging.
+
+    Chunks hold ~`chunk_rows` rows (payload ≈ 55 bytes/row). Returns the
+    number of rows loaded.
+    """
+    slots = track["date"].size
+    chunk = max(1, chunk_rows // slots)
+    columns = ", ".join(STAGING_COLUMNS)
+    raw = engine.raw_connection()
+    loaded = 0
+    t_compute = t_copy = 0.0
+    t0 = time.time()
+    try:
+        with raw.cursor() as cur:
+            for start in range(0, ids.size, chunk):
+                t1 = time.time()
+                part = ids[start:start + chunk]
+                payload = copy_payload(part, track, sunny_matrix(profiles[start:start + chunk], track))
+                t2 = time.time()
+                cur.copy_expert(
+                    f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT binary)",
+                    io.BytesIO(payload),
+                )
+                t_compute += t2 - t1
+                t_copy += time.time() - t2
+                loaded += part.size * slots
+                elapsed = time.time() - t0
+                print(f"  {start + part.size}/{ids.size} terrasses — {loaded:,} rows "
+                      f"— {loaded / elapsed:,.0f} rows/s")
+        raw.commit()
+    finally:
+        raw.close()
+    print(f"  Compute {t_compute:.1f}s ({loaded / max(t_compute, 1e-9):,.0f} slots/s), "
+          f"COPY {t_copy:.1f}s ({loaded / max(t_copy, 1e-9):,.0f} rows/s)")
+    return loaded
+
+
+def merge_staging(engine) -> int:
+    """Upsert staging into sun_stats in one transaction, then drop it."""
+    columns = ", ".join(STAGING_COLUMNS)
+    with engine.begin() as conn:
+        merged = conn.execute(text(f"""
+            INSERT INTO sun_stats ({columns})
+            SELECT {columns} FROM {STAGING_TABLE}
+            ON CONFLICT (terrasse_id, date, heure) DO UPDATE
+            SET sun_altitude = EXCLUDED.sun_altitude,
+                sun_azimuth = EXCLUDED.sun_azimuth,
+                soleil = EXCLUDED.soleil
+        """)).rowcount
+        conn.execute(text(f"DROP TABLE {STAGING_TABLE}"))
+    return merged
 
 
 def export_csv(engine, dates: list[date], output_dir: str = "data/exports") -> None:
@@ -229,9 +339,15 @@ def main():
     )
     parser.add_argument(
         "dates",
-        nargs="+",
+        nargs="*",
         help="Dates to compute (YYYY-MM-DD format)",
     )
+    parser.add_argument(
+        "--year",
+        type=int,
+        default=None,
+        help="Compute every date of this year (in addition to the dates given)",
+    )
     parser.add_argument(
         "--clear",
         action="store_true",
@@ -243,10 +359,10 @@ def main():
         help="Export results as CSV after computing",
     )
     parser.add_argument(
-        "--batch-size",
+        "--chunk-rows",
         type=int,
-        default=500,
-        help="Save every N terrasses (default: 500)",
+        default=DEFAULT_CHUNK_ROWS,
+        help=f"Rows per vectorized chunk / COPY (default: {DEFAULT_CHUNK_ROWS})",
     )
     args = parser.parse_args()
 
@@ -258,8 +374,17 @@ def main():
         except ValueError:
             print(f"ERROR: Invalid date format '{d_str}', expected YYYY-MM-DD")
             sys.exit(1)
+    if args.year is not None:
+        first = date(args.year, 1, 1)
+        dates.extend(first + timedelta(days=i) for i in range((date(args.year + 1, 1, 1) - first).days))
+    dates = sorted(set(dates))
+    if not dates:
+        parser.error("give dates and/or --year")
 
-    print(f"Sun stats computation for: {', '.join(d.isoformat() for d in dates)}")
+    if len(dates) > SUMMARY_MAX_DATES:
+        print(f"Sun stats computation for {len(dates)} dates: {dates[0]} → {dates[-1]}")
+    else:
+        print(f"Sun stats computation for: {', '.join(d.isoformat() for d in dates)}")
     print(f"  Hours: {HOUR_START}h–{HOUR_END}h ({HOUR_END - HOUR_START + 1} slots/day)")
 
     engine = create_engine(DATABASE_URL)
@@ -271,58 +396,43 @@ def main():
     if args.clear:
         clear_dates(engine, dates)
 
-    # Check which dates already have data
-    with engine.connect() as conn:
-        for d in dates[:]:
-            existing = conn.execute(
-                text("SELECT COUNT(*) FROM sun_stats WHERE date = :d"),
-                {"d": d},
-            ).scalar()
-            if existing and not args.clear:
-                print(f"  ⚠️  {d} already has {existing} rows — skipping (use --clear to recompute)")
-                dates.remove(d)
+    # Skip dates that already have data
+    existing = {} if args.clear else existing_counts(engine, dates)
+    for d, count in sorted(existing.items()):
+        print(f"  ⚠️  {d} already has {count} rows — skipping (use --clear to recompute)")
+    dates = [d for d in dates if d not in existing]
 
     if not dates:
         print("Nothing to compute.")
         engine.dispose()
         return
 
-    # Fetch terrasses
-    terrasses = fetch_terrasses_with_profiles(engine)
-    if not terrasses:
+    # Fetch profiles
+    ids, profiles = fetch_profiles(engine)
+    if not ids.size:
         print("No terrasses with horizon profiles found. Run compute_horizon_profiles.py first.")
         engine.dispose()
         return
 
-    total = len(terrasses)
-    slots_per_terrace = len(dates) * (HOUR_END - HOUR_START + 1)
-    print(f"  {total} terrasses × {slots_per_terrace} slots = {total * slots_per_terrace} computations")
+    # Sun positions are city-wide: look them up once for all terrasses
+    track = sun_track_for_dates(dates)
+    slots = track["date"].size
+    print(f"  {ids.size} terrasses × {slots} slots = {ids.size * slots:,} rows")
 
     t0 = time.time()
-    completed = 0
-    batch = []
-
-    for terrace in terrasses:
-        rows = compute_for_terrace(terrace, dates)
-        batch.extend(rows)
-        completed += 1
-
-        if completed % args.batch_size == 0:
-            save_batch(engine, batch)
-            batch.clear()
-            elapsed = time.time() - t0
-            rate = completed / elapsed
-            eta = (total - completed) / rate if rate > 0 else 0
-            print(f"  {completed}/{total} ({completed/total*100:.0f}%) — {rate:.1f} terrasses/s — ETA {eta:.0f}s")
-
-    # Save remaining
-    save_batch(engine, batch)
+    create_staging(engine)
+    loaded = load_staging(engine, ids, profiles, track, args.chunk_rows)
+    t_load = time.time() - t0
+    merged = merge_staging(engine)
+    t_merge = time.time() - t0 - t_load
 
     elapsed = time.time() - t0
-    print(f"\nDone: {completed} terrasses in {elapsed:.1f}s ({completed/elapsed:.1f}/s)")
+    print(f"\nDone: {loaded:,} rows in {elapsed:.1f}s ({loaded / elapsed:,.0f} rows/s) — "
+          f"compute + COPY {t_load:.1f}s, merge of {merged:,} rows {t_merge:.1f}s")
 
     # Summary
-    print_summary(engine, dates)
+    if len(dates) <= SUMMARY_MAX_DATES:
+        print_summary(engine, dates)
 
     # CSV export
     if args.export_csv:
@@ -1,7 +1,7 @@
 """Import Paris Open Data terrasses into PostGIS.
 
 Reads the GeoJSON export of 'terrasses-autorisations', filters to open terraces only,
-and inserts into the 'terrasses' table.
+and inserts into the 'terrasses' table, then refreshes the etablissements view.
 
 Usage:
     python data/import_terrasses.py [path_to_geojson]
@@ -117,6 +117,19 @@ def import_terrasses(geojson_path: str) -> None:
         count = conn.execute(text("SELECT COUNT(*) FROM terrasses")).scalar()
         print(f"  Verified: {count} rows in terrasses table")
 
+    refresh_etablissements(engine)
+
+
+def refresh_etablissements(engine) -> None:
+    """Regroup the new terrasses by SIRET (search and nearby read the view).
+
+    Union profiles follow once compute_horizon_profiles.py has run.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY etablissements"))
+        count = conn.execute(text("SELECT COUNT(*) FROM etablissements")).scalar()
+    print(f"  Refreshed etablissements: {count} establishments")
+
 
 if __name__ == "__main__":
     geojson_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
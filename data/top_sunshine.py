@@ -1,21 +1,24 @@
 #!/usr/bin/env python3
 """Compute top terrasses by sunshine duration (minutes) for a given date.
 
-Optimized: sun positions are precomputed once (same for all of Paris),
-then each terrasse's horizon profile is checked with simple comparisons.
+Optimized: sun positions come from the city-wide sun table (same for all
+of Paris), then each terrasse's horizon profile is checked with simple
+comparisons.
 
 Usage:
     python -m data.top_sunshine [--date 2026-03-21] [--limit 20]
 """
 import argparse
 import time as timer
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 from zoneinfo import ZoneInfo
 
+import numpy as np
 from sqlalchemy import create_engine, text
 
 from app.config import settings
-from app.services.sun import get_sun_position, get_sunrise_sunset
+from app.services.sun import get_sunrise_sunset
+from app.services.sun_table import get_sun_table
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 PARIS_LAT, PARIS_LON = 48.8566, 2.3522
@@ -30,20 +33,12 @@ def precompute_sun_positions(target_date: date) -> list[tuple[float, int]]:
     day_dt = datetime(target_date.year, target_date.month, target_date.day, tzinfo=PARIS_TZ)
     sunrise, sunset = get_sunrise_sunset(PARIS_LAT, PARIS_LON, day_dt)
 
-    start = datetime(target_date.year, target_date.month, target_date.day,
-                     sunrise.hour, 0, tzinfo=PARIS_TZ)
-    end = datetime(target_date.year, target_date.month, target_date.day,
-                   min(sunset.hour + 1, 22), 0, tzinfo=PARIS_TZ)
+    minutes = np.arange(sunrise.hour * 60, min(sunset.hour + 1, 22) * 60 + 1, STEP_MINUTES)
+    table = get_sun_table(target_date.year)
+    alts, _ = table.positions(target_date, minutes)
+    az_idx = table.azimuth_index(target_date, minutes)
 
-    positions = []
-    current = start
-    while current <= end:
-        alt, azi = get_sun_position(PARIS_LAT, PARIS_LON, current)
-        if alt > 0:
-            positions.append((alt, int(round(azi)) % 360))
-        current += timedelta(minutes=STEP_MINUTES)
-
-    return positions
+    return [(alt, az) for alt, az in zip(alts.tolist(), az_idx.tolist()) if alt > 0]
 
 
 def count_sunny_minutes(profile: list[float], sun_positions: list[tuple[float, int]]) -> int:
@@ -11,6 +11,8 @@ Steps:
   5. Enrich from SIRENE (commercial names via API)
   6. Import new bars/pubs from OSM without declared terrasse
   7. Compute horizon profiles for new terrasses
+  8. Refresh precomputed sunny intervals (rolling 60-day window)
+  9. Refresh the etablissements view (SIRET groups, union profiles)
 
 Usage:
     python -m data.update_pipeline [--skip-download] [--skip-horizons] [--force]
@@ -200,6 +202,32 @@ def step_compute_horizons():
         logger.warning("Horizon computation exited with code %d", proc.returncode)
 
 
+def step_compute_sun_intervals():
+    """Refresh the rolling window of precomputed sunny intervals."""
+    logger.info("=== Step 8: Refreshing sunny intervals ===")
+    proc = subprocess.Popen(
+        [sys.executable, "-u", str(DATA_DIR / "compute_sun_intervals.py")],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, cwd=str(DATA_DIR.parent),
+    )
+    for line in proc.stdout:
+        logger.info(line.rstrip())
+    proc.wait()
+    if proc.returncode != 0:
+        logger.warning("Sun intervals computation exited with code %d", proc.returncode)
+
+
+def step_refresh_etablissements(engine) -> int:
+    """Rebuild the SIRET groups from the synced terrasses and new profiles."""
+    logger.info("=== Step 9: Refreshing etablissements ===")
+    with engine.begin() as conn:
+        # CONCURRENTLY: the API keeps reading the previous rows meanwhile
+        conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY etablissements"))
+        count = conn.execute(text("SELECT COUNT(*) FROM etablissements")).scalar()
+    logger.info("Etablissements: %d", count)
+    return count
+
+
 async def run_pipeline(
     skip_download: bool = False,
     skip_horizons: bool = False,
@@ -289,6 +317,20 @@ async def run_pipeline(
         logger.error("Step 7 (horizons) failed: %s", e)
         errors.append(f"Step 7 horizons: {e}")
 
+    # Step 8: Sunny intervals (new profiles + the day entering the window)
+    try:
+        step_compute_sun_intervals()
+    except Exception as e:
+        logger.error("Step 8 (sun intervals) failed: %s", e)
+        errors.append(f"Step 8 sun intervals: {e}")
+
+    # Step 9: Establishments (after every step touching terrasses or profiles)
+    try:
+        step_refresh_etablissements(engine)
+    except Exception as e:
+        logger.error("Step 9 (etablissements) failed: %s", e)
+        errors.append(f"Step 9 etablissements: {e}")
+
     elapsed = time.time() - t0
 
     logger.info("=" * 60)
@@ -0,0 +1,40 @@
+import type { SunTile } from "./types";
+
+/** Zoom level of the sun tiles served by the backend. */
+export const SUN_TILE_ZOOM = 14;
+
+export function sunTileXY(lat: number, lon: number): [number, number] {
+  const n = 2 ** SUN_TILE_ZOOM;
+  const latRad = (lat * Math.PI) / 180;
+  const x = Math.floor(((lon + 180) / 360) * n);
+  const y = Math.floor(((1 - Math.asinh(Math.tan(latRad)) / Math.PI) / 2) * n);
+  return [x, y];
+}
+
+export function decodeSunTile(buffer: ArrayBuffer): SunTile {
+  const view = new DataView(buffer);
+  const slots = view.getUint8(5);
+  const slotMinutes = view.getUint16(6, true);
+  const count = view.getUint32(8, true);
+  let offset = 12;
+  // Copies: typed-array views need aligned offsets
+  const ids = new Uint32Array(buffer.slice(offset, (offset += 4 * count)));
+  const lats = new Float32Array(buffer.slice(offset, (offset += 4 * count)));
+  const lons = new Float32Array(buffer.slice(offset, (offset += 4 * count)));
+  const bits = new Uint8Array(buffer, offset, (count * slots) / 8);
+  return { ids, lats, lons, slotMinutes, slots, bits };
+}
+
+export function isSunnyAt(tile: SunTile, index: number, minuteOfDay: number): boolean {
+  const slot = Math.floor(minuteOfDay / tile.slotMinutes);
+  const byte = tile.bits[index * (tile.slots / 8) + (slot >> 3)];
+  return ((byte >> (slot & 7)) & 1) === 1;
+}
+
+export async function getSunTile(date: string, x: number, y: number): Promise<SunTile> {
+  const resp = await fetch(`/api/sun-tiles/${date}/${SUN_TILE_ZOOM}/${x}/${y}.bin`);
+  if (!resp.ok) {
+    throw new Error(`API error ${resp.status}: ${resp.statusText}`);
+  }
+  return decodeSunTile(await resp.arrayBuffer());
+}
@@ -89,3 +89,13 @@ export interface GeocodeResult {
   label: string;
   postcode: string;
 }
+
+export interface SunTile {
+  ids: Uint32Array;
+  lats: Float32Array;
+  lons: Float32Array;
+  slotMinutes: number;
+  slots: number;
+  /** Packed sun status: bit k of terrasse i = sunny at k × slotMinutes. */
+  bits: Uint8Array;
+}